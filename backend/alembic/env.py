@@ -8,7 +8,12 @@ from alembic import context
 
 from app.db.base import Base
 from app.models.auth import User
-from app.models.transactions import Transaction, Category
+from app.models.transactions import Transaction, Category, RecurringTransaction
+from app.models.budget import Budget, CategorySpend
+from app.models.export import ExportJob, ExportWatermark
+from app.models.analytics import Anomaly, MonthlyCategoryTotal, MonthlyTotalsDirty
+from app.models.outbox import Outbox
+from app.models.platform import PlatformAmountBucket, PlatformDailyTotals, PlatformDirtyDay, PlatformUserDay
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
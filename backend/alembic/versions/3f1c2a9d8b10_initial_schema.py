@@ -0,0 +1,73 @@
+"""initial schema
+
+Revision ID: 3f1c2a9d8b10
+Revises: 
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c2a9d8b10'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'users',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('email', sa.String(length=255), nullable=True),
+        sa.Column('hashed_password', sa.String(length=255), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('is_superuser', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email'),
+    )
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+
+    op.create_table(
+        'category',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('title', sa.String(length=50), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('title'),
+    )
+    op.create_index(op.f('ix_category_id'), 'category', ['id'], unique=True)
+
+    op.create_table(
+        'transactions',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('title', sa.String(length=50), nullable=False),
+        sa.Column('cash', sa.Float(), nullable=False),
+        sa.Column('type', sa.Enum('income', 'expense', name='transactiontype'), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('category_id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['category.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_transactions_id'), 'transactions', ['id'], unique=True)
+    op.create_index(op.f('ix_transactions_title'), 'transactions', ['title'], unique=False)
+    op.create_index(op.f('ix_transactions_created_at'), 'transactions', ['created_at'], unique=False)
+    op.create_index(op.f('ix_transactions_category_id'), 'transactions', ['category_id'], unique=False)
+    op.create_index(op.f('ix_transactions_user_id'), 'transactions', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('transactions')
+    op.drop_table('category')
+    op.drop_table('users')
+    sa.Enum(name='transactiontype').drop(op.get_bind(), checkfirst=True)
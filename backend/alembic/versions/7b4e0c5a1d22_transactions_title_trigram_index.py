@@ -0,0 +1,45 @@
+"""transactions title trigram index
+
+Revision ID: 7b4e0c5a1d22
+Revises: 3f1c2a9d8b10
+Create Date: 2026-10-19 12:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b4e0c5a1d22'
+down_revision: Union[str, None] = '3f1c2a9d8b10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+    # CONCURRENTLY не блокирует запись в большую таблицу, но требует работы вне транзакции
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_title_trgm',
+            'transactions',
+            ['user_id', 'title'],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_user_title_trgm',
+            table_name='transactions',
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,85 @@
+"""recurring transactions
+
+Revision ID: 9c2d4f6a8e31
+Revises: 7b4e0c5a1d22
+Create Date: 2026-10-19 19:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c2d4f6a8e31'
+down_revision: Union[str, None] = '7b4e0c5a1d22'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'recurring_transactions',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('title', sa.String(length=50), nullable=False),
+        sa.Column('cash', sa.Float(), nullable=False),
+        sa.Column('type', postgresql.ENUM('income', 'expense', name='transactiontype', create_type=False), nullable=False),
+        sa.Column('period', sa.Enum('day', 'week', 'month', name='recurrenceperiod'), nullable=False),
+        sa.Column('every', sa.Integer(), nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('next_index', sa.Integer(), nullable=False),
+        sa.Column('next_run_on', sa.Date(), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('category_id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['category.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index(op.f('ix_recurring_transactions_category_id'), 'recurring_transactions', ['category_id'], unique=False)
+    op.create_index(op.f('ix_recurring_transactions_user_id'), 'recurring_transactions', ['user_id'], unique=False)
+    op.create_index(
+        'ix_recurring_transactions_due',
+        'recurring_transactions',
+        ['next_run_on'],
+        unique=False,
+        postgresql_where=sa.text('is_active'),
+    )
+
+    op.add_column('transactions', sa.Column('recurring_id', sa.BigInteger(), nullable=True))
+    op.add_column('transactions', sa.Column('occurrence_date', sa.Date(), nullable=True))
+    op.create_foreign_key(
+        'transactions_recurring_id_fkey', 'transactions', 'recurring_transactions',
+        ['recurring_id'], ['id'], ondelete='SET NULL',
+    )
+    # Уникальный индекс строится без блокировки записи, затем становится ограничением
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'uq_transactions_recurring_occurrence',
+            'transactions',
+            ['recurring_id', 'occurrence_date'],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+    op.execute(
+        "ALTER TABLE transactions ADD CONSTRAINT uq_transactions_recurring_occurrence "
+        "UNIQUE USING INDEX uq_transactions_recurring_occurrence"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_transactions_recurring_occurrence', 'transactions', type_='unique')
+    op.drop_constraint('transactions_recurring_id_fkey', 'transactions', type_='foreignkey')
+    op.drop_column('transactions', 'occurrence_date')
+    op.drop_column('transactions', 'recurring_id')
+    op.drop_index('ix_recurring_transactions_due', table_name='recurring_transactions')
+    op.drop_index(op.f('ix_recurring_transactions_user_id'), table_name='recurring_transactions')
+    op.drop_index(op.f('ix_recurring_transactions_category_id'), table_name='recurring_transactions')
+    op.drop_table('recurring_transactions')
+    sa.Enum(name='recurrenceperiod').drop(op.get_bind(), checkfirst=True)
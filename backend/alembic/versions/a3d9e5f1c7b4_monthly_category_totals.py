@@ -0,0 +1,65 @@
+"""monthly category totals for analytics
+
+Revision ID: a3d9e5f1c7b4
+Revises: f5c1a7e3b8d2
+Create Date: 2026-10-19 23:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3d9e5f1c7b4'
+down_revision: Union[str, None] = 'f5c1a7e3b8d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'monthly_category_totals',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('category_id', sa.BigInteger(), nullable=False),
+        sa.Column('type', postgresql.ENUM('income', 'expense', name='transactiontype', create_type=False), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('transactions', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'month', 'category_id', 'type'),
+    )
+    op.create_table(
+        'monthly_totals_dirty',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'month'),
+    )
+    # Дальше сводку поддерживает refresh_monthly_totals по событиям outbox
+    op.execute(
+        "INSERT INTO monthly_category_totals (user_id, month, category_id, type, total, transactions) "
+        "SELECT user_id, date_trunc('month', created_at)::date, category_id, type, SUM(cash), count(*) "
+        "FROM transactions WHERE created_at IS NOT NULL GROUP BY 1, 2, 3, 4"
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_created_at',
+            'transactions',
+            ['user_id', 'created_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_user_created_at',
+            table_name='transactions',
+            postgresql_concurrently=True,
+        )
+    op.drop_table('monthly_totals_dirty')
+    op.drop_table('monthly_category_totals')
@@ -0,0 +1,114 @@
+"""budgets and category spend counters
+
+Revision ID: b4e8a1c7d3f5
+Revises: 9c2d4f6a8e31
+Create Date: 2026-10-19 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8a1c7d3f5'
+down_revision: Union[str, None] = '9c2d4f6a8e31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# DDL зафиксирован в ревизии: изменение функции или триггеров в app/models/budget.py
+# требует новой ревизии, а не правки этой
+TRACK_CATEGORY_SPEND_FUNCTION = """
+CREATE OR REPLACE FUNCTION track_category_spend() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO category_spend AS s (user_id, category_id, month, spent)
+        SELECT user_id, category_id, date_trunc('month', created_at)::date, SUM(cash)
+        FROM new_rows
+        WHERE type = 'expense'
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, category_id, month) DO UPDATE SET spent = s.spent + EXCLUDED.spent;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO category_spend AS s (user_id, category_id, month, spent)
+        SELECT user_id, category_id, date_trunc('month', created_at)::date, -SUM(cash)
+        FROM old_rows
+        WHERE type = 'expense' AND EXISTS (SELECT 1 FROM category c WHERE c.id = old_rows.category_id)
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, category_id, month) DO UPDATE SET spent = s.spent + EXCLUDED.spent;
+    ELSE
+        INSERT INTO category_spend AS s (user_id, category_id, month, spent)
+        SELECT user_id, category_id, month, SUM(delta)
+        FROM (
+            SELECT user_id, category_id, date_trunc('month', created_at)::date AS month, cash AS delta
+            FROM new_rows WHERE type = 'expense'
+            UNION ALL
+            SELECT user_id, category_id, date_trunc('month', created_at)::date, -cash
+            FROM old_rows WHERE type = 'expense'
+        ) d
+        GROUP BY 1, 2, 3
+        HAVING SUM(delta) <> 0
+        ON CONFLICT (user_id, category_id, month) DO UPDATE SET spent = s.spent + EXCLUDED.spent;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+TRACK_CATEGORY_SPEND_TRIGGERS = (
+    "CREATE TRIGGER transactions_spend_insert AFTER INSERT ON transactions "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION track_category_spend()",
+    "CREATE TRIGGER transactions_spend_update AFTER UPDATE ON transactions "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION track_category_spend()",
+    "CREATE TRIGGER transactions_spend_delete AFTER DELETE ON transactions "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION track_category_spend()",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'budgets',
+        sa.Column('id', sa.BigInteger(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('warn_ratio', sa.Float(), nullable=False),
+        sa.Column('category_id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['category.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('user_id', 'category_id', name='uq_budgets_user_category'),
+    )
+    op.create_table(
+        'category_spend',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('category_id', sa.BigInteger(), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'category_id', 'month'),
+    )
+
+    # Триггеры создаются до заполнения, а таблица блокируется от записи на время
+    # заполнения - так ни одна транзакция не пропадет из счетчиков и не посчитается дважды
+    op.execute(TRACK_CATEGORY_SPEND_FUNCTION)
+    op.execute("LOCK TABLE transactions IN SHARE ROW EXCLUSIVE MODE")
+    for trigger_sql in TRACK_CATEGORY_SPEND_TRIGGERS:
+        op.execute(trigger_sql)
+    op.execute(
+        "INSERT INTO category_spend (user_id, category_id, month, spent) "
+        "SELECT user_id, category_id, date_trunc('month', created_at)::date, SUM(cash) "
+        "FROM transactions WHERE type = 'expense' GROUP BY 1, 2, 3"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS transactions_spend_delete ON transactions")
+    op.execute("DROP TRIGGER IF EXISTS transactions_spend_update ON transactions")
+    op.execute("DROP TRIGGER IF EXISTS transactions_spend_insert ON transactions")
+    op.execute("DROP FUNCTION IF EXISTS track_category_spend()")
+    op.drop_table('category_spend')
+    op.drop_table('budgets')
@@ -0,0 +1,47 @@
+"""export jobs registry
+
+Revision ID: c8f2b6d4e1a7
+Revises: a3d9e5f1c7b4
+Create Date: 2026-10-19 23:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8f2b6d4e1a7'
+down_revision: Union[str, None] = 'a3d9e5f1c7b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'export_jobs',
+        sa.Column('id', sa.String(length=64), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('format', sa.String(length=8), nullable=False),
+        sa.Column('delta', sa.Boolean(), nullable=False),
+        sa.Column('status', sa.String(length=16), nullable=False),
+        sa.Column('total_rows', sa.BigInteger(), nullable=True),
+        sa.Column('rows_written', sa.BigInteger(), nullable=False),
+        sa.Column('byte_size', sa.BigInteger(), nullable=True),
+        sa.Column('file_path', sa.String(length=255), nullable=True),
+        sa.Column('error', sa.String(length=1000), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_export_jobs_user_created_at', 'export_jobs', ['user_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_export_jobs_user_created_at', table_name='export_jobs')
+    op.drop_table('export_jobs')
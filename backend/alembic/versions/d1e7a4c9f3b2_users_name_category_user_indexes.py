@@ -0,0 +1,32 @@
+"""indexes for users.name and category.user_id
+
+Revision ID: d1e7a4c9f3b2
+Revises: c8f2b6d4e1a7
+Create Date: 2026-10-20 00:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1e7a4c9f3b2'
+down_revision: Union[str, None] = 'c8f2b6d4e1a7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Без индексов вход (users.name) и список категорий (category.user_id) читали таблицы целиком
+    with op.get_context().autocommit_block():
+        op.create_index('ix_users_name', 'users', ['name'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_category_user_id', 'category', ['user_id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_category_user_id', table_name='category', postgresql_concurrently=True)
+        op.drop_index('ix_users_name', table_name='users', postgresql_concurrently=True)
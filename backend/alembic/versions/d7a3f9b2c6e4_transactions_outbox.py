@@ -0,0 +1,91 @@
+"""transactions and categories outbox
+
+Revision ID: d7a3f9b2c6e4
+Revises: b4e8a1c7d3f5
+Create Date: 2026-10-19 21:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3f9b2c6e4'
+down_revision: Union[str, None] = 'b4e8a1c7d3f5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# DDL зафиксирован в ревизии: изменение функции или триггеров в app/models/outbox.py
+# требует новой ревизии, а не правки этой
+WRITE_OUTBOX_FUNCTION = """
+CREATE OR REPLACE FUNCTION write_outbox() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO outbox (entity, entity_id, user_id, operation, payload)
+        SELECT TG_ARGV[0], o.id, o.user_id, 'delete', to_jsonb(o) FROM old_rows o ORDER BY o.id;
+    ELSE
+        INSERT INTO outbox (entity, entity_id, user_id, operation, payload)
+        SELECT TG_ARGV[0], n.id, n.user_id, lower(TG_OP), to_jsonb(n) FROM new_rows n ORDER BY n.id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+OUTBOX_TRIGGERS = (
+    "CREATE TRIGGER outbox_insert AFTER INSERT ON transactions "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION write_outbox('transaction')",
+    "CREATE TRIGGER outbox_update AFTER UPDATE ON transactions "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION write_outbox('transaction')",
+    "CREATE TRIGGER outbox_delete AFTER DELETE ON transactions "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION write_outbox('transaction')",
+    "CREATE TRIGGER outbox_insert AFTER INSERT ON category "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION write_outbox('category')",
+    "CREATE TRIGGER outbox_update AFTER UPDATE ON category "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION write_outbox('category')",
+    "CREATE TRIGGER outbox_delete AFTER DELETE ON category "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION write_outbox('category')",
+)
+
+OUTBOX_TABLES = ('transactions', 'category')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'outbox',
+        sa.Column('seq', sa.BigInteger(), nullable=False),
+        sa.Column('entity', sa.String(length=32), nullable=False),
+        sa.Column('entity_id', sa.BigInteger(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('operation', sa.String(length=16), nullable=False),
+        sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+        sa.Column('processed_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('seq'),
+    )
+    op.create_index('ix_outbox_pending', 'outbox', ['seq'], unique=False,
+                    postgresql_where=sa.text('processed_at IS NULL'))
+
+    op.execute(WRITE_OUTBOX_FUNCTION)
+    for trigger_sql in OUTBOX_TRIGGERS:
+        op.execute(trigger_sql)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in OUTBOX_TABLES:
+        for trigger in ('outbox_delete', 'outbox_update', 'outbox_insert'):
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+    op.execute("DROP FUNCTION IF EXISTS write_outbox()")
+    op.drop_index('ix_outbox_pending', table_name='outbox', postgresql_where=sa.text('processed_at IS NULL'))
+    op.drop_table('outbox')
@@ -0,0 +1,58 @@
+"""delta export: transactions.updated_at and export watermarks
+
+Revision ID: e2b6c8d4a9f1
+Revises: d7a3f9b2c6e4
+Create Date: 2026-10-19 22:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6c8d4a9f1'
+down_revision: Union[str, None] = 'd7a3f9b2c6e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # now() не volatile: колонка добавляется без перезаписи таблицы
+    op.add_column('transactions', sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+    op.create_table(
+        'export_watermarks',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('exported_at', sa.DateTime(), nullable=False),
+        sa.Column('export_id', sa.String(length=64), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+    op.create_index(
+        'ix_outbox_transaction_deletes', 'outbox', ['user_id', 'created_at'], unique=False,
+        postgresql_where=sa.text("entity = 'transaction' AND operation = 'delete'"),
+    )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_transactions_user_updated_at',
+            'transactions',
+            ['user_id', 'updated_at'],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'ix_transactions_user_updated_at',
+            table_name='transactions',
+            postgresql_concurrently=True,
+        )
+    op.drop_index('ix_outbox_transaction_deletes', table_name='outbox',
+                  postgresql_where=sa.text("entity = 'transaction' AND operation = 'delete'"))
+    op.drop_table('export_watermarks')
+    op.drop_column('transactions', 'updated_at')
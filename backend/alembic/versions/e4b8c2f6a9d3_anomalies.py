@@ -0,0 +1,38 @@
+"""anomalies table for nightly spending anomaly detection
+
+Revision ID: e4b8c2f6a9d3
+Revises: d1e7a4c9f3b2
+Create Date: 2026-10-20 01:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8c2f6a9d3'
+down_revision: Union[str, None] = 'd1e7a4c9f3b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'anomalies',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('category_id', sa.BigInteger(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('median', sa.Float(), nullable=False),
+        sa.Column('ratio', sa.Float(), nullable=False),
+        sa.Column('detected_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('user_id', 'day', 'category_id'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('anomalies')
@@ -0,0 +1,68 @@
+"""platform rollups for admin reports
+
+Revision ID: f5c1a7e3b8d2
+Revises: e2b6c8d4a9f1
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f5c1a7e3b8d2'
+down_revision: Union[str, None] = 'e2b6c8d4a9f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'platform_user_days',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('transactions', sa.Integer(), nullable=False),
+        sa.Column('income', sa.Float(), nullable=False),
+        sa.Column('expense', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'user_id'),
+    )
+    op.create_table(
+        'platform_daily_totals',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('active_users', sa.Integer(), nullable=False),
+        sa.Column('transactions', sa.Integer(), nullable=False),
+        sa.Column('income', sa.Float(), nullable=False),
+        sa.Column('expense', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day'),
+    )
+    op.create_table(
+        'platform_amount_buckets',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('type', sa.String(length=16), nullable=False),
+        sa.Column('bucket', sa.SmallInteger(), nullable=False),
+        sa.Column('transactions', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day', 'type', 'bucket'),
+    )
+    op.create_table(
+        'platform_dirty_days',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.PrimaryKeyConstraint('day'),
+    )
+    # Первичное заполнение делает refresh_platform_rollups: все дни с транзакциями
+    # помечаются устаревшими и пересчитываются пачками в фоне
+    op.execute(
+        "INSERT INTO platform_dirty_days (day) "
+        "SELECT DISTINCT created_at::date FROM transactions WHERE created_at IS NOT NULL"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('platform_dirty_days')
+    op.drop_table('platform_amount_buckets')
+    op.drop_table('platform_daily_totals')
+    op.drop_table('platform_user_days')
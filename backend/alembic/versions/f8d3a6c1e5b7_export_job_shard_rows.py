@@ -0,0 +1,32 @@
+"""per-shard progress of export jobs
+
+Revision ID: f8d3a6c1e5b7
+Revises: e4b8c2f6a9d3
+Create Date: 2026-10-20 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f8d3a6c1e5b7'
+down_revision: Union[str, None] = 'e4b8c2f6a9d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'export_jobs',
+        sa.Column('shard_rows', postgresql.JSONB(), server_default=sa.text("'{}'::jsonb"), nullable=False),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('export_jobs', 'shard_rows')
@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 from dotenv import load_dotenv
 from pydantic import SecretStr, EmailStr
 from pydantic_settings import BaseSettings
@@ -16,6 +17,36 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     CACHE_TTL: int = 50000
 
+    REDIS_URL: str = "redis://redis:6379/2"
+    REDIS_TIMEOUT: float = 0.5
+
+    FAST_JSON_RESPONSES: bool = True
+
+    CATEGORY_CACHE_TTL: float = 60
+    CATEGORY_CACHE_MAX_USERS: int = 10000
+
+    # Токен-бакеты на пользователя: "емкость/период в секундах"
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_DEFAULT: str = "120/60"
+    RATE_LIMIT_ANALYTICS: str = "30/60"
+    RATE_LIMIT_EXPORT: str = "5/60"
+    RATE_LIMIT_LOCAL_MAX_KEYS: int = 10000
+
+    # Idempotency-Key: сколько хранится ответ и сколько живет блокировка выполняющегося запроса
+    IDEMPOTENCY_TTL: int = 86400
+    IDEMPOTENCY_LOCK_SECONDS: float = 10
+
+    # Прогноз баланса: окно истории для профиля, максимальный горизонт, время жизни кэша
+    FORECAST_HISTORY_DAYS: int = 365
+    FORECAST_MAX_DAYS: int = 90
+    FORECAST_CACHE_TTL: int = 86400
+
+    # Пробы /ready: таймаут каждой проверки, время жизни кэша результата
+    # и доля занятых соединений пула, после которой инстанс выводится из ротации
+    HEALTH_CHECK_TIMEOUT: float = 1.0
+    HEALTH_CACHE_SECONDS: float = 5
+    HEALTH_POOL_SATURATION: float = 0.9
+
     ASYNC_DATABASE_URL: str = "postgresql+asyncpg://postgres:root@db:5432/financial_trecker_db"
     SYNC_DATABASE_URL: str = "postgresql+psycopg2://postgres:root@db:5432/financial_trecker_db"
     
@@ -25,6 +56,40 @@ class Settings(BaseSettings):
     MAIL_SERVER : str
     MAIL_PORT : int
 
+    EXPORT_DIR: str = "app/static/exports"
+    EXPORT_QUEUE: str = "exports"
+    EXPORT_SHARD_ROWS: int = 50000
+    EXPORT_MAX_SHARDS: int = 16
+    # Экспорты до этого числа строк выполняются в процессе API, без Celery
+    EXPORT_INLINE_MAX_ROWS: int = 5000
+    # Дельта-экспорт повторно выгружает изменения за это время до отметки: так не теряются
+    # строки транзакций, начатых до снимка и закоммиченных после него
+    EXPORT_DELTA_OVERLAP_SECONDS: int = 600
+
+    # Генерация повторяющихся транзакций: правил за один запрос и вхождений на правило за запуск
+    RECURRING_BATCH_SIZE: int = 5000
+    RECURRING_MAX_CATCHUP: int = 400
+
+    # Лента изменений: событий за одну транзакцию разбора и срок хранения обработанных
+    OUTBOX_BATCH_SIZE: int = 1000
+    OUTBOX_RETENTION_DAYS: int = 7
+
+    # Админские сводки: дней за одну транзакцию пересчета и параллельных воркеров на запрос
+    ROLLUP_DAYS_PER_BATCH: int = 31
+    ROLLUP_PARALLEL_WORKERS: int = 4
+    # Месяцев пользователей за один запрос пересчета monthly_category_totals
+    MONTHLY_TOTALS_BATCH_SIZE: int = 2000
+    # Ночной поиск аномалий: расход дня не меньше FACTOR медиан последних WINDOW дней с расходами
+    # (нужно хотя бы MIN_HISTORY таких дней за HISTORY_DAYS); пересчитываются последние DETECT_DAYS дней
+    ANOMALY_FACTOR: float = 3.0
+    ANOMALY_WINDOW: int = 30
+    ANOMALY_MIN_HISTORY: int = 5
+    ANOMALY_HISTORY_DAYS: int = 180
+    ANOMALY_DETECT_DAYS: int = 3
+    ANOMALY_CHUNK_ROWS: int = 50000
+    # Диапазонов user_id, которые обрабатываются параллельными задачами
+    ANOMALY_USER_RANGES: int = 8
+
     class Config:
         env_file = str(env_path)
 
@@ -42,7 +107,8 @@ celery_app = Celery(
     "financial_tracker",
     broker=settings.CELERY_BROKER_URL,
     backend=settings.CELERY_RESULT_BACKEND,
-    include=["app.tasks.export"] ,
+    include=["app.tasks.export", "app.tasks.recurring", "app.tasks.budget", "app.tasks.outbox", "app.tasks.rollups",
+             "app.tasks.anomalies"],
 )
 
 celery_app.conf.update(
@@ -53,7 +119,41 @@ celery_app.conf.update(
     enable_utc=True,
     task_track_started=True,
     task_time_limit=300,
-    
+    # Экспорты уходят в отдельную очередь, чтобы не вытеснять остальные задачи.
+    # Воркер этой очереди запускается с --prefetch-multiplier=1 (см. docker-compose.yml).
+    task_routes={"app.tasks.export.*": {"queue": settings.EXPORT_QUEUE}},
+    # Запускается сервисом celery_beat (см. docker-compose.yml); генерация идемпотентна,
+    # поэтому повторный или пропущенный запуск безопасен
+    beat_schedule={
+        "generate-recurring-transactions": {
+            "task": "app.tasks.recurring.generate_recurring_transactions",
+            "schedule": crontab(minute=0),
+        },
+        "reconcile-category-spend": {
+            "task": "app.tasks.budget.reconcile_category_spend",
+            "schedule": crontab(minute=30, hour=3),
+        },
+        "drain-outbox": {
+            "task": "app.tasks.outbox.drain_outbox",
+            "schedule": 10.0,
+        },
+        "refresh-platform-rollups": {
+            "task": "app.tasks.rollups.refresh_platform_rollups",
+            "schedule": 60.0,
+        },
+        "refresh-monthly-totals": {
+            "task": "app.tasks.rollups.refresh_monthly_totals",
+            "schedule": 60.0,
+        },
+        "purge-outbox": {
+            "task": "app.tasks.outbox.purge_outbox",
+            "schedule": crontab(minute=0, hour=4),
+        },
+        "detect-anomalies": {
+            "task": "app.tasks.anomalies.detect_anomalies",
+            "schedule": crontab(minute=15, hour=2),
+        },
+    },
 )
 
 
@@ -0,0 +1,29 @@
+import redis
+import redis.asyncio as aioredis
+
+from app.db.config import settings
+
+# Клиент ленивый: соединение открывается при первой команде.
+# Короткие таймауты, чтобы недоступный Redis не тормозил запросы - вызывающий код деградирует без кэша.
+redis_client = aioredis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_connect_timeout=settings.REDIS_TIMEOUT,
+    socket_timeout=settings.REDIS_TIMEOUT,
+)
+
+# Брокер Celery: используется только для диагностики глубины очередей в /ready
+broker_client = aioredis.from_url(
+    settings.CELERY_BROKER_URL,
+    decode_responses=True,
+    socket_connect_timeout=settings.REDIS_TIMEOUT,
+    socket_timeout=settings.REDIS_TIMEOUT,
+)
+
+# Синхронный клиент для Celery-задач
+sync_redis_client = redis.Redis.from_url(
+    settings.REDIS_URL,
+    decode_responses=True,
+    socket_connect_timeout=settings.REDIS_TIMEOUT,
+    socket_timeout=settings.REDIS_TIMEOUT,
+)
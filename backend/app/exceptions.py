@@ -21,4 +21,4 @@ async def database_exception_handler(request: Request, exc: DatabaseException):
     return JSONResponse(status_code=500, content={"detail": exc.detail})
 
 async def http_exception_handler(request: Request, exc: HTTPException):
-    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail})
\ No newline at end of file
+    return JSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=exc.headers)
\ No newline at end of file
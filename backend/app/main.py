@@ -1,12 +1,19 @@
-from webbrowser import get
+import os
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException
 from fastapi.staticfiles import StaticFiles
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.db.config import settings
+from app.routes.admin import admin_router
 from app.routes.auth import auth_router
+from app.routes.budget import budgets_router
 from app.routes.transactions import transactions_router
 from app.routes.category import categories_router
 from app.routes.export import export_router
-from fastapi import FastAPI, HTTPException
-from sqlalchemy.exc import SQLAlchemyError
+from app.routes.health import health_router
+from app.routes.recurring import recurring_router
 from app.exceptions import (
     sqlalchemy_exception_handler,
     database_exception_handler,
@@ -14,12 +21,24 @@ from app.exceptions import (
     DatabaseException,
 )
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Папку создаем при старте, а не при импорте; задачи экспорта создают ее и сами
+    os.makedirs(settings.EXPORT_DIR, exist_ok=True)
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
 app.include_router(auth_router)
 app.include_router(transactions_router)
 app.include_router(categories_router)
 app.include_router(export_router)
-app.mount("/static/exports", StaticFiles(directory="app/static/exports"), name="exports")
+app.include_router(recurring_router)
+app.include_router(budgets_router)
+app.include_router(health_router)
+app.include_router(admin_router)
+app.mount("/static/exports", StaticFiles(directory=settings.EXPORT_DIR, check_dir=False), name="exports")
 
 
 app.add_exception_handler(SQLAlchemyError, sqlalchemy_exception_handler)
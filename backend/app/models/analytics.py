@@ -0,0 +1,47 @@
+from datetime import date, datetime
+
+from sqlalchemy import BigInteger, Date, DateTime, Enum, Float, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.schemas.transaction_schema import TransactionType
+
+
+class MonthlyCategoryTotal(Base):
+    """
+    Сумма и число транзакций пользователя за месяц по категории и типу.
+    Аналитика читает отсюда закрытые месяцы; пересчет - app.tasks.rollups.refresh_monthly_totals.
+    """
+    __tablename__ = "monthly_category_totals"
+
+    # Порядок ключа: выборка пользователя за диапазон месяцев идет по префиксу индекса
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    category_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    type: Mapped[TransactionType] = mapped_column(Enum(TransactionType), primary_key=True)
+    total: Mapped[float] = mapped_column(Float, nullable=False)
+    transactions: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class MonthlyTotalsDirty(Base):
+    """Месяцы пользователей, строки которых устарели. Заполняется подписчиком outbox."""
+    __tablename__ = "monthly_totals_dirty"
+
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+
+
+class Anomaly(Base):
+    """
+    Необычный дневной расход пользователя по категории: amount не меньше ANOMALY_FACTOR
+    медиан предыдущих дней с расходами. Заполняется app.tasks.anomalies.detect_anomalies.
+    """
+    __tablename__ = "anomalies"
+
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    category_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    median: Mapped[float] = mapped_column(Float, nullable=False)
+    ratio: Mapped[float] = mapped_column(Float, nullable=False)
+    detected_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
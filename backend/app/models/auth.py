@@ -1,5 +1,4 @@
 from typing import List
-from unittest.util import _MAX_LENGTH
 from sqlalchemy import BigInteger, String, DateTime
 from sqlalchemy.orm import relationship
 from app.models.transactions import Transaction
@@ -12,7 +11,8 @@ class User(Base):
     __tablename__ = "users"
 
     id : Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True)
-    name : Mapped[str] = mapped_column(String(50), nullable=False)
+    # Вход и регистрация ищут пользователя по имени
+    name : Mapped[str] = mapped_column(String(50), nullable=False, index=True)
     email : Mapped[str] = mapped_column(String(255), nullable=True, unique=True)
     hashed_password: Mapped[str] = mapped_column(String(255), nullable=False)
     is_active: Mapped[bool] = mapped_column(default=True)
@@ -0,0 +1,95 @@
+from datetime import date
+
+from sqlalchemy import DDL, BigInteger, Date, Float, ForeignKey, UniqueConstraint, event
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.models.transactions import Transaction
+
+
+class Budget(Base):
+    """Месячный лимит расходов пользователя по категории."""
+    __tablename__ = "budgets"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    amount: Mapped[float] = mapped_column(Float, nullable=False)
+    # Доля лимита, после которой статус бюджета становится warning
+    warn_ratio: Mapped[float] = mapped_column(Float, nullable=False, default=0.8)
+
+    category_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("category.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "category_id", name="uq_budgets_user_category"),
+    )
+
+
+class CategorySpend(Base):
+    """
+    Счетчик расходов за месяц по (пользователь, категория). Ведется триггерами
+    на transactions в той же транзакции, что и запись; расхождения чинит
+    задача reconcile_category_spend. Внешних ключей нет: строки удаляются вместе с категорией.
+    """
+    __tablename__ = "category_spend"
+
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    category_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    month: Mapped[date] = mapped_column(Date, primary_key=True)
+    spent: Mapped[float] = mapped_column(Float, nullable=False, default=0)
+
+
+# Триггеры уровня оператора с переходными таблицами: пачка строк (batch-операции,
+# генерация повторяющихся транзакций) дает одну агрегированную вставку в счетчики.
+# Считаются только расходы; изменение суммы, типа, категории или даты дает пару дельт.
+# Удаление транзакций вместе с категорией пропускается - ее счетчики удаляются тем же запросом.
+TRACK_CATEGORY_SPEND_FUNCTION = """
+CREATE OR REPLACE FUNCTION track_category_spend() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO category_spend AS s (user_id, category_id, month, spent)
+        SELECT user_id, category_id, date_trunc('month', created_at)::date, SUM(cash)
+        FROM new_rows
+        WHERE type = 'expense'
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, category_id, month) DO UPDATE SET spent = s.spent + EXCLUDED.spent;
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO category_spend AS s (user_id, category_id, month, spent)
+        SELECT user_id, category_id, date_trunc('month', created_at)::date, -SUM(cash)
+        FROM old_rows
+        WHERE type = 'expense' AND EXISTS (SELECT 1 FROM category c WHERE c.id = old_rows.category_id)
+        GROUP BY 1, 2, 3
+        ON CONFLICT (user_id, category_id, month) DO UPDATE SET spent = s.spent + EXCLUDED.spent;
+    ELSE
+        INSERT INTO category_spend AS s (user_id, category_id, month, spent)
+        SELECT user_id, category_id, month, SUM(delta)
+        FROM (
+            SELECT user_id, category_id, date_trunc('month', created_at)::date AS month, cash AS delta
+            FROM new_rows WHERE type = 'expense'
+            UNION ALL
+            SELECT user_id, category_id, date_trunc('month', created_at)::date, -cash
+            FROM old_rows WHERE type = 'expense'
+        ) d
+        GROUP BY 1, 2, 3
+        HAVING SUM(delta) <> 0
+        ON CONFLICT (user_id, category_id, month) DO UPDATE SET spent = s.spent + EXCLUDED.spent;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+TRACK_CATEGORY_SPEND_TRIGGERS = (
+    "CREATE TRIGGER transactions_spend_insert AFTER INSERT ON transactions "
+    "REFERENCING NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION track_category_spend()",
+    "CREATE TRIGGER transactions_spend_update AFTER UPDATE ON transactions "
+    "REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION track_category_spend()",
+    "CREATE TRIGGER transactions_spend_delete AFTER DELETE ON transactions "
+    "REFERENCING OLD TABLE AS old_rows "
+    "FOR EACH STATEMENT EXECUTE FUNCTION track_category_spend()",
+)
+
+event.listen(Transaction.__table__, "after_create", DDL(TRACK_CATEGORY_SPEND_FUNCTION))
+for trigger_sql in TRACK_CATEGORY_SPEND_TRIGGERS:
+    event.listen(Transaction.__table__, "after_create", DDL(trigger_sql))
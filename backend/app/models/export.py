@@ -0,0 +1,50 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import BigInteger, Boolean, DateTime, ForeignKey, Index, String, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+
+class ExportWatermark(Base):
+    """
+    Отметка последнего завершенного CSV-экспорта пользователя: время БД, на котором
+    был снят снимок. Дельта-экспорт выгружает изменения после этой отметки.
+    """
+    __tablename__ = "export_watermarks"
+
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), primary_key=True)
+    exported_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    export_id: Mapped[str] = mapped_column(String(64), nullable=False)
+
+
+class ExportJob(Base):
+    """
+    Задача экспорта: создается API при запуске, состояние и прогресс пишет сама задача.
+    id совпадает с task_id, который возвращает POST /api/export/.
+    """
+    __tablename__ = "export_jobs"
+
+    id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), nullable=False)
+    format: Mapped[str] = mapped_column(String(8), nullable=False)
+    delta: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    # pending - в очереди или выполняется (см. started_at), completed, failed
+    status: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    total_rows: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    rows_written: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+    # Вклад каждого шарда в rows_written ({"индекс": строк}): повторно доставленный шард
+    # сначала вычитает свой прошлый вклад, поэтому строки не считаются дважды
+    shard_rows: Mapped[dict] = mapped_column(JSONB, nullable=False, default=dict, server_default=text("'{}'::jsonb"))
+    byte_size: Mapped[Optional[int]] = mapped_column(BigInteger, nullable=True)
+    file_path: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    error: Mapped[Optional[str]] = mapped_column(String(1000), nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_export_jobs_user_created_at", "user_id", "created_at"),
+    )
@@ -0,0 +1,82 @@
+from datetime import datetime
+
+from sqlalchemy import DDL, BigInteger, DateTime, Index, String, event, func, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+from app.models.transactions import Category, Transaction
+
+
+class Outbox(Base):
+    """
+    Лента изменений: строка на каждую вставку, изменение и удаление транзакции или категории.
+    Пишется триггерами в той же транзакции БД, что и само изменение; seq возрастает монотонно.
+    Разбирается задачей app.tasks.outbox.drain_outbox.
+    """
+    __tablename__ = "outbox"
+
+    seq: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    entity: Mapped[str] = mapped_column(String(32), nullable=False)
+    entity_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    operation: Mapped[str] = mapped_column(String(16), nullable=False)
+    # Строка после изменения, для удаления - последнее состояние
+    payload: Mapped[dict] = mapped_column(JSONB, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+    processed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # Очередь необработанных событий остается маленькой независимо от истории
+        Index("ix_outbox_pending", "seq", postgresql_where=text("processed_at IS NULL")),
+        # Удаления транзакций пользователя для дельта-экспорта
+        Index(
+            "ix_outbox_transaction_deletes",
+            "user_id",
+            "created_at",
+            postgresql_where=text("entity = 'transaction' AND operation = 'delete'"),
+        ),
+    )
+
+
+# Триггеры уровня оператора: одна вставка в outbox на оператор, даже для batch-операций.
+# Имя сущности передается аргументом триггера.
+WRITE_OUTBOX_FUNCTION = """
+CREATE OR REPLACE FUNCTION write_outbox() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO outbox (entity, entity_id, user_id, operation, payload)
+        SELECT TG_ARGV[0], o.id, o.user_id, 'delete', to_jsonb(o) FROM old_rows o ORDER BY o.id;
+    ELSE
+        INSERT INTO outbox (entity, entity_id, user_id, operation, payload)
+        SELECT TG_ARGV[0], n.id, n.user_id, lower(TG_OP), to_jsonb(n) FROM new_rows n ORDER BY n.id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+
+def outbox_triggers(table: str, entity: str):
+    return (
+        f"CREATE TRIGGER outbox_insert AFTER INSERT ON {table} "
+        f"REFERENCING NEW TABLE AS new_rows "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION write_outbox('{entity}')",
+        f"CREATE TRIGGER outbox_update AFTER UPDATE ON {table} "
+        f"REFERENCING NEW TABLE AS new_rows "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION write_outbox('{entity}')",
+        f"CREATE TRIGGER outbox_delete AFTER DELETE ON {table} "
+        f"REFERENCING OLD TABLE AS old_rows "
+        f"FOR EACH STATEMENT EXECUTE FUNCTION write_outbox('{entity}')",
+    )
+
+
+OUTBOX_TRIGGERS = {
+    "transactions": outbox_triggers("transactions", "transaction"),
+    "category": outbox_triggers("category", "category"),
+}
+
+for model in (Transaction, Category):
+    event.listen(model.__table__, "after_create", DDL(WRITE_OUTBOX_FUNCTION))
+    for trigger_sql in OUTBOX_TRIGGERS[model.__tablename__]:
+        event.listen(model.__table__, "after_create", DDL(trigger_sql))
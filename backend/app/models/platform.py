@@ -0,0 +1,51 @@
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, Float, Integer, SmallInteger, String
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db.base import Base
+
+# Сводки по всей платформе для админских отчетов. Запросы API читают только их;
+# пересчет по transactions делает задача app.tasks.rollups.refresh_platform_rollups.
+
+
+class PlatformUserDay(Base):
+    """Активность пользователя за день: из нее считаются активные пользователи за любой период."""
+    __tablename__ = "platform_user_days"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    transactions: Mapped[int] = mapped_column(Integer, nullable=False)
+    income: Mapped[float] = mapped_column(Float, nullable=False)
+    expense: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class PlatformDailyTotals(Base):
+    __tablename__ = "platform_daily_totals"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    active_users: Mapped[int] = mapped_column(Integer, nullable=False)
+    transactions: Mapped[int] = mapped_column(Integer, nullable=False)
+    income: Mapped[float] = mapped_column(Float, nullable=False)
+    expense: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class PlatformAmountBucket(Base):
+    """
+    Распределение сумм транзакций за день по типу: bucket 0 - суммы меньше 1,
+    bucket k - от 10^(k-1) до 10^k.
+    """
+    __tablename__ = "platform_amount_buckets"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    type: Mapped[str] = mapped_column(String(16), primary_key=True)
+    bucket: Mapped[int] = mapped_column(SmallInteger, primary_key=True)
+    transactions: Mapped[int] = mapped_column(Integer, nullable=False)
+    total: Mapped[float] = mapped_column(Float, nullable=False)
+
+
+class PlatformDirtyDay(Base):
+    """Дни, сводки которых устарели. Заполняется подписчиком outbox, разбирается пересчетом."""
+    __tablename__ = "platform_dirty_days"
+
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
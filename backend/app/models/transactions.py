@@ -1,8 +1,14 @@
-from sqlalchemy import BigInteger, Enum, Float, ForeignKey, String, DateTime
+from typing import Optional
+
+from sqlalchemy import (
+    DDL, BigInteger, Boolean, Date, Enum, Float, ForeignKey, Index, Integer, String, DateTime,
+    UniqueConstraint, event, func, text,
+)
 from sqlalchemy.orm import relationship
 from app.db.base import Base
 from sqlalchemy.orm import Mapped, mapped_column
-from datetime import datetime
+from datetime import date, datetime
+from app.schemas.recurring_schema import RecurrencePeriod
 from app.schemas.transaction_schema import TransactionType
 
 class Transaction(Base):
@@ -13,6 +19,10 @@ class Transaction(Base):
     cash: Mapped[float] = mapped_column(Float, nullable=False)
     type : Mapped[TransactionType] = mapped_column(Enum(TransactionType), nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, index=True)
+    # Время последней записи по часам БД - по нему дельта-экспорт находит новые и измененные строки
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, nullable=False, server_default=func.now(), onupdate=func.now()
+    )
 
     category_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("category.id"), nullable=False, index=True)
     category = relationship("Category", back_populates="transactions")
@@ -20,6 +30,33 @@ class Transaction(Base):
     user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), nullable=False, index=True)
     user = relationship("User", back_populates="transactions")
 
+    # Транзакции, созданные правилом повторения: пара (правило, дата) уникальна,
+    # поэтому повторный запуск генерации не создает дублей
+    recurring_id: Mapped[Optional[int]] = mapped_column(
+        BigInteger, ForeignKey("recurring_transactions.id", ondelete="SET NULL"), nullable=True
+    )
+    occurrence_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("recurring_id", "occurrence_date", name="uq_transactions_recurring_occurrence"),
+        # Поиск подстроки по названию в пределах пользователя: btree_gin позволяет
+        # положить user_id и триграммы title в один GIN-индекс
+        Index(
+            "ix_transactions_user_title_trgm",
+            "user_id",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ),
+        Index("ix_transactions_user_updated_at", "user_id", "updated_at"),
+        # Выборка пользователя за период: текущий месяц аналитики, границы диапазонов
+        Index("ix_transactions_user_created_at", "user_id", "created_at"),
+    )
+
+
+event.listen(Transaction.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+event.listen(Transaction.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS btree_gin"))
+
 
 class Category(Base):
     __tablename__ = "category"
@@ -27,7 +64,37 @@ class Category(Base):
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True, index=True,unique=True)
     title: Mapped[str] = mapped_column(String(50), nullable=False, unique=True)
 
-    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), nullable=False, index=True)
     user = relationship("User", back_populates="categories")
 
-    transactions = relationship("Transaction", back_populates="category", cascade="all, delete")
\ No newline at end of file
+    transactions = relationship("Transaction", back_populates="category", cascade="all, delete")
+
+
+class RecurringTransaction(Base):
+    """
+    Правило повторения: транзакция на start_date + k * every периодов, k = 0, 1, ...
+    next_index - номер следующего вхождения, next_run_on - его дата.
+    """
+    __tablename__ = "recurring_transactions"
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    title: Mapped[str] = mapped_column(String(50), nullable=False)
+    cash: Mapped[float] = mapped_column(Float, nullable=False)
+    type: Mapped[TransactionType] = mapped_column(Enum(TransactionType), nullable=False)
+    period: Mapped[RecurrencePeriod] = mapped_column(Enum(RecurrencePeriod), nullable=False)
+    every: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    start_date: Mapped[date] = mapped_column(Date, nullable=False)
+    end_date: Mapped[Optional[date]] = mapped_column(Date, nullable=True)
+    next_index: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    next_run_on: Mapped[date] = mapped_column(Date, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, nullable=False, default=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    category_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("category.id"), nullable=False, index=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.id"), nullable=False, index=True)
+
+    __table_args__ = (
+        # Планировщик читает только активные правила со сроком до сегодня:
+        # частичный индекс остается маленьким при миллионах завершенных правил
+        Index("ix_recurring_transactions_due", "next_run_on", postgresql_where=text("is_active")),
+    )
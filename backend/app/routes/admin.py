@@ -0,0 +1,60 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_async_session
+from app.schemas.admin_schema import AmountDistributionOut, PlatformDayOut, PlatformSummaryOut
+from app.services.admin import get_amount_distribution, get_platform_daily, get_platform_summary
+from app.services.auth import get_current_superuser
+
+admin_router = APIRouter(
+    prefix="/admin",
+    tags=["admin"],
+    dependencies=[Depends(get_current_superuser)],
+)
+
+
+@admin_router.get(
+    '/stats/summary',
+    response_model=PlatformSummaryOut,
+    summary="Итоги платформы за период",
+    description=(
+        "Только для суперпользователей. Активные пользователи, число транзакций, доходы и расходы "
+        "по всем пользователям за период (по умолчанию - последние 30 дней). Данные берутся из сводок, "
+        "которые фоновая задача обновляет раз в минуту; `pending_days` - дни, ожидающие пересчета.")
+)
+async def platform_summary_route(
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        session: AsyncSession = Depends(get_async_session)):
+    return await get_platform_summary(session=session, date_from=date_from, date_to=date_to)
+
+
+@admin_router.get(
+    '/stats/daily',
+    response_model=List[PlatformDayOut],
+    summary="Объем транзакций по дням",
+    description="Только для суперпользователей. Активные пользователи и объем транзакций за каждый день периода."
+)
+async def platform_daily_route(
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        session: AsyncSession = Depends(get_async_session)):
+    return await get_platform_daily(session=session, date_from=date_from, date_to=date_to)
+
+
+@admin_router.get(
+    '/stats/distribution',
+    response_model=AmountDistributionOut,
+    summary="Распределение сумм доходов и расходов",
+    description=(
+        "Только для суперпользователей. Число и сумма транзакций каждого типа по десятичным порядкам "
+        "суммы: меньше 1, 1-10, 10-100 и т.д.")
+)
+async def amount_distribution_route(
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        session: AsyncSession = Depends(get_async_session)):
+    return await get_amount_distribution(session=session, date_from=date_from, date_to=date_to)
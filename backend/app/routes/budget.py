@@ -0,0 +1,76 @@
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Path
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_async_session
+from app.models.auth import User
+from app.schemas.budget_schema import BudgetSet, BudgetStatusOut
+from app.services.auth import get_current_user
+from app.services.budget import delete_budget, get_budget_status, get_budgets, set_budget
+from app.services.rate_limit import rate_limit
+
+budgets_router = APIRouter(
+    prefix="/budgets",
+    tags=["budgets"],
+    dependencies=[Depends(rate_limit("default"))],
+)
+
+
+@budgets_router.put(
+    '/{category_id}',
+    response_model=BudgetStatusOut,
+    summary="Установить бюджет категории",
+    description=(
+        "Создает или обновляет месячный лимит расходов по категории. "
+        "`warn_ratio` - доля лимита, после которой статус становится `warning`.")
+)
+async def set_budget_route(
+        budget: BudgetSet,
+        category_id: int = Path(..., ge=1),
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await set_budget(budget=budget, user=user, session=session, category_id=category_id)
+
+
+@budgets_router.get(
+    '/',
+    response_model=List[BudgetStatusOut],
+    summary="Бюджеты пользователя",
+    description="Возвращает все бюджеты со статусом за месяц указанной даты, по умолчанию - за текущий месяц."
+)
+async def get_budgets_route(
+        month: Optional[date] = None,
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await get_budgets(user=user, session=session, month=month)
+
+
+@budgets_router.get(
+    '/{category_id}',
+    response_model=BudgetStatusOut,
+    summary="Статус бюджета категории",
+    description=(
+        "Возвращает лимит, расход и остаток по категории за месяц указанной даты "
+        "(по умолчанию - текущий месяц) и статус: `ok`, `warning` или `exceeded`.")
+)
+async def get_budget_status_route(
+        category_id: int = Path(..., ge=1),
+        month: Optional[date] = None,
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await get_budget_status(user=user, session=session, category_id=category_id, month=month)
+
+
+@budgets_router.delete(
+    '/{category_id}',
+    response_model=dict,
+    summary="Удалить бюджет категории",
+    description="Удаляет лимит по категории. Счетчики расходов сохраняются."
+)
+async def delete_budget_route(
+        category_id: int = Path(..., ge=1),
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await delete_budget(user=user, session=session, category_id=category_id)
@@ -1,11 +1,14 @@
 from typing import List
-from fastapi import APIRouter, Path, status, Depends
+from fastapi import APIRouter, Path, Request, Response, status, Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.auth import User
 from app.schemas.category_schema import CategoryBase,CategoryOut
 from app.services.auth import get_current_user
 from app.db.database import get_async_session
+from app.services.cache import check_etag
+from app.services.rate_limit import rate_limit
+from app.services.serialization import fast_json_response
 from app.services.category import (
     create_category,
     delete_category,
@@ -14,7 +17,11 @@ from app.services.category import (
     update_category,
 )
 
-categories_router = APIRouter(prefix="/categories", tags=["categories"])
+categories_router = APIRouter(
+    prefix="/categories",
+    tags=["categories"],
+    dependencies=[Depends(rate_limit("default"))],
+)
 
 @categories_router.post(
     '/',
@@ -78,6 +85,11 @@ async def get_category_route(
     description="Возвращает список всех категорий, созданных текущим пользователем."
 )
 async def get_all_categories_route(
+        request: Request,
+        response: Response,
         user: User = Depends(get_current_user),
         session: AsyncSession = Depends(get_async_session)):
-    return await get_all_category(user=user, session=session)
\ No newline at end of file
+    not_modified = await check_etag(request, response, user.id)
+    if not_modified:
+        return not_modified
+    return fast_json_response(await get_all_category(user=user, session=session), response)
\ No newline at end of file
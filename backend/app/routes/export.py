@@ -1,11 +1,14 @@
 import logging
-from fastapi import APIRouter, Depends
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.database import get_async_session
 from app.models.auth import User
 from app.services.auth import get_current_user
-from app.tasks.export import export_transactions_to_csv
-from app.db.config import celery_app
-from celery.result import AsyncResult
+from app.services.rate_limit import rate_limit
+from app.schemas.export_schema import ExportFormat, ExportJobOut
+from app.services.export import get_export_job, list_export_jobs, start_csv_export, start_xlsx_export
 
 export_router = APIRouter(prefix="/api/export", tags=["Export"])
 
@@ -14,39 +17,65 @@ logger = logging.getLogger(__name__)
 
 @export_router.post(
     "/",
+    dependencies=[Depends(rate_limit("export"))],
     response_class=JSONResponse,
     summary="Запуск задачи экспорта транзакций",
     description=(
-        "Запускает фоновую задачу экспорта всех транзакций пользователя в CSV-файл. "
-        "После завершения задачи можно получить ссылку на файл через эндпоинт `/export/status/{task_id}`."
+        "Запускает фоновую задачу экспорта всех транзакций пользователя в CSV-файл "
+        "или в XLSX-отчет с листами транзакций, помесячной сводки и сводки по категориям. "
+        "Небольшие CSV-экспорты выполняются сразу в процессе API, большие - в очереди Celery. "
+        "С `delta=true` CSV содержит только транзакции, созданные или измененные после прошлого "
+        "экспорта (op=upsert), и удаленные за это время (op=delete); без предыдущего экспорта "
+        "выгружается вся история. "
+        "Состояние и прогресс задачи доступны через `/export/status/{task_id}`, список экспортов - через `/export/jobs`."
     ),
 )
-async def export_csv(current_user: User = Depends(get_current_user)):
-    task = export_transactions_to_csv.delay(current_user.id)
+async def export_csv(
+    format: ExportFormat = ExportFormat.csv,
+    delta: bool = False,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    if format == ExportFormat.xlsx:
+        if delta:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Delta export is only available for CSV")
+        task_id = await start_xlsx_export(user_id=current_user.id, session=session)
+    else:
+        task_id = await start_csv_export(user_id=current_user.id, session=session, delta=delta)
 
-    logger.info("export {task.id} start from user {current_user.id}")
+    logger.info("export %s start from user %d", task_id, current_user.id)
 
-    return {"task_id": task.id, "detail": "Экспорт запущен"}
+    return {"task_id": task_id, "detail": "Экспорт запущен"}
 
 
 @export_router.get(
     "/status/{task_id}",
-    response_class=JSONResponse,
+    response_model=ExportJobOut,
     summary="Проверка статуса задачи экспорта",
     description=(
-        "Позволяет узнать статус фоново выполняемой задачи экспорта транзакций в CSV. "
-        "Если задача завершена успешно, возвращается ссылка на файл. "
-        "Иначе — текущий статус: PENDING, STARTED, FAILURE и др."
+        "Возвращает состояние задачи экспорта текущего пользователя: статус (pending, completed, failed), "
+        "число записанных строк и прогресс, размер файла и ссылку на него после завершения. "
+        "Состояние пишет сама задача в таблицу export_jobs, эндпоинт не обращается к Celery. "
+        "Чужая задача - 403, неизвестная - 404."
     ),)
-async def get_export_status(task_id: str):
-    result = AsyncResult(task_id, app=celery_app)
-    
-    if result.state == "PENDING":
-        return {"status": "pending"}
-    elif result.state == "SUCCESS":
-        return {"status": "completed", "file_url": result.result}
-    elif result.state == "FAILURE":
-        return {"status": "failed", "error": str(result.result)}
-    else:
-        return {"status": result.state}
+async def get_export_status(
+    task_id: str,
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    return await get_export_job(task_id=task_id, user_id=current_user.id, session=session)
 
+
+@export_router.get(
+    "/jobs",
+    response_model=List[ExportJobOut],
+    summary="Мои экспорты",
+    description="Список задач экспорта текущего пользователя от новых к старым, с пагинацией limit/offset.",
+)
+async def get_my_exports(
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    current_user: User = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session),
+):
+    return await list_export_jobs(user_id=current_user.id, session=session, limit=limit, offset=offset)
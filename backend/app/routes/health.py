@@ -0,0 +1,32 @@
+from fastapi import APIRouter, Depends, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_async_session
+from app.services.health import readiness
+
+health_router = APIRouter(tags=["health"])
+
+
+@health_router.get(
+    "/health",
+    summary="Проверка живости",
+    description="Отвечает, пока процесс обслуживает запросы. Зависимости не проверяет.",
+)
+async def health():
+    return {"status": "ok"}
+
+
+@health_router.get(
+    "/ready",
+    summary="Проверка готовности",
+    description=(
+        "Проверяет БД (SELECT 1 с коротким таймаутом), Redis, глубину очередей Celery "
+        "и занятость пула соединений. Результат кэшируется на несколько секунд. "
+        "Возвращает 503, если БД недоступна или пул насыщен."
+    ),
+)
+async def ready(session: AsyncSession = Depends(get_async_session)):
+    result = await readiness(session)
+    status_code = status.HTTP_200_OK if result["status"] == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code, content=result)
@@ -0,0 +1,59 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, Path, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.database import get_async_session
+from app.models.auth import User
+from app.schemas.recurring_schema import RecurringCreate, RecurringOut
+from app.services.auth import get_current_user
+from app.services.rate_limit import rate_limit
+from app.services.recurring import create_recurring, delete_recurring, get_recurring
+
+recurring_router = APIRouter(
+    prefix="/recurring",
+    tags=["recurring"],
+    dependencies=[Depends(rate_limit("default"))],
+)
+
+
+@recurring_router.post(
+    '/',
+    response_model=RecurringOut,
+    status_code=status.HTTP_201_CREATED,
+    summary="Создание повторяющейся транзакции",
+    description=(
+        "Создает правило: транзакция повторяется каждые `every` дней, недель или месяцев начиная "
+        "с `start_date` и до `end_date`, если она указана. Транзакции создает планировщик раз в час, "
+        "включая пропущенные даты в прошлом.")
+)
+async def create_recurring_route(
+        rule: RecurringCreate,
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await create_recurring(rule=rule, user=user, session=session)
+
+
+@recurring_router.get(
+    '/',
+    response_model=List[RecurringOut],
+    summary="Список повторяющихся транзакций",
+    description="Возвращает все правила повторения текущего пользователя."
+)
+async def get_recurring_route(
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await get_recurring(user=user, session=session)
+
+
+@recurring_router.delete(
+    '/{rule_id}',
+    response_model=dict,
+    summary="Удаление повторяющейся транзакции",
+    description="Удаляет правило по ID. Уже созданные им транзакции сохраняются."
+)
+async def delete_recurring_route(
+        rule_id: int = Path(..., ge=1),
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await delete_recurring(user=user, session=session, rule_id=rule_id)
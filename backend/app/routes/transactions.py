@@ -1,24 +1,46 @@
 from datetime import date
 
 from typing import List, Optional
-from fastapi import APIRouter, Path, Query, status, Depends
+from fastapi import APIRouter, Header, Path, Query, Request, Response, status, Depends
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.auth import User
-from app.schemas.transaction_schema import SortableTransactionFields, TransactionCreate, TransactionOut, TransactionType, TransactionUpdate
+from app.schemas.transaction_schema import (
+    SortableTransactionFields,
+    TransactionBatchDeleteOut,
+    TransactionBatchIds,
+    TransactionBatchOut,
+    TransactionBatchUpdate,
+    TransactionCreate,
+    TransactionForecastOut,
+    TransactionOut,
+    TransactionSummaryOut,
+    TransactionType,
+    TransactionUpdate,
+)
 from app.services.auth import get_current_user
+from app.db.config import settings
 from app.db.database import get_async_session
+from app.services.cache import check_etag
+from app.services.forecast import forecast_today, get_forecast
+from app.services.idempotency import run_idempotent
+from app.services.rate_limit import rate_limit
+from app.services.serialization import TRANSACTION_FIELDS, fast_json_response
 from app.services.transactions import (
     create_transactions,
     delete_transaction,
+    delete_transactions_batch,
     export_transactions_csv,
     get_analitics_on_category,
     get_analitics_on_month,
     get_balance,
     get_transactions,
+    get_transactions_batch,
     get_one_transaction,
+    get_summary,
     update_transaction,
+    update_transactions_batch,
 )
 
 transactions_router = APIRouter(prefix="/transactions", tags=["transactions"])
@@ -26,35 +48,100 @@ transactions_router = APIRouter(prefix="/transactions", tags=["transactions"])
 
 @transactions_router.post(
     '/',
+    dependencies=[Depends(rate_limit("default"))],
     response_model=TransactionOut,
     status_code=status.HTTP_201_CREATED,
     summary="Создание транзакции",
-    description="Создает новую транзакцию для текущего пользователя. Требуются данные: название, сумма и категория."
+    description="Создает новую транзакцию для текущего пользователя. Требуются данные: название, сумма и категория. "
+                "С заголовком `Idempotency-Key` повтор запроса возвращает первый ответ и не создает дубль."
 )
 async def create_transaction(
+        request: Request,
         transaction: TransactionCreate,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await run_idempotent(
+        request, user.id, idempotency_key, transaction, TransactionOut, status.HTTP_201_CREATED,
+        lambda: create_transactions(transaction=transaction, user=user, session=session),
+    )
+
+
+@transactions_router.post(
+    '/batch/get',
+    dependencies=[Depends(rate_limit("default"))],
+    response_model=TransactionBatchOut,
+    summary="Получить несколько транзакций",
+    description="Возвращает транзакции по списку ID одним запросом. "
+                "Несуществующие и чужие ID перечисляются в `not_found` и `forbidden`."
+)
+async def get_transactions_batch_route(
+        batch: TransactionBatchIds,
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await get_transactions_batch(user=user, session=session, ids=batch.ids)
+
+
+@transactions_router.patch(
+    '/batch',
+    dependencies=[Depends(rate_limit("default"))],
+    response_model=TransactionBatchOut,
+    summary="Массовое обновление транзакций",
+    description="Применяет одно частичное обновление ко всем транзакциям из списка одним UPDATE. "
+                "Несуществующие и чужие ID не изменяются и перечисляются в `not_found` и `forbidden`. "
+                "Поддерживает заголовок `Idempotency-Key`."
+)
+async def update_transactions_batch_route(
+        request: Request,
+        batch: TransactionBatchUpdate,
+        idempotency_key: Optional[str] = Header(None, max_length=255),
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session)):
+    return await run_idempotent(
+        request, user.id, idempotency_key, batch, TransactionBatchOut, status.HTTP_200_OK,
+        lambda: update_transactions_batch(batch=batch, user=user, session=session),
+    )
+
+
+@transactions_router.post(
+    '/batch/delete',
+    dependencies=[Depends(rate_limit("default"))],
+    response_model=TransactionBatchDeleteOut,
+    summary="Массовое удаление транзакций",
+    description="Удаляет транзакции по списку ID одним DELETE. "
+                "Несуществующие и чужие ID перечисляются в `not_found` и `forbidden`."
+)
+async def delete_transactions_batch_route(
+        batch: TransactionBatchIds,
         user: User = Depends(get_current_user),
         session: AsyncSession = Depends(get_async_session)):
-    return await create_transactions(transaction=transaction, user=user, session=session)
+    return await delete_transactions_batch(user=user, session=session, ids=batch.ids)
 
 
 @transactions_router.patch(
     '/{transaction_id}',
+    dependencies=[Depends(rate_limit("default"))],
     response_model=TransactionOut,
     summary="Обновление транзакции",
     description="Обновляет существующую транзакцию по ID. Разрешено частичное обновление. "
-                "Только владелец транзакции может её изменить."
+                "Только владелец транзакции может её изменить. Поддерживает заголовок `Idempotency-Key`."
 )
 async def update_transaction_route(
+        request: Request,
         transaction: TransactionUpdate,
         transaction_id: int = Path(..., ge=1),
+        idempotency_key: Optional[str] = Header(None, max_length=255),
         user: User = Depends(get_current_user),
         session: AsyncSession = Depends(get_async_session)):
-    return await update_transaction(transaction, user, session, transaction_id)
+    return await run_idempotent(
+        request, user.id, idempotency_key, transaction, TransactionOut, status.HTTP_200_OK,
+        lambda: update_transaction(transaction, user, session, transaction_id),
+    )
 
 
 @transactions_router.delete(
     '/{transaction_id}',
+    dependencies=[Depends(rate_limit("default"))],
     response_model=dict,
     status_code=status.HTTP_200_OK,
     summary="Удаление транзакции",
@@ -68,64 +155,136 @@ async def delete_transaction_route(
 
 @transactions_router.get(
     '/analytics',
+    dependencies=[Depends(rate_limit("analytics"))],
     response_model=dict,
     summary="Получить Доходы и расходы на месяц",
     description=(
         "Возвращает месяц, доходы и расходы за месяц ")
 )
 async def get_analitics_on_month_route(
-    year: int, 
-    month: int,
+    request: Request,
+    response: Response,
+    # month_range строит и начало следующего месяца, поэтому год не больше 9998
+    year: int = Query(..., ge=1, le=9998),
+    month: int = Query(..., ge=1, le=12),
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_session),
 
     ):
-    return await get_analitics_on_month(user,session,year,month)
+    not_modified = await check_etag(request, response, user.id)
+    if not_modified:
+        return not_modified
+    return fast_json_response(await get_analitics_on_month(user,session,year,month), response)
 
 @transactions_router.get(
     '/category_analytics',
+    dependencies=[Depends(rate_limit("analytics"))],
     response_model=dict,
     summary="Получить Доходы и расходы по категории",
     description=(
         "Возвращает доходы и расходы по категории, если сроки не указаны, считает за весь период")
 )
 async def get_analitics_on_category_route(
+    request: Request,
+    response: Response,
     category_id: int,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     user: User= Depends(get_current_user), 
     session: AsyncSession = Depends(get_async_session),
     ):
-
-    return await get_analitics_on_category(user,session,start_date,end_date,category_id)
+    not_modified = await check_etag(request, response, user.id)
+    if not_modified:
+        return not_modified
+    return fast_json_response(
+        await get_analitics_on_category(user,session,start_date,end_date,category_id), response
+    )
 
 @transactions_router.get(
     '/balance',
+    dependencies=[Depends(rate_limit("analytics"))],
     response_model=int,
     summary="Получить баланс",
     description=(
         "Возвращает число - баланс на указанную дату, если дата не указана то считается на текущий день")
 )
 async def get_balance_route(
+        request: Request,
+        response: Response,
         user: User = Depends(get_current_user),
         session: AsyncSession = Depends(get_async_session),
         current_date: Optional[date] = None,    
         ):
-    
+    not_modified = await check_etag(request, response, user.id)
+    if not_modified:
+        return not_modified
     return await get_balance(user,session,current_date)
     
 
+@transactions_router.get(
+    '/summary',
+    dependencies=[Depends(rate_limit("analytics"))],
+    response_model=TransactionSummaryOut,
+    summary="Сводка для дашборда",
+    description=(
+        "Возвращает одним запросом баланс на дату, доходы и расходы за месяц этой даты "
+        "и, если указана категория, доходы и расходы по ней. Дата по умолчанию - текущий день")
+)
+async def get_summary_route(
+        request: Request,
+        response: Response,
+        current_date: Optional[date] = None,
+        category_id: Optional[int] = None,
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session),
+        ):
+    # Без current_date сводка строится на сегодня: с новым днем меняется и ETag
+    current_date = current_date or date.today()
+    not_modified = await check_etag(request, response, user.id, salt=current_date.isoformat())
+    if not_modified:
+        return not_modified
+    return await get_summary(user=user, session=session, current_date=current_date, category_id=category_id)
+
+
+@transactions_router.get(
+    '/forecast',
+    dependencies=[Depends(rate_limit("analytics"))],
+    response_model=TransactionForecastOut,
+    summary="Прогноз баланса",
+    description=(
+        "Возвращает прогноз баланса на `days` дней вперед (до 90) по дням. Прогноз учитывает "
+        "регулярность истории за последний год по дням месяца и недели, активные правила повторения "
+        "и уже внесенные будущие транзакции. Результат кэшируется до следующего изменения данных")
+)
+async def get_forecast_route(
+        request: Request,
+        response: Response,
+        days: int = Query(30, ge=1, le=settings.FORECAST_MAX_DAYS),
+        user: User = Depends(get_current_user),
+        session: AsyncSession = Depends(get_async_session),
+        ):
+    # Прогноз начинается с завтрашнего дня: с новым днем меняется и ETag
+    not_modified = await check_etag(request, response, user.id, salt=forecast_today().isoformat())
+    if not_modified:
+        return not_modified
+    return fast_json_response(await get_forecast(user=user, session=session, days=days), response)
+
+
 @transactions_router.get(
     '/',
+    dependencies=[Depends(rate_limit("default"))],
     response_model=List[TransactionOut],
     summary="Получить список транзакций",
     description=(
         "Возвращает список транзакций пользователя с возможностью фильтрации по:\n"
         "- типу транзакции (`income` или `expense`)\n"
-        "- диапазону дат (`start_date`, `end_date`)\n\n"
+        "- диапазону дат (`start_date`, `end_date`)\n"
+        "- подстроке в названии (`q`), результаты ранжируются по похожести\n\n"
         "Если фильтры не указаны, возвращаются все транзакции пользователя.")
 )
 async def get_all_transactions_route(
+        request: Request,
+        response: Response,
         user: User = Depends(get_current_user),
         session: AsyncSession = Depends(get_async_session),
         type: Optional[TransactionType] = None,
@@ -135,13 +294,19 @@ async def get_all_transactions_route(
         limit: int = Query(20, ge=1, le=100),
         offset: int = Query(0, ge=0),
         sort_by: SortableTransactionFields = Query("created_at"),
-        order: str = Query("desc")
+        order: str = Query("desc"),
+        q: Optional[str] = Query(None, min_length=1, max_length=50),
         ):
-    return await get_transactions(user, session,type,start_date,end_date, category_id,limit,offset,sort_by,order)
+    not_modified = await check_etag(request, response, user.id)
+    if not_modified:
+        return not_modified
+    transactions = await get_transactions(user, session,type,start_date,end_date, category_id,limit,offset,sort_by,order,q)
+    return fast_json_response(transactions, response, TRANSACTION_FIELDS)
 
 
 @transactions_router.get(
     "/export",
+    dependencies=[Depends(rate_limit("export"))],
     response_class=StreamingResponse,
     summary="Экспорт транзакций в формате CSV",
     description=(
@@ -159,6 +324,7 @@ async def export_transactions_csv_route(
 
 @transactions_router.get(
     '/{transaction_id}',
+    dependencies=[Depends(rate_limit("default"))],
     response_model=TransactionOut,
     summary="Получить одну транзакцию",
     description="Возвращает данные конкретной транзакции по её ID. Доступно только владельцу."
@@ -0,0 +1,39 @@
+from datetime import date
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+from app.schemas.transaction_schema import TransactionType
+
+
+class PlatformSummaryOut(BaseModel):
+    date_from: date
+    date_to: date
+    active_users: int
+    transactions: int
+    income: float
+    expense: float
+    # Дни периода, ожидающие пересчета сводок: пока их больше нуля, цифры могут отставать
+    pending_days: int
+
+
+class PlatformDayOut(BaseModel):
+    day: date
+    active_users: int
+    transactions: int
+    income: float
+    expense: float
+
+
+class AmountBucketOut(BaseModel):
+    type: TransactionType
+    min_amount: float
+    max_amount: Optional[float] = None
+    transactions: int
+    total: float
+
+
+class AmountDistributionOut(BaseModel):
+    date_from: date
+    date_to: date
+    buckets: List[AmountBucketOut]
@@ -14,6 +14,11 @@ class UserOut(BaseModel):
     created_at: datetime
 
 
+class CurrentUser(UserOut):
+    """Пользователь запроса; is_superuser не попадает в ответы с response_model=UserOut."""
+    is_superuser: bool = False
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str = "bearer"
\ No newline at end of file
@@ -0,0 +1,24 @@
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+class BudgetState(str, Enum):
+    ok = "ok"
+    warning = "warning"
+    exceeded = "exceeded"
+
+
+class BudgetSet(BaseModel):
+    amount: float = Field(..., gt=0)
+    warn_ratio: float = Field(0.8, gt=0, le=1)
+
+
+class BudgetStatusOut(BaseModel):
+    category_id: int
+    month: str
+    amount: float
+    warn_ratio: float
+    spent: float
+    remaining: float
+    state: BudgetState
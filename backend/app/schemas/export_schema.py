@@ -0,0 +1,28 @@
+from datetime import datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    xlsx = "xlsx"
+
+
+class ExportJobOut(BaseModel):
+    task_id: str
+    format: ExportFormat
+    delta: bool
+    # pending - в очереди или выполняется (started_at заполнен), completed, failed
+    status: str
+    rows_written: int
+    total_rows: Optional[int] = None
+    # Доля записанных строк от 0 до 1; None - общее число строк заранее неизвестно (дельта)
+    progress: Optional[float] = None
+    byte_size: Optional[int] = None
+    file_url: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
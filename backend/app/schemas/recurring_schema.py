@@ -0,0 +1,45 @@
+from datetime import date, datetime
+from enum import Enum
+from typing import Optional
+
+from pydantic import BaseModel, Field, model_validator
+
+from app.schemas.transaction_schema import TransactionType
+
+
+class RecurrencePeriod(str, Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+
+
+class RecurringCreate(BaseModel):
+    title: str = Field(..., max_length=50)
+    cash: float = Field(..., ge=0)
+    type: TransactionType
+    category_id: int = Field(..., ge=0)
+    period: RecurrencePeriod
+    every: int = Field(1, ge=1, le=366)
+    start_date: date
+    end_date: Optional[date] = None
+
+    @model_validator(mode="after")
+    def check_dates(self):
+        if self.end_date is not None and self.end_date < self.start_date:
+            raise ValueError("end_date must not be before start_date")
+        return self
+
+
+class RecurringOut(BaseModel):
+    id: int
+    title: str
+    cash: float
+    type: TransactionType
+    category_id: int
+    period: RecurrencePeriod
+    every: int
+    start_date: date
+    end_date: Optional[date]
+    next_run_on: date
+    is_active: bool
+    created_at: datetime
@@ -1,7 +1,7 @@
 from enum import Enum
-from pydantic import BaseModel, Field
-from datetime import datetime
-from typing import Optional
+from pydantic import BaseModel, Field, field_validator
+from datetime import date, datetime
+from typing import List, Optional
 
 class SortableTransactionFields(str, Enum):
     created_at = "created_at"
@@ -25,6 +25,14 @@ class TransactionUpdate(BaseModel):
     category_id: Optional[int] = Field(None, ge=0)
     type: TransactionType = Field(None)
 
+    @field_validator("title", "cash", "category_id", "type")
+    @classmethod
+    def check_not_null(cls, value):
+        # Поле можно не передавать, но null уперся бы в NOT NULL колонки
+        if value is None:
+            raise ValueError("field may be omitted but must not be null")
+        return value
+
 class TransactionOut(BaseModel):
     id: int
     title: str
@@ -33,3 +41,45 @@ class TransactionOut(BaseModel):
     category_id: int = Field(..., ge=0)
     created_at: datetime
 
+
+class TransactionBatchIds(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=500)
+
+class TransactionBatchUpdate(TransactionBatchIds):
+    changes: TransactionUpdate
+
+class TransactionBatchOut(BaseModel):
+    items: List[TransactionOut]
+    not_found: List[int]
+    forbidden: List[int]
+
+class TransactionBatchDeleteOut(BaseModel):
+    deleted: List[int]
+    not_found: List[int]
+    forbidden: List[int]
+
+class TransactionSummaryOut(BaseModel):
+    date: date
+    balance: float
+    month: str
+    month_income: float
+    month_expense: float
+    category_id: Optional[int] = None
+    category_income: Optional[float] = None
+    category_expense: Optional[float] = None
+
+
+class ForecastDayOut(BaseModel):
+    date: date
+    # Ожидаемый чистый поток дня: профиль истории плюс известные будущие операции
+    net: float
+    balance: float
+
+
+class TransactionForecastOut(BaseModel):
+    as_of: date
+    balance: float
+    days: int
+    # Сколько дней истории легло в профиль
+    history_days: int
+    points: List[ForecastDayOut]
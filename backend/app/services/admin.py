@@ -0,0 +1,97 @@
+import logging
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import distinct, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.platform import PlatformAmountBucket, PlatformDailyTotals, PlatformDirtyDay, PlatformUserDay
+from app.services.utils import db_error_handler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PERIOD_DAYS = 30
+MAX_PERIOD_DAYS = 366
+
+# Все запросы ниже читают только сводные таблицы platform_*: транзакции
+# агрегирует задача refresh_platform_rollups, а не запрос API
+
+
+def _period(date_from: Optional[date], date_to: Optional[date]) -> Tuple[date, date]:
+    date_to = date_to or date.today()
+    date_from = date_from or date_to - timedelta(days=DEFAULT_PERIOD_DAYS - 1)
+    if date_from > date_to or (date_to - date_from).days >= MAX_PERIOD_DAYS:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid period")
+    return date_from, date_to
+
+
+def _bucket_bounds(bucket: int) -> Tuple[float, Optional[float]]:
+    if bucket == 0:
+        return 0.0, 1.0
+    return float(10 ** (bucket - 1)), float(10 ** bucket)
+
+
+@db_error_handler
+async def get_platform_summary(session: AsyncSession, date_from: Optional[date], date_to: Optional[date]) -> dict:
+    date_from, date_to = _period(date_from, date_to)
+    active_users = (
+        select(func.count(distinct(PlatformUserDay.user_id)))
+        .where(PlatformUserDay.day.between(date_from, date_to))
+        .scalar_subquery()
+    )
+    pending_days = (
+        select(func.count())
+        .select_from(PlatformDirtyDay)
+        .where(PlatformDirtyDay.day.between(date_from, date_to))
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        select(
+            active_users.label("active_users"),
+            pending_days.label("pending_days"),
+            func.coalesce(func.sum(PlatformDailyTotals.transactions), 0).label("transactions"),
+            func.coalesce(func.sum(PlatformDailyTotals.income), 0).label("income"),
+            func.coalesce(func.sum(PlatformDailyTotals.expense), 0).label("expense"),
+        ).where(PlatformDailyTotals.day.between(date_from, date_to))
+    )
+    row = result.one()
+    return {"date_from": date_from, "date_to": date_to, **row._mapping}
+
+
+@db_error_handler
+async def get_platform_daily(session: AsyncSession, date_from: Optional[date], date_to: Optional[date]):
+    date_from, date_to = _period(date_from, date_to)
+    result = await session.execute(
+        select(PlatformDailyTotals)
+        .where(PlatformDailyTotals.day.between(date_from, date_to))
+        .order_by(PlatformDailyTotals.day)
+    )
+    return result.scalars().all()
+
+
+@db_error_handler
+async def get_amount_distribution(session: AsyncSession, date_from: Optional[date], date_to: Optional[date]) -> dict:
+    date_from, date_to = _period(date_from, date_to)
+    result = await session.execute(
+        select(
+            PlatformAmountBucket.type,
+            PlatformAmountBucket.bucket,
+            func.sum(PlatformAmountBucket.transactions).label("transactions"),
+            func.sum(PlatformAmountBucket.total).label("total"),
+        )
+        .where(PlatformAmountBucket.day.between(date_from, date_to))
+        .group_by(PlatformAmountBucket.type, PlatformAmountBucket.bucket)
+        .order_by(PlatformAmountBucket.type, PlatformAmountBucket.bucket)
+    )
+    buckets = []
+    for row in result:
+        min_amount, max_amount = _bucket_bounds(row.bucket)
+        buckets.append({
+            "type": row.type,
+            "min_amount": min_amount,
+            "max_amount": max_amount,
+            "transactions": row.transactions,
+            "total": row.total,
+        })
+    return {"date_from": date_from, "date_to": date_to, "buckets": buckets}
@@ -0,0 +1,84 @@
+from datetime import date, datetime, time, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import func
+
+from app.models.analytics import MonthlyCategoryTotal
+from app.models.transactions import Transaction
+from app.schemas.transaction_schema import TransactionType
+
+
+def totals_columns(*conditions, prefix: str = ""):
+    """
+    Доходы и расходы одним проходом: SUM(cash) FILTER (WHERE type = ... AND conditions).
+    Несколько наборов с разными условиями и префиксами можно собрать в один SELECT.
+    """
+    return (
+        func.coalesce(
+            func.sum(Transaction.cash).filter(Transaction.type == TransactionType.income, *conditions), 0
+        ).label(f"{prefix}income"),
+        func.coalesce(
+            func.sum(Transaction.cash).filter(Transaction.type == TransactionType.expense, *conditions), 0
+        ).label(f"{prefix}expense"),
+    )
+
+
+def rollup_totals_columns(*conditions):
+    """Те же income и expense, что у totals_columns, но по строкам monthly_category_totals."""
+    return (
+        func.coalesce(
+            func.sum(MonthlyCategoryTotal.total).filter(
+                MonthlyCategoryTotal.type == TransactionType.income, *conditions
+            ), 0
+        ).label("income"),
+        func.coalesce(
+            func.sum(MonthlyCategoryTotal.total).filter(
+                MonthlyCategoryTotal.type == TransactionType.expense, *conditions
+            ), 0
+        ).label("expense"),
+    )
+
+
+def day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def month_range(year: int, month: int):
+    """Полуинтервал [начало месяца, начало следующего) - сравнение по created_at использует индекс."""
+    start = datetime(year, month, 1)
+    end = datetime(year + month // 12, month % 12 + 1, 1)
+    return start, end
+
+
+def created_between(start: datetime, end: datetime):
+    return (Transaction.created_at >= start, Transaction.created_at < end)
+
+
+def created_up_to(day: date):
+    """created_at в пределах дня day включительно, без cast() над колонкой."""
+    return Transaction.created_at < day_start(day + timedelta(days=1))
+
+
+def open_month() -> date:
+    """Начало текущего месяца по UTC - в UTC пишется created_at."""
+    return datetime.utcnow().date().replace(day=1)
+
+
+def closed_months_within(start: Optional[datetime], end: Optional[datetime]) -> Optional[Tuple[Optional[date], date]]:
+    """
+    Закрытые месяцы, целиком лежащие в [start, end], как полуинтервал [first, last)
+    по началам месяцев; first None - без нижней границы. None - таких месяцев нет.
+    """
+    first = None
+    if start is not None:
+        first = date(start.year, start.month, 1)
+        if day_start(first) < start:
+            first = month_range(first.year, first.month)[1].date()
+
+    last = open_month()
+    if end is not None:
+        last = min(last, date(end.year, end.month, 1))
+
+    if first is not None and first >= last:
+        return None
+    return first, last
@@ -4,7 +4,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.db.database import get_async_session
 from app.models.auth import User
-from app.schemas.auth_schema import UserCreate, UserOut
+from app.schemas.auth_schema import CurrentUser, UserCreate
 import bcrypt
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
@@ -128,7 +128,7 @@ async def get_current_user(
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
-        return UserOut(id=user.id, name=user.name, created_at=user.created_at)
+        return CurrentUser(id=user.id, name=user.name, created_at=user.created_at, is_superuser=user.is_superuser)
 
     except JWTError as e:
         logger.warning(f"JWT decoding failed: {e}")
@@ -140,3 +140,10 @@ async def get_current_user(
     except SQLAlchemyError as e:
         logger.error(f"DB error during current user retrieval: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
+
+
+async def get_current_superuser(user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
+    if not user.is_superuser:
+        logger.warning("User %d requested an admin endpoint without superuser rights", user.id)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not enough permissions")
+    return user
@@ -0,0 +1,125 @@
+import logging
+from datetime import date
+from typing import List, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy import and_, delete, func, literal, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.auth import User
+from app.models.budget import Budget, CategorySpend
+from app.models.transactions import Category
+from app.schemas.budget_schema import BudgetSet, BudgetState
+from app.services.utils import db_error_handler, get_owner_id, raise_for_owner
+
+logger = logging.getLogger(__name__)
+
+
+def _month_start(month: Optional[date]) -> date:
+    month = month or date.today()
+    return month.replace(day=1)
+
+
+def _status_query(user_id: int, month: date):
+    """Бюджеты пользователя с расходом за месяц: поиск по ключам, без агрегации транзакций."""
+    return (
+        select(
+            Budget.category_id,
+            Budget.amount,
+            Budget.warn_ratio,
+            func.coalesce(CategorySpend.spent, 0).label("spent"),
+        )
+        .outerjoin(CategorySpend, and_(
+            CategorySpend.user_id == Budget.user_id,
+            CategorySpend.category_id == Budget.category_id,
+            CategorySpend.month == month,
+        ))
+        .where(Budget.user_id == user_id)
+    )
+
+
+def _to_status(row, month: date) -> dict:
+    if row.spent > row.amount:
+        state = BudgetState.exceeded
+    elif row.spent >= row.amount * row.warn_ratio:
+        state = BudgetState.warning
+    else:
+        state = BudgetState.ok
+    return {
+        "category_id": row.category_id,
+        "month": f"{month.year}-{month.month:02d}",
+        "amount": row.amount,
+        "warn_ratio": row.warn_ratio,
+        "spent": row.spent,
+        "remaining": row.amount - row.spent,
+        "state": state,
+    }
+
+
+@db_error_handler
+async def set_budget(budget: BudgetSet, user: User, session: AsyncSession, category_id: int) -> dict:
+    values = {"amount": budget.amount, "warn_ratio": budget.warn_ratio, "category_id": category_id, "user_id": user.id}
+    table = Budget.__table__
+    # Проверка владельца категории встроена в INSERT ... SELECT ... WHERE EXISTS
+    stmt = insert(table).from_select(
+        list(values),
+        select(*(literal(value, table.c[name].type) for name, value in values.items()))
+        .where(select(Category.id).where(Category.id == category_id, Category.user_id == user.id).exists()),
+    )
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_budgets_user_category",
+        set_={"amount": stmt.excluded.amount, "warn_ratio": stmt.excluded.warn_ratio},
+    ).returning(table.c.id)
+
+    result = await session.execute(stmt)
+    if result.scalar_one_or_none() is None:
+        logger.warning("Category with id %d not found", category_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    await session.commit()
+
+    logger.info("Budget for category %d from user %d set to %s", category_id, user.id, budget.amount)
+    return await get_budget_status(user=user, session=session, category_id=category_id, month=None)
+
+
+@db_error_handler
+async def get_budget_status(user: User, session: AsyncSession, category_id: int, month: Optional[date]) -> dict:
+    month = _month_start(month)
+    result = await session.execute(_status_query(user.id, month).where(Budget.category_id == category_id))
+    row = result.one_or_none()
+    if row is None:
+        logger.warning("Budget for category %d not found", category_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Budget not found")
+
+    budget_status = _to_status(row, month)
+    if budget_status["state"] != BudgetState.ok:
+        logger.info("Budget for category %d from user %d is %s", category_id, user.id, budget_status["state"].value)
+    return budget_status
+
+
+@db_error_handler
+async def get_budgets(user: User, session: AsyncSession, month: Optional[date]) -> List[dict]:
+    month = _month_start(month)
+    result = await session.execute(_status_query(user.id, month).order_by(Budget.category_id))
+    budgets = [_to_status(row, month) for row in result.all()]
+    logger.info("User %d retrieved %d budgets", user.id, len(budgets))
+    return budgets
+
+
+@db_error_handler
+async def delete_budget(user: User, session: AsyncSession, category_id: int) -> dict:
+    result = await session.execute(
+        delete(Budget)
+        .where(Budget.category_id == category_id, Budget.user_id == user.id)
+        .returning(Budget.id)
+    )
+    if result.scalar_one_or_none() is None:
+        # Категория своя - значит, для нее просто нет бюджета
+        owner_id = await get_owner_id(session, Category, category_id)
+        if owner_id == user.id:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Budget not found")
+        raise_for_owner(owner_id, category_id, user.id, "category")
+
+    await session.commit()
+    logger.info("Budget for category %d from user %d successfully deleted", category_id, user.id)
+    return {"message": f"Budget for category {category_id} successfully deleted"}
@@ -0,0 +1,139 @@
+import hashlib
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi import Request, Response, status
+from redis.exceptions import RedisError
+
+from app.db.config import settings
+from app.db.redis import redis_client, sync_redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def _data_version_key(user_id: int) -> str:
+    return f"data_version:{user_id}"
+
+
+async def get_data_version(user_id: int) -> Optional[str]:
+    """
+    Возвращает текущую версию данных пользователя, создавая ее при первом обращении.
+    Версия - случайный токен, а не счетчик: после потери ключа в Redis старые ETag не совпадут.
+    None означает, что Redis недоступен и условные запросы отключены.
+    """
+    try:
+        new_version = uuid.uuid4().hex
+        # SET NX GET: одна команда и для чтения существующей версии, и для создания новой
+        version = await redis_client.set(
+            _data_version_key(user_id), new_version, nx=True, get=True, ex=settings.CACHE_TTL
+        )
+        return version or new_version
+    except (RedisError, OSError) as e:
+        logger.warning("Data version lookup for user %d failed: %s", user_id, e)
+        return None
+
+
+async def bump_data_version(user_id: int) -> None:
+    """Сбрасывает версию данных пользователя. Вызывается после commit каждой записи."""
+    try:
+        await redis_client.set(_data_version_key(user_id), uuid.uuid4().hex, ex=settings.CACHE_TTL)
+    except (RedisError, OSError) as e:
+        logger.warning("Data version bump for user %d failed: %s", user_id, e)
+
+
+def bump_data_versions_sync(user_ids: Iterable[int]) -> None:
+    """bump_data_version для Celery-задач: один pipeline на всех затронутых пользователей."""
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    try:
+        with sync_redis_client.pipeline(transaction=False) as pipe:
+            for user_id in user_ids:
+                pipe.set(_data_version_key(user_id), uuid.uuid4().hex, ex=settings.CACHE_TTL)
+            pipe.execute()
+    except (RedisError, OSError) as e:
+        logger.warning("Data version bump for %d users failed: %s", len(user_ids), e)
+
+
+def _make_etag(version: str, request: Request, salt: str = "") -> str:
+    query = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+    digest = hashlib.sha1(f"{version}:{salt}:{request.url.path}?{query}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+async def check_etag(request: Request, response: Response, user_id: int, salt: str = "") -> Optional[Response]:
+    """
+    Условный GET по версии данных пользователя.
+    Возвращает готовый 304, если у клиента актуальная копия, иначе проставляет ETag
+    в ответ и возвращает None - тогда роут выполняет запрос как обычно.
+    salt - то, от чего ответ зависит помимо данных и запроса (например, текущая дата).
+    """
+    version = await get_data_version(user_id)
+    if version is None:
+        return None
+
+    etag = _make_etag(version, request, salt)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+class CategoryCache:
+    """
+    In-process кэш категорий пользователя с TTL и вытеснением самых старых записей.
+    Инвалидируется записями в services/category.py. Список отдается только при той же
+    версии данных, с которой он был сохранен: ETag строится по версии из Redis, и другой
+    инстанс не должен отдать под новым ETag устаревший список. Множество id для проверки
+    владельца версию не сверяет - устаревшую запись там ловит внешний ключ.
+    """
+
+    def __init__(self, ttl: float, max_users: int):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._entries: "OrderedDict[int, Tuple[float, Optional[str], List[Dict], Set[int]]]" = OrderedDict()
+
+    def _get_entry(self, user_id: int):
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[user_id]
+            return None
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def get(self, user_id: int, version: Optional[str]) -> Optional[List[Dict]]:
+        entry = self._get_entry(user_id)
+        return entry[2] if entry and entry[1] == version else None
+
+    def contains(self, user_id: int, category_id: int) -> bool:
+        entry = self._get_entry(user_id)
+        return entry is not None and category_id in entry[3]
+
+    def set(self, user_id: int, categories: List[Dict], version: Optional[str]) -> None:
+        ids = {category["id"] for category in categories}
+        self._entries[user_id] = (time.monotonic() + self.ttl, version, categories, ids)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_users:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        self._entries.pop(user_id, None)
+
+
+category_cache = CategoryCache(settings.CATEGORY_CACHE_TTL, settings.CATEGORY_CACHE_MAX_USERS)
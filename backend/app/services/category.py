@@ -3,15 +3,19 @@ from typing import List
 
 from fastapi import Depends, HTTPException, Path, status
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, delete, update
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
 
 from app.db.database import get_async_session
+from app.models.analytics import Anomaly, MonthlyCategoryTotal
 from app.models.auth import User
-from app.models.transactions import Category
+from app.models.budget import Budget, CategorySpend
+from app.models.transactions import Category, RecurringTransaction, Transaction
 from app.schemas.category_schema import CategoryBase, CategoryOut
 from app.services.auth import get_current_user
-from app.services.utils import check_owner, db_error_handler
+from app.services.cache import bump_data_version, category_cache, get_data_version
+from app.services.utils import check_owner, db_error_handler, raise_not_found_or_forbidden
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +34,8 @@ async def create_category(
     await session.commit()
     await session.refresh(new_category)
 
+    category_cache.invalidate(user.id)
+    await bump_data_version(user.id)
     logger.info("Category %d from user %d successfully created", new_category.id, user.id)
     return new_category
 
@@ -41,20 +47,21 @@ async def update_category(
     session: AsyncSession,
     category_id: int = Path(..., ge=1),
 ) -> Category:
-    db_category = await session.get(Category, category_id)
-    if not db_category:
-        logger.warning("Category with id %d not found", category_id)
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-
-    check_owner(db_category, user.id, "category")
-
     updated_data = category.model_dump(exclude_unset=True)
-    for key, value in updated_data.items():
-        setattr(db_category, key, value)
+    result = await session.execute(
+        update(Category)
+        .where(Category.id == category_id, Category.user_id == user.id)
+        .values(**updated_data)
+        .returning(Category)
+        .execution_options(synchronize_session=False)
+    )
+    db_category = result.scalar_one_or_none()
+    if db_category is None:
+        await raise_not_found_or_forbidden(session, Category, category_id, user.id, "category")
 
-    session.add(db_category)
     await session.commit()
-    await session.refresh(db_category)
+    category_cache.invalidate(user.id)
+    await bump_data_version(user.id)
 
     logger.info("Category %d from user %d successfully updated", category_id, user.id)
     return db_category
@@ -66,15 +73,70 @@ async def delete_category(
     session: AsyncSession,
     category_id: int,
 ) -> dict:
-    db_category = await session.get(Category, category_id)
-    if not db_category:
-        logger.warning("Category with id %d not found", category_id)
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-
-    check_owner(db_category, user.id, "category")
+    owned = and_(Category.id == category_id, Category.user_id == user.id)
+    # Транзакции, правила повторения, бюджет, счетчики расходов, месячные сводки и аномалии категории удаляются
+    # в том же запросе через CTE (раньше транзакции удалял ORM-каскад);
+    # внешний ключ проверяется в конце запроса, когда дочерних строк уже нет
+    deleted_transactions = (
+        delete(Transaction)
+        .where(Transaction.category_id == select(Category.id).where(owned).scalar_subquery())
+        .returning(Transaction.id)
+        .cte("deleted_transactions")
+    )
+    deleted_rules = (
+        delete(RecurringTransaction)
+        .where(RecurringTransaction.category_id == select(Category.id).where(owned).scalar_subquery())
+        .returning(RecurringTransaction.id)
+        .cte("deleted_rules")
+    )
+    deleted_budgets = (
+        delete(Budget)
+        .where(Budget.category_id == select(Category.id).where(owned).scalar_subquery())
+        .returning(Budget.id)
+        .cte("deleted_budgets")
+    )
+    deleted_spend = (
+        delete(CategorySpend)
+        .where(CategorySpend.category_id == select(Category.id).where(owned).scalar_subquery())
+        .returning(CategorySpend.month)
+        .cte("deleted_spend")
+    )
+    deleted_monthly_totals = (
+        delete(MonthlyCategoryTotal)
+        .where(
+            MonthlyCategoryTotal.user_id == user.id,
+            MonthlyCategoryTotal.category_id == select(Category.id).where(owned).scalar_subquery(),
+        )
+        .returning(MonthlyCategoryTotal.month)
+        .cte("deleted_monthly_totals")
+    )
+    deleted_anomalies = (
+        delete(Anomaly)
+        .where(
+            Anomaly.user_id == user.id,
+            Anomaly.category_id == select(Category.id).where(owned).scalar_subquery(),
+        )
+        .returning(Anomaly.day)
+        .cte("deleted_anomalies")
+    )
+    result = await session.execute(
+        delete(Category)
+        .where(owned)
+        .returning(Category.id)
+        .add_cte(deleted_transactions)
+        .add_cte(deleted_rules)
+        .add_cte(deleted_budgets)
+        .add_cte(deleted_spend)
+        .add_cte(deleted_monthly_totals)
+        .add_cte(deleted_anomalies)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar_one_or_none() is None:
+        await raise_not_found_or_forbidden(session, Category, category_id, user.id, "category")
 
-    await session.delete(db_category)
     await session.commit()
+    category_cache.invalidate(user.id)
+    await bump_data_version(user.id)
 
     logger.info("Category %d from user %d successfully deleted", category_id, user.id)
     return {"message": f"Category {category_id} successfully deleted"}
@@ -101,9 +163,18 @@ async def get_one_category(
 async def get_all_category(
     user: User,
     session: AsyncSession,
-) -> List[Category]:
+) -> List[dict]:
+    version = await get_data_version(user.id)
+    categories = category_cache.get(user.id, version)
+    if categories is not None:
+        logger.info("User %d retrieved %d categories from cache", user.id, len(categories))
+        return categories
+
     logger.info("Retrieving categories for user %d", user.id)
-    result = await session.execute(select(Category).where(Category.user_id == user.id))
-    categories = result.scalars().all()
+    result = await session.execute(
+        select(Category.id, Category.title).where(Category.user_id == user.id).order_by(Category.id)
+    )
+    categories = [{"id": id_, "title": title} for id_, title in result.all()]
+    category_cache.set(user.id, categories, version)
     logger.info("User %d retrieved %d categories", user.id, len(categories))
     return categories
@@ -0,0 +1,154 @@
+import asyncio
+import logging
+import os
+import uuid
+from datetime import timedelta
+from typing import List, Set
+
+from fastapi import HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.config import celery_app, settings
+from app.models.export import ExportJob, ExportWatermark
+from app.models.transactions import Transaction
+from app.schemas.export_schema import ExportFormat
+from app.services.utils import db_error_handler
+
+logger = logging.getLogger(__name__)
+
+# Задачи ставятся по имени: модуль app.tasks.export (pandas, openpyxl, fastapi_mail)
+# импортирует только воркер, API его не загружает
+CSV_EXPORT_TASK = "app.tasks.export.export_transactions_to_csv"
+XLSX_EXPORT_TASK = "app.tasks.export.export_transactions_to_xlsx"
+
+# Ссылки на запущенные задачи, иначе сборщик мусора может снять их до завершения
+_inline_jobs: Set[asyncio.Task] = set()
+
+
+async def count_rows_up_to(session: AsyncSession, user_id: int, limit: int, *conditions) -> int:
+    """Считает строки пользователя, но не дальше limit: индекс по user_id читается не целиком."""
+    capped = select(Transaction.id).where(Transaction.user_id == user_id, *conditions).limit(limit).subquery()
+    result = await session.execute(select(func.count()).select_from(capped))
+    return result.scalar_one()
+
+
+async def _create_job(session: AsyncSession, job_id: str, user_id: int,
+                      format: ExportFormat, delta: bool) -> None:
+    """
+    Регистрирует задачу в export_jobs. Воркер Celery может успеть создать строку раньше
+    (он тоже пишет ее upsert'ом при старте), поэтому конфликт по id не ошибка.
+    """
+    await session.execute(
+        insert(ExportJob)
+        .values(id=job_id, user_id=user_id, format=format.value, delta=delta)
+        .on_conflict_do_nothing(index_elements=[ExportJob.id])
+    )
+    await session.commit()
+
+
+async def _delta_conditions(session: AsyncSession, user_id: int) -> tuple:
+    """Условие на строки дельты для оценки ее размера; без отметки экспорт будет полным."""
+    result = await session.execute(
+        select(ExportWatermark.exported_at).where(ExportWatermark.user_id == user_id)
+    )
+    exported_at = result.scalar_one_or_none()
+    if exported_at is None:
+        return ()
+    return (Transaction.updated_at >= exported_at - timedelta(seconds=settings.EXPORT_DELTA_OVERLAP_SECONDS),)
+
+
+async def _run_inline(user_id: int, task_id: str, delta: bool) -> None:
+    from app.tasks.export import export_csv_inline
+
+    try:
+        # Запись файла и письмо синхронные - выполняем их в потоке, не блокируя event loop.
+        # Прогресс, результат и ошибку задача сама пишет в export_jobs
+        await asyncio.to_thread(export_csv_inline, user_id, task_id, delta)
+    except Exception:
+        logger.exception("Inline export %s for user %d failed", task_id, user_id)
+        return
+    logger.info("Inline export %s for user %d completed", task_id, user_id)
+
+
+@db_error_handler
+async def start_csv_export(user_id: int, session: AsyncSession, delta: bool = False) -> str:
+    """
+    Маршрутизирует CSV-экспорт по размеру истории (для дельты - по числу изменений):
+    небольшие выгружаются в процессе API фоновой asyncio-задачей, большие уходят в Celery.
+    Возвращает task_id для /status.
+    """
+    threshold = settings.EXPORT_INLINE_MAX_ROWS
+    conditions = await _delta_conditions(session, user_id) if delta else ()
+    if await count_rows_up_to(session, user_id, threshold + 1, *conditions) <= threshold:
+        task_id = uuid.uuid4().hex
+        # Строка задачи коммитится до запуска, чтобы поток экспорта видел ее сразу
+        await _create_job(session, task_id, user_id, ExportFormat.csv, delta)
+        job = asyncio.create_task(_run_inline(user_id, task_id, delta))
+        _inline_jobs.add(job)
+        job.add_done_callback(_inline_jobs.discard)
+        logger.info("Inline export %s started for user %d", task_id, user_id)
+        return task_id
+
+    task = celery_app.send_task(CSV_EXPORT_TASK, args=[user_id, delta])
+    await _create_job(session, task.id, user_id, ExportFormat.csv, delta)
+    logger.info("Celery export %s started for user %d", task.id, user_id)
+    return task.id
+
+
+@db_error_handler
+async def start_xlsx_export(user_id: int, session: AsyncSession) -> str:
+    task = celery_app.send_task(XLSX_EXPORT_TASK, args=[user_id])
+    await _create_job(session, task.id, user_id, ExportFormat.xlsx, False)
+    logger.info("Celery XLSX export %s started for user %d", task.id, user_id)
+    return task.id
+
+
+def _job_out(job: ExportJob) -> dict:
+    progress = None
+    if job.total_rows is not None:
+        progress = 1.0 if job.total_rows == 0 else job.rows_written / job.total_rows
+    if job.status == "completed":
+        progress = 1.0
+    return {
+        "task_id": job.id,
+        "format": job.format,
+        "delta": job.delta,
+        "status": job.status,
+        "rows_written": job.rows_written,
+        "total_rows": job.total_rows,
+        "progress": progress,
+        "byte_size": job.byte_size,
+        "file_url": f"/static/exports/{os.path.basename(job.file_path)}" if job.file_path else None,
+        "error": job.error,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+    }
+
+
+@db_error_handler
+async def get_export_job(task_id: str, user_id: int, session: AsyncSession) -> dict:
+    """Состояние задачи экспорта из export_jobs - один запрос по первичному ключу, без обращения к Celery."""
+    job = await session.get(ExportJob, task_id)
+    if job is None:
+        logger.warning("Export job %s not found", task_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Export job not found")
+    if job.user_id != user_id:
+        logger.warning("User %d not authorized to access export job %s", user_id, task_id)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this export job")
+    return _job_out(job)
+
+
+@db_error_handler
+async def list_export_jobs(user_id: int, session: AsyncSession, limit: int, offset: int) -> List[dict]:
+    """Экспорты пользователя от новых к старым (индекс user_id, created_at)."""
+    result = await session.execute(
+        select(ExportJob)
+        .where(ExportJob.user_id == user_id)
+        .order_by(ExportJob.created_at.desc(), ExportJob.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return [_job_out(job) for job in result.scalars()]
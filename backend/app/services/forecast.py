@@ -0,0 +1,219 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import orjson
+from redis.exceptions import RedisError
+from sqlalchemy import case, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.config import settings
+from app.db.redis import redis_client
+from app.models.analytics import MonthlyCategoryTotal
+from app.models.auth import User
+from app.models.transactions import Transaction
+from app.schemas.transaction_schema import TransactionType
+from app.services.aggregation import (
+    created_between,
+    created_up_to,
+    day_start,
+    open_month,
+    rollup_totals_columns,
+    totals_columns,
+)
+from app.services.cache import get_data_version
+from app.services.utils import db_error_handler
+
+logger = logging.getLogger(__name__)
+
+# Профиль по дням месяца строится только по истории хотя бы в два месяца, по дням недели -
+# хотя бы в две недели: на более короткой истории разовая операция размазалась бы по прогнозу
+MIN_MONTHLY_HISTORY_DAYS = 56
+MIN_WEEKLY_HISTORY_DAYS = 14
+
+# Вхождения активных правил повторения в (today, until]. Шаг правила не меньше дня,
+# поэтому от next_index до until не больше (until - next_run_on) + 1 вхождений
+SCHEDULED_FLOWS_SQL = text("""
+SELECT o.day, SUM(CASE WHEN r.type = 'income' THEN r.cash ELSE -r.cash END) AS net
+FROM recurring_transactions r
+CROSS JOIN LATERAL (
+    SELECT (r.start_date + k * CASE r.period
+               WHEN 'day' THEN make_interval(days => r.every)
+               WHEN 'week' THEN make_interval(weeks => r.every)
+               ELSE make_interval(months => r.every)
+           END)::date AS day
+    FROM generate_series(r.next_index, r.next_index + (CAST(:until AS date) - LEAST(r.next_run_on, :until))) AS k
+) o
+WHERE r.user_id = :user_id AND r.is_active
+  AND o.day > :today AND o.day <= :until
+  AND (r.end_date IS NULL OR o.day <= r.end_date)
+GROUP BY o.day
+""")
+
+
+def forecast_today() -> date:
+    """День, от которого строится прогноз: created_at и месячные сводки ведутся в UTC."""
+    return datetime.utcnow().date()
+
+
+def _cache_key(user_id: int, version: str, today: date, days: int) -> str:
+    # Версия меняется при каждой записи пользователя, дата - с наступлением нового дня
+    return f"forecast:{user_id}:{version}:{today.isoformat()}:{days}"
+
+
+async def _current_balance(session: AsyncSession, user_id: int, today: date) -> float:
+    """Баланс на конец today: закрытые месяцы из monthly_category_totals, текущий - по транзакциям."""
+    month = open_month()
+    rolled = select(*rollup_totals_columns()).where(
+        MonthlyCategoryTotal.user_id == user_id,
+        MonthlyCategoryTotal.month < month,
+    ).subquery()
+    live = select(*totals_columns()).where(
+        Transaction.user_id == user_id,
+        Transaction.created_at >= day_start(month),
+        created_up_to(today),
+    ).subquery()
+    result = await session.execute(select(
+        rolled.c.income - rolled.c.expense + live.c.income - live.c.expense
+    ))
+    return float(result.scalar_one())
+
+
+async def _daily_flows(session: AsyncSession, user_id: int, start: date, until: date):
+    """
+    Чистый поток по дням за [start, until] - одна строка на день, не на транзакцию.
+    Транзакции правил повторения не входят: их будущие вхождения известны точно
+    и добавляются отдельно, иначе попали бы в прогноз дважды.
+    """
+    day = func.date_trunc("day", Transaction.created_at).label("day")
+    net = func.sum(case(
+        (Transaction.type == TransactionType.income, Transaction.cash),
+        else_=-Transaction.cash,
+    )).label("net")
+    result = await session.execute(
+        select(day, net)
+        .where(
+            Transaction.user_id == user_id,
+            Transaction.recurring_id.is_(None),
+            *created_between(day_start(start), day_start(until + timedelta(days=1))),
+        )
+        .group_by(day)
+        .order_by(day)
+    )
+    return result.all()
+
+
+def _seasonal_profile(history, future_index):
+    """
+    Ожидаемый поток на дни future_index: среднее за день плюс поправка дня месяца
+    (зарплата, аренда) и поправка дня недели, посчитанная по остатку после первой.
+    """
+    import numpy as np
+
+    if history.empty:
+        return np.zeros(len(future_index))
+
+    mean = history.mean()
+    expected = np.full(len(future_index), mean)
+    residual = history
+    if len(history) >= MIN_MONTHLY_HISTORY_DAYS:
+        monthly = history.groupby(history.index.day).mean() - mean
+        expected += monthly.reindex(future_index.day, fill_value=0.0).to_numpy()
+        residual = history - monthly.reindex(history.index.day).to_numpy()
+    if len(history) >= MIN_WEEKLY_HISTORY_DAYS:
+        weekly = residual.groupby(residual.index.dayofweek).mean() - residual.mean()
+        expected += weekly.reindex(future_index.dayofweek, fill_value=0.0).to_numpy()
+    return expected
+
+
+def _series(rows):
+    import pandas as pd
+
+    days = [day for day, _ in rows]
+    return pd.Series([net for _, net in rows], index=pd.DatetimeIndex(days), dtype=float)
+
+
+def project_balance(flows, scheduled, balance: float, today: date, days: int) -> dict:
+    """
+    Прогноз баланса на days дней после today. flows - пары (день, чистый поток) из истории
+    и уже внесенных будущих транзакций, scheduled - вхождения правил повторения.
+    """
+    import numpy as np
+    import pandas as pd
+
+    flows = _series(flows)
+    scheduled = _series(scheduled)
+    future_index = pd.date_range(today + timedelta(days=1), periods=days, freq="D")
+
+    past = flows[flows.index <= pd.Timestamp(today)]
+    if past.empty:
+        history = past
+    else:
+        history = past.reindex(pd.date_range(past.index.min(), today, freq="D"), fill_value=0.0)
+
+    known = flows.reindex(future_index, fill_value=0.0) + scheduled.reindex(future_index, fill_value=0.0)
+    net = _seasonal_profile(history, future_index) + known.to_numpy()
+    balances = balance + np.cumsum(net)
+
+    return {
+        "as_of": today,
+        "balance": round(balance, 2),
+        "days": days,
+        "history_days": len(history),
+        "points": [
+            {"date": day.date(), "net": round(day_net, 2), "balance": round(day_balance, 2)}
+            for day, day_net, day_balance in zip(future_index, net.tolist(), balances.tolist())
+        ],
+    }
+
+
+async def _cached_forecast(key: Optional[str]) -> Optional[dict]:
+    if key is None:
+        return None
+    try:
+        cached = await redis_client.get(key)
+    except (RedisError, OSError) as e:
+        logger.warning("Forecast cache lookup failed: %s", e)
+        return None
+    return orjson.loads(cached) if cached else None
+
+
+async def _store_forecast(key: Optional[str], forecast: dict) -> None:
+    if key is None:
+        return
+    try:
+        await redis_client.set(key, orjson.dumps(forecast).decode(), ex=settings.FORECAST_CACHE_TTL)
+    except (RedisError, OSError) as e:
+        logger.warning("Forecast cache store failed: %s", e)
+
+
+@db_error_handler
+async def get_forecast(user: User, session: AsyncSession, days: int) -> dict:
+    """
+    Прогноз баланса на days дней. Из БД читаются текущий баланс (по месячным сводкам),
+    не больше FORECAST_HISTORY_DAYS + days строк дневного потока и вхождения правил,
+    поэтому стоимость не зависит от длины истории. Результат кэшируется в Redis
+    до следующей записи пользователя.
+    """
+    today = forecast_today()
+    version = await get_data_version(user.id)
+    key = _cache_key(user.id, version, today, days) if version is not None else None
+
+    forecast = await _cached_forecast(key)
+    if forecast is not None:
+        logger.info("Forecast for %d days for user %d served from cache", days, user.id)
+        return forecast
+
+    until = today + timedelta(days=days)
+    balance = await _current_balance(session, user.id, today)
+    flows = await _daily_flows(session, user.id, today - timedelta(days=settings.FORECAST_HISTORY_DAYS - 1), until)
+    scheduled = (await session.execute(
+        SCHEDULED_FLOWS_SQL, {"user_id": user.id, "today": today, "until": until}
+    )).all()
+
+    forecast = project_balance(flows, scheduled, balance, today, days)
+    await _store_forecast(key, forecast)
+
+    logger.info("Forecast for %d days computed for user %d from %d history days",
+                days, user.id, forecast["history_days"])
+    return forecast
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.pool import QueuePool
+
+from app.db.config import settings
+from app.db.redis import broker_client, redis_client
+
+logger = logging.getLogger(__name__)
+
+CELERY_QUEUES = ("celery", settings.EXPORT_QUEUE)
+
+# Последний результат readiness и время его получения; lock не дает
+# одновременным пробам запускать проверки параллельно
+_cache: Optional[Tuple[float, Dict]] = None
+_lock = asyncio.Lock()
+
+
+async def _timed(check) -> Dict:
+    started = time.perf_counter()
+    try:
+        details = await asyncio.wait_for(check, settings.HEALTH_CHECK_TIMEOUT)
+    except Exception as e:
+        logger.warning("Readiness check failed: %r", e)
+        return {"ok": False, "error": repr(e)}
+    return {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 1), **(details or {})}
+
+
+async def _check_database(session: AsyncSession) -> None:
+    await session.execute(text("SELECT 1"))
+
+
+async def _check_redis() -> None:
+    await redis_client.ping()
+
+
+async def _queue_depths() -> Dict:
+    # Транспорт Redis хранит очередь Celery списком с именем очереди
+    depths = [await broker_client.llen(queue) for queue in CELERY_QUEUES]
+    return {"queues": dict(zip(CELERY_QUEUES, depths))}
+
+
+def pool_status(session: AsyncSession) -> Dict:
+    """Занятость пула async-движка: checked out / (pool_size + max_overflow)."""
+    pool = session.bind.pool
+    if not isinstance(pool, QueuePool):
+        return {"ok": True, "class": type(pool).__name__}
+
+    capacity = pool.size() + pool._max_overflow
+    checked_out = pool.checkedout()
+    utilization = checked_out / capacity if capacity else 0.0
+    return {
+        "ok": utilization < settings.HEALTH_POOL_SATURATION,
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": checked_out,
+        "utilization": round(utilization, 2),
+    }
+
+
+async def readiness(session: AsyncSession) -> Dict:
+    """
+    Состояние зависимостей инстанса. Результат кэшируется на HEALTH_CACHE_SECONDS,
+    поэтому частые пробы оркестратора не создают нагрузки на БД и Redis.
+    """
+    global _cache
+
+    async with _lock:
+        if _cache is not None and time.monotonic() - _cache[0] < settings.HEALTH_CACHE_SECONDS:
+            return _cache[1]
+
+        # Пул снимаем до SELECT 1, чтобы сама проба не учитывалась как занятое соединение
+        pool = pool_status(session)
+        checks = {
+            "database": await _timed(_check_database(session)),
+            "redis": await _timed(_check_redis()),
+            "broker": await _timed(_queue_depths()),
+            "pool": pool,
+        }
+        # Без Redis API работает с деградацией (кэш и лимиты в процессе), а очередь Celery
+        # общая для всех инстансов - поэтому из ротации выводят только БД и насыщенный пул
+        ready = checks["database"]["ok"] and checks["pool"]["ok"]
+        result = {"status": "ready" if ready else "unavailable", "checks": checks}
+
+        _cache = (time.monotonic(), result)
+        return result
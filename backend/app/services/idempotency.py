@@ -0,0 +1,144 @@
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import HTTPException, Request, status
+from pydantic import BaseModel, TypeAdapter
+from redis.exceptions import RedisError
+
+from app.db.config import settings
+from app.db.redis import redis_client
+from app.services.serialization import ORJSONBytesResponse
+
+logger = logging.getLogger(__name__)
+
+REPLAY_HEADER = "Idempotent-Replayed"
+POLL_INTERVAL = 0.05
+
+# Снимает блокировку, только если она все еще наша: после истечения ее мог взять другой запрос
+RELEASE_LOCK_LUA = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+_release_lock = redis_client.register_script(RELEASE_LOCK_LUA)
+
+
+def _result_key(user_id: int, key: str) -> str:
+    return f"idempotency:{user_id}:{key}"
+
+
+def _lock_key(user_id: int, key: str) -> str:
+    return f"idempotency_lock:{user_id}:{key}"
+
+
+def _fingerprint(request: Request, payload: BaseModel) -> str:
+    # Ключ привязан к запросу: тот же ключ с другим телом или другим URL - ошибка клиента
+    digest = hashlib.sha256(f"{request.method} {request.url.path}\n".encode())
+    digest.update(payload.model_dump_json().encode())
+    return digest.hexdigest()
+
+
+def _replay(stored: dict, fingerprint: str) -> ORJSONBytesResponse:
+    if stored["fingerprint"] != fingerprint:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different request",
+        )
+    return ORJSONBytesResponse(
+        stored["body"], status_code=int(stored["status"]), headers={REPLAY_HEADER: "true"}
+    )
+
+
+async def _release(lock_key: str, token: str) -> None:
+    try:
+        await _release_lock(keys=[lock_key], args=[token])
+    except (RedisError, OSError) as e:
+        # Блокировка истечет сама через IDEMPOTENCY_LOCK_SECONDS
+        logger.warning("Idempotency lock release failed: %s", e)
+
+
+async def _wait_for_result(result_key: str, lock_key: str) -> Optional[dict]:
+    """Ждет, пока параллельный запрос с тем же ключом сохранит ответ или снимет блокировку."""
+    deadline = time.monotonic() + settings.IDEMPOTENCY_LOCK_SECONDS
+    while time.monotonic() < deadline:
+        await asyncio.sleep(POLL_INTERVAL)
+        stored = await redis_client.hgetall(result_key)
+        if stored:
+            return stored
+        if not await redis_client.exists(lock_key):
+            return None
+    return None
+
+
+async def run_idempotent(
+    request: Request,
+    user_id: int,
+    key: Optional[str],
+    payload: BaseModel,
+    response_model: Any,
+    status_code: int,
+    call: Callable[[], Awaitable[Any]],
+):
+    """
+    Выполняет запись с заголовком Idempotency-Key не больше одного раза. Ответ хранится
+    в Redis IDEMPOTENCY_TTL секунд, повтор получает его без обращения к БД. Одновременные
+    дубли ждут первый запрос на короткой блокировке. Ошибки не сохраняются: запрос,
+    завершившийся HTTPException, можно повторить с тем же ключом.
+    Без ключа, а также при недоступном Redis запрос выполняется как обычно.
+    """
+    if key is None:
+        return await call()
+
+    result_key, lock_key = _result_key(user_id, key), _lock_key(user_id, key)
+    fingerprint = _fingerprint(request, payload)
+    token = uuid.uuid4().hex
+    try:
+        stored = await redis_client.hgetall(result_key)
+        if stored:
+            return _replay(stored, fingerprint)
+
+        acquired = await redis_client.set(lock_key, token, nx=True, px=int(settings.IDEMPOTENCY_LOCK_SECONDS * 1000))
+        if not acquired:
+            stored = await _wait_for_result(result_key, lock_key)
+            if stored:
+                return _replay(stored, fingerprint)
+            logger.warning("Idempotency key of user %d is still locked by another request", user_id)
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is in progress",
+            )
+
+        # Первый запрос мог сохранить ответ и снять блокировку между двумя проверками
+        stored = await redis_client.hgetall(result_key)
+        if stored:
+            await _release(lock_key, token)
+            return _replay(stored, fingerprint)
+    except (RedisError, OSError) as e:
+        logger.warning("Idempotency store unavailable, executing without it: %s", e)
+        return await call()
+
+    try:
+        result = await call()
+    except Exception:
+        await _release(lock_key, token)
+        raise
+
+    adapter = TypeAdapter(response_model)
+    body = adapter.dump_json(adapter.validate_python(result, from_attributes=True)).decode()
+    try:
+        async with redis_client.pipeline(transaction=True) as pipe:
+            pipe.hset(result_key, mapping={"fingerprint": fingerprint, "status": status_code, "body": body})
+            pipe.expire(result_key, settings.IDEMPOTENCY_TTL)
+            await pipe.execute()
+    except (RedisError, OSError) as e:
+        # Запись в БД уже выполнена - отдаем ответ, хотя повтор с этим ключом его не найдет
+        logger.warning("Idempotent response of user %d was not stored: %s", user_id, e)
+    await _release(lock_key, token)
+
+    return ORJSONBytesResponse(body, status_code=status_code)
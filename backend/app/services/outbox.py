@@ -0,0 +1,77 @@
+import logging
+from collections import defaultdict
+from datetime import timedelta
+from typing import Callable, Dict, List, Sequence
+
+from sqlalchemy import delete, func, select, update
+
+from app.models.outbox import Outbox
+
+logger = logging.getLogger(__name__)
+
+# handler(session, events): events - строки outbox одной сущности в порядке seq
+# (атрибуты seq, entity, entity_id, user_id, operation, payload, created_at).
+# Обработчик выполняется в транзакции, которая помечает пачку обработанной:
+# изменения, сделанные им через session, фиксируются атомарно вместе с отметкой,
+# а исключение откатывает пачку - она будет доставлена повторно.
+OutboxHandler = Callable[[object, Sequence], None]
+
+ALL_ENTITIES = "*"
+
+_subscribers: Dict[str, List[OutboxHandler]] = defaultdict(list)
+
+
+def subscribe(entity: str = ALL_ENTITIES):
+    """
+    Регистрирует обработчик ленты изменений для сущности ("transaction", "category")
+    или для всех сущностей. Модуль с обработчиками должен быть в include Celery,
+    чтобы воркер импортировал его до первого разбора.
+    """
+    def register(handler: OutboxHandler) -> OutboxHandler:
+        _subscribers[entity].append(handler)
+        logger.info("Outbox subscriber %s registered for %s", handler.__name__, entity)
+        return handler
+
+    return register
+
+
+def dispatch(session, events: Sequence) -> None:
+    by_entity: Dict[str, list] = defaultdict(list)
+    for event in events:
+        by_entity[event.entity].append(event)
+
+    for entity, entity_events in by_entity.items():
+        for handler in _subscribers.get(entity, []) + _subscribers.get(ALL_ENTITIES, []):
+            handler(session, entity_events)
+
+
+def claim_batch(session, limit: int) -> list:
+    """
+    Помечает обработанными до limit самых старых событий и возвращает их в порядке seq.
+    SKIP LOCKED позволяет нескольким воркерам разбирать ленту параллельно; если транзакция
+    откатится, отметка снимется вместе с ней и события будут выданы снова.
+    """
+    pending = (
+        select(Outbox.seq)
+        .where(Outbox.processed_at.is_(None))
+        .order_by(Outbox.seq)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = session.execute(
+        update(Outbox)
+        .where(Outbox.seq.in_(pending))
+        .values(processed_at=func.now())
+        .returning(Outbox.seq, Outbox.entity, Outbox.entity_id, Outbox.user_id,
+                   Outbox.operation, Outbox.payload, Outbox.created_at)
+    )
+    # RETURNING не гарантирует порядок строк
+    return sorted(result.all(), key=lambda event: event.seq)
+
+
+def purge_processed(session, retention_days: int) -> int:
+    result = session.execute(
+        delete(Outbox).where(Outbox.processed_at < func.now() - timedelta(days=retention_days))
+    )
+    return result.rowcount
@@ -0,0 +1,126 @@
+import logging
+import math
+import time
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from fastapi import Depends, HTTPException, status
+from redis.exceptions import RedisError
+
+from app.db.config import settings
+from app.db.redis import redis_client
+from app.models.auth import User
+from app.services.auth import get_current_user
+
+logger = logging.getLogger(__name__)
+
+# Токен-бакет: KEYS[1] - hash {tokens, ts}, ARGV - емкость и скорость пополнения (токенов в секунду).
+# Время берется из Redis, чтобы все инстансы API считали по одним часам.
+# Возвращает {1, 0} если запрос пропущен, иначе {0, "секунд до следующего токена"}.
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or capacity
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    retry_after = (1 - tokens) / rate
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(retry_after)}
+"""
+
+_token_bucket = redis_client.register_script(TOKEN_BUCKET_LUA)
+
+
+def parse_limit(value: str) -> Tuple[int, float]:
+    """'30/60' -> емкость 30 запросов, пополнение 30 токенов за 60 секунд."""
+    capacity, period = value.split("/")
+    capacity = int(capacity)
+    return capacity, capacity / float(period)
+
+
+RATE_LIMITS: Dict[str, Tuple[int, float]] = {
+    "default": parse_limit(settings.RATE_LIMIT_DEFAULT),
+    "analytics": parse_limit(settings.RATE_LIMIT_ANALYTICS),
+    "export": parse_limit(settings.RATE_LIMIT_EXPORT),
+}
+
+
+class LocalTokenBuckets:
+    """
+    In-process запасной вариант на время недоступности Redis.
+    Лимит считается на инстанс, а не глобально, но защищает пул БД от одного клиента.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str, capacity: int, rate: float) -> Tuple[bool, float]:
+        now = time.monotonic()
+        tokens, ts = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + max(0.0, now - ts) * rate)
+
+        allowed = tokens >= 1
+        retry_after = 0.0
+        if allowed:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / rate
+
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+local_buckets = LocalTokenBuckets(settings.RATE_LIMIT_LOCAL_MAX_KEYS)
+
+
+async def take_token(route_class: str, user_id: int) -> Tuple[bool, float]:
+    capacity, rate = RATE_LIMITS[route_class]
+    key = f"rate_limit:{route_class}:{user_id}"
+    try:
+        allowed, retry_after = await _token_bucket(keys=[key], args=[capacity, rate])
+        return bool(allowed), float(retry_after)
+    except (RedisError, OSError) as e:
+        logger.warning("Rate limit check for user %d fell back to local buckets: %s", user_id, e)
+        return local_buckets.take(key, capacity, rate)
+
+
+def rate_limit(route_class: str):
+    """
+    Зависимость роута: списывает токен из бакета пользователя для класса роутов
+    (default, analytics, export) и отвечает 429 с Retry-After, если бакет пуст.
+    """
+    if route_class not in RATE_LIMITS:
+        raise ValueError(f"Unknown rate limit class: {route_class}")
+
+    async def dependency(user: User = Depends(get_current_user)) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+
+        allowed, retry_after = await take_token(route_class, user.id)
+        if not allowed:
+            logger.warning("User %d exceeded %s rate limit", user.id, route_class)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+            )
+
+    return dependency
@@ -0,0 +1,71 @@
+import logging
+from typing import List
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.auth import User
+from app.models.transactions import Category, RecurringTransaction
+from app.schemas.recurring_schema import RecurringCreate
+from app.services.cache import bump_data_version, category_cache
+from app.services.utils import db_error_handler, raise_not_found_or_forbidden
+
+logger = logging.getLogger(__name__)
+
+
+@db_error_handler
+async def create_recurring(rule: RecurringCreate, user: User, session: AsyncSession) -> RecurringTransaction:
+    if not category_cache.contains(user.id, rule.category_id):
+        owned = await session.execute(
+            select(Category.id).where(Category.id == rule.category_id, Category.user_id == user.id)
+        )
+        if owned.scalar_one_or_none() is None:
+            logger.warning("Category with id %d not found", rule.category_id)
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+
+    # Первое вхождение - сама start_date; прошедшие даты догенерирует ближайший запуск планировщика
+    new_rule = RecurringTransaction(
+        **rule.model_dump(),
+        user_id=user.id,
+        next_index=0,
+        next_run_on=rule.start_date,
+        is_active=True,
+    )
+    session.add(new_rule)
+    await session.commit()
+    await session.refresh(new_rule)
+    # Правила участвуют в прогнозе баланса
+    await bump_data_version(user.id)
+
+    logger.info("Recurring rule %d from user %d successfully created", new_rule.id, user.id)
+    return new_rule
+
+
+@db_error_handler
+async def get_recurring(user: User, session: AsyncSession) -> List[RecurringTransaction]:
+    result = await session.execute(
+        select(RecurringTransaction)
+        .where(RecurringTransaction.user_id == user.id)
+        .order_by(RecurringTransaction.id)
+    )
+    rules = result.scalars().all()
+    logger.info("User %d retrieved %d recurring rules", user.id, len(rules))
+    return rules
+
+
+@db_error_handler
+async def delete_recurring(user: User, session: AsyncSession, rule_id: int) -> dict:
+    # Созданные правилом транзакции остаются: recurring_id обнуляется внешним ключом
+    result = await session.execute(
+        delete(RecurringTransaction)
+        .where(RecurringTransaction.id == rule_id, RecurringTransaction.user_id == user.id)
+        .returning(RecurringTransaction.id)
+    )
+    if result.scalar_one_or_none() is None:
+        await raise_not_found_or_forbidden(session, RecurringTransaction, rule_id, user.id, "recurring rule")
+
+    await session.commit()
+    await bump_data_version(user.id)
+    logger.info("Recurring rule %d from user %d successfully deleted", rule_id, user.id)
+    return {"message": f"Recurring rule {rule_id} successfully deleted"}
@@ -1,45 +1,125 @@
 from datetime import date, datetime
 from io import StringIO
-from typing import Optional
+from typing import List, Optional
 import logging
 from fastapi import Depends, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import asc, desc, extract, func, cast, Date
+from sqlalchemy import asc, delete, desc, exists, false, func, insert, literal, or_, update
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.exc import SQLAlchemyError
-import pandas as pd
 
+from app.models.analytics import MonthlyCategoryTotal
 from app.models.transactions import Transaction, Category
 from app.db.database import get_async_session
 from app.services.auth import get_current_user
 from app.models.auth import User
-from app.schemas.transaction_schema import SortableTransactionFields, TransactionCreate, TransactionType, TransactionUpdate
-from app.services.utils import check_owner, db_error_handler
+from app.schemas.transaction_schema import (
+    SortableTransactionFields,
+    TransactionBatchUpdate,
+    TransactionCreate,
+    TransactionType,
+    TransactionUpdate,
+)
+from app.services.aggregation import (
+    closed_months_within,
+    created_between,
+    created_up_to,
+    day_start,
+    month_range,
+    open_month,
+    rollup_totals_columns,
+    totals_columns,
+)
+from app.services.cache import bump_data_version, category_cache
+from app.services.serialization import TRANSACTION_FIELDS
+from app.services.utils import (
+    any_id,
+    check_owner,
+    db_error_handler,
+    get_owner_id,
+    raise_for_owner,
+    raise_not_found_or_forbidden,
+    split_missing_ids,
+)
 
 logger = logging.getLogger(__name__)
 
+# Чтение только колонок TransactionOut: строки приходят легкими Row (именованными кортежами)
+# без регистрации в identity map и отслеживания изменений ORM
+TRANSACTION_COLUMNS = tuple(getattr(Transaction, field) for field in TRANSACTION_FIELDS)
+EXPORT_CSV_COLUMNS = ["id", "title", "cash", "type", "category_id", "created_at"]
+
+
+def _owned_category(user_id: int, category_id: int):
+    return exists().where(Category.id == category_id, Category.user_id == user_id)
+
+
+def _category_not_found(category_id: int) -> HTTPException:
+    logger.warning("Category with id %d not found", category_id)
+    return HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+
+
+# Имя внешнего ключа transactions.category_id, которое Postgres дал ему в начальной миграции
+CATEGORY_FOREIGN_KEY = "transactions_category_id_fkey"
+
+
+def _is_category_fk_violation(e: IntegrityError) -> bool:
+    # asyncpg отдает имя ограничения в исходном исключении драйвера, psycopg2 - в diag
+    orig = e.orig
+    constraint = getattr(getattr(orig, "__cause__", None), "constraint_name", None)
+    if constraint is None:
+        constraint = getattr(getattr(orig, "diag", None), "constraint_name", None)
+    return constraint == CATEGORY_FOREIGN_KEY
+
+
+async def _raise_update_miss(session: AsyncSession, user_id: int, transaction_id: int, category_id: Optional[int]):
+    """Промах UPDATE транзакции: 404/403 по транзакции, а если она своя - не прошла проверка категории."""
+    owner_id = await get_owner_id(session, Transaction, transaction_id)
+    if owner_id == user_id:
+        raise _category_not_found(category_id)
+    raise_for_owner(owner_id, transaction_id, user_id, "transaction")
+
 
 @db_error_handler
 async def create_transactions(transaction: TransactionCreate, user: User, session: AsyncSession):
-    result = await session.execute(select(Category).where(Category.id == transaction.category_id))
-    category = result.scalar_one_or_none()
-
-    if category is None:
-        logger.warning("Category with id %d not found", transaction.category_id)
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
-
-    new_transaction = Transaction(
-        title=transaction.title,
-        cash=transaction.cash,
-        type=transaction.type,
-        category_id=transaction.category_id,
-        user_id=user.id,
-    )
+    table = Transaction.__table__
+    values = {
+        "title": transaction.title,
+        "cash": transaction.cash,
+        "type": transaction.type,
+        "category_id": transaction.category_id,
+        "user_id": user.id,
+        "created_at": datetime.utcnow(),
+    }
+
+    if category_cache.contains(user.id, transaction.category_id):
+        stmt = insert(table).values(**values)
+    else:
+        # Категория не в кэше: проверка владельца встроена в INSERT ... SELECT ... WHERE EXISTS
+        stmt = insert(table).from_select(
+            list(values),
+            select(*(literal(value, table.c[name].type) for name, value in values.items()))
+            .where(_owned_category(user.id, transaction.category_id)),
+        )
+
+    try:
+        result = await session.execute(stmt.returning(*table.c))
+    except IntegrityError as e:
+        if not _is_category_fk_violation(e):
+            raise
+        # Кэш устарел: категорию удалили на другом инстансе
+        await session.rollback()
+        category_cache.invalidate(user.id)
+        raise _category_not_found(transaction.category_id)
+
+    new_transaction = result.one_or_none()
+    if new_transaction is None:
+        raise _category_not_found(transaction.category_id)
 
-    session.add(new_transaction)
     await session.commit()
-    await session.refresh(new_transaction)
+    await bump_data_version(user.id)
 
     logger.info("Transaction %d from user %d successfully created", new_transaction.id, user.id)
     return new_transaction
@@ -47,29 +127,37 @@ async def create_transactions(transaction: TransactionCreate, user: User, sessio
 
 @db_error_handler
 async def update_transaction(transaction: TransactionUpdate, user: User, session: AsyncSession, transaction_id: int):
-    db_transaction = await session.get(Transaction, transaction_id)
-
-    if not db_transaction:
-        logger.warning("Transaction with id %d not found", transaction_id)
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
-
-    check_owner(db_transaction, user.id, "transaction")
-
     updated_data = transaction.model_dump(exclude_unset=True)
-    category_id = updated_data.get("category_id")
-    if category_id is not None:
-        result = await session.execute(select(Category).where(Category.id == category_id))
-        category = result.scalar_one_or_none()
-        if category is None:
-            logger.warning("Category with id %d not found", category_id)
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+    if not updated_data:
+        return await get_one_transaction(user, session, transaction_id)
 
-    for key, value in updated_data.items():
-        setattr(db_transaction, key, value)
+    # Проверка владельца внутри WHERE: обновление и чтение результата - один запрос
+    stmt = (
+        update(Transaction)
+        .where(Transaction.id == transaction_id, Transaction.user_id == user.id)
+        .values(**updated_data)
+        .returning(Transaction)
+        .execution_options(synchronize_session=False)
+    )
+    category_id = updated_data.get("category_id")
+    if category_id is not None and not category_cache.contains(user.id, category_id):
+        stmt = stmt.where(_owned_category(user.id, category_id))
+
+    try:
+        result = await session.execute(stmt)
+    except IntegrityError as e:
+        if not _is_category_fk_violation(e):
+            raise
+        await session.rollback()
+        category_cache.invalidate(user.id)
+        raise _category_not_found(category_id)
+
+    db_transaction = result.scalar_one_or_none()
+    if db_transaction is None:
+        await _raise_update_miss(session, user.id, transaction_id, category_id)
 
-    session.add(db_transaction)
     await session.commit()
-    await session.refresh(db_transaction)
+    await bump_data_version(user.id)
 
     logger.info("Transaction %d from user %d successfully updated", transaction_id, user.id)
     return db_transaction
@@ -77,21 +165,84 @@ async def update_transaction(transaction: TransactionUpdate, user: User, session
 
 @db_error_handler
 async def delete_transaction(user: User, session: AsyncSession, transaction_id: int):
-    db_transaction = await session.get(Transaction, transaction_id)
-
-    if not db_transaction:
-        logger.warning("Transaction with id %d not found", transaction_id)
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Transaction not found")
-
-    check_owner(db_transaction, user.id, "transaction")
+    result = await session.execute(
+        delete(Transaction)
+        .where(Transaction.id == transaction_id, Transaction.user_id == user.id)
+        .returning(Transaction.id)
+        .execution_options(synchronize_session=False)
+    )
+    if result.scalar_one_or_none() is None:
+        await raise_not_found_or_forbidden(session, Transaction, transaction_id, user.id, "transaction")
 
-    await session.delete(db_transaction)
     await session.commit()
+    await bump_data_version(user.id)
 
     logger.info("Transaction %d from user %d successfully deleted", transaction_id, user.id)
     return {'message': f'Transaction {transaction_id} successfully deleted'}
 
 
+@db_error_handler
+async def get_transactions_batch(user: User, session: AsyncSession, ids: List[int]):
+    ids = list(dict.fromkeys(ids))
+    result = await session.execute(
+        select(*TRANSACTION_COLUMNS)
+        .where(any_id(Transaction.id, ids), Transaction.user_id == user.id)
+        .order_by(Transaction.id)
+    )
+    transactions = result.all()
+    not_found, forbidden = await split_missing_ids(session, Transaction, ids, (t.id for t in transactions))
+
+    logger.info("User %d retrieved %d of %d transactions in batch", user.id, len(transactions), len(ids))
+    return {"items": transactions, "not_found": not_found, "forbidden": forbidden}
+
+
+@db_error_handler
+async def update_transactions_batch(batch: TransactionBatchUpdate, user: User, session: AsyncSession):
+    ids = list(dict.fromkeys(batch.ids))
+    updated_data = batch.changes.model_dump(exclude_unset=True)
+    if not updated_data:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No fields to update")
+
+    category_id = updated_data.get("category_id")
+    if category_id is not None and not category_cache.contains(user.id, category_id):
+        result = await session.execute(select(_owned_category(user.id, category_id)))
+        if not result.scalar():
+            raise _category_not_found(category_id)
+
+    result = await session.execute(
+        update(Transaction)
+        .where(any_id(Transaction.id, ids), Transaction.user_id == user.id)
+        .values(**updated_data)
+        .returning(Transaction)
+        .execution_options(synchronize_session=False)
+    )
+    transactions = sorted(result.scalars().all(), key=lambda t: t.id)
+    not_found, forbidden = await split_missing_ids(session, Transaction, ids, (t.id for t in transactions))
+    await session.commit()
+    await bump_data_version(user.id)
+
+    logger.info("User %d updated %d of %d transactions in batch", user.id, len(transactions), len(ids))
+    return {"items": transactions, "not_found": not_found, "forbidden": forbidden}
+
+
+@db_error_handler
+async def delete_transactions_batch(user: User, session: AsyncSession, ids: List[int]):
+    ids = list(dict.fromkeys(ids))
+    result = await session.execute(
+        delete(Transaction)
+        .where(any_id(Transaction.id, ids), Transaction.user_id == user.id)
+        .returning(Transaction.id)
+        .execution_options(synchronize_session=False)
+    )
+    deleted = sorted(result.scalars().all())
+    not_found, forbidden = await split_missing_ids(session, Transaction, ids, deleted)
+    await session.commit()
+    await bump_data_version(user.id)
+
+    logger.info("User %d deleted %d of %d transactions in batch", user.id, len(deleted), len(ids))
+    return {"deleted": deleted, "not_found": not_found, "forbidden": forbidden}
+
+
 @db_error_handler
 async def get_one_transaction(user: User, session: AsyncSession, transaction_id: int):
     db_transaction = await session.get(Transaction, transaction_id)
@@ -115,9 +266,10 @@ async def get_transactions(user: User, session: AsyncSession,
     limit: int = Query(20, ge=1, le=100),
     offset: int = Query(0, ge=0),
     sort_by: SortableTransactionFields = Query("created_at"),
-    order: str = Query("desc")):
+    order: str = Query("desc"),
+    q: Optional[str] = None):
 
-    query = select(Transaction).where(Transaction.user_id == user.id)
+    query = select(*TRANSACTION_COLUMNS).where(Transaction.user_id == user.id)
 
     if type is not None:
         query = query.where(Transaction.type == type)
@@ -128,12 +280,18 @@ async def get_transactions(user: User, session: AsyncSession,
     if category_id is not None:
         query = query.where(Transaction.category_id == category_id)
 
+    if q:
+        # ILIKE '%...%' обслуживается GIN-индексом ix_transactions_user_title_trgm
+        escaped = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        query = query.where(Transaction.title.ilike(f"%{escaped}%", escape="\\"))
+        query = query.order_by(func.word_similarity(q, Transaction.title).desc())
+
     order_func = desc if order.lower() == "desc" else asc
     query = query.order_by(order_func(getattr(Transaction, sort_by)))
     query = query.limit(limit).offset(offset)
 
     result = await session.execute(query)
-    transactions = result.scalars().all()
+    transactions = result.all()
 
     logger.info("User %d retrieved %d transactions", user.id, len(transactions))
     return transactions
@@ -144,29 +302,11 @@ async def get_balance(user: User, session: AsyncSession, current_date: Optional[
     if current_date is None:
         current_date = date.today()
 
-    stmt = (
-        select(
-            Transaction.type,
-            func.coalesce(func.sum(Transaction.cash), 0)
-        )
-        .where(
-            Transaction.user_id == user.id,
-            cast(Transaction.created_at, Date) <= current_date
-        )
-        .group_by(Transaction.type)
+    stmt = select(*totals_columns()).where(
+        Transaction.user_id == user.id,
+        created_up_to(current_date),
     )
-
-    result = await session.execute(stmt)
-    rows = result.fetchall()
-
-    income_sum = 0
-    expense_sum = 0
-
-    for tx_type, total in rows:
-        if tx_type == TransactionType.income:
-            income_sum = total
-        elif tx_type == TransactionType.expense:
-            expense_sum = total
+    income_sum, expense_sum = (await session.execute(stmt)).one()
 
     balance = income_sum - expense_sum
     logger.info(f"Balance {balance} on date {current_date} from user {user.id} successfully retrieved")
@@ -175,30 +315,19 @@ async def get_balance(user: User, session: AsyncSession, current_date: Optional[
 
 @db_error_handler
 async def get_analitics_on_month(user: User, session: AsyncSession, year: int, month: int):
-    stmt = (
-        select(
-            Transaction.type,
-            func.sum(Transaction.cash).label("total")
+    start, end = month_range(year, month)
+    if start.date() < open_month():
+        # Закрытый месяц - несколько строк сводки вместо всех транзакций месяца
+        stmt = select(*rollup_totals_columns()).where(
+            MonthlyCategoryTotal.user_id == user.id,
+            MonthlyCategoryTotal.month == start.date(),
         )
-        .where(
+    else:
+        stmt = select(*totals_columns()).where(
             Transaction.user_id == user.id,
-            extract("month", Transaction.created_at) == month,
-            extract("year", Transaction.created_at) == year
+            *created_between(start, end),
         )
-        .group_by(Transaction.type)
-    )
-
-    result = await session.execute(stmt)
-    rows = result.fetchall()
-
-    income_sum = 0
-    expense_sum = 0
-
-    for type_, total in rows:
-        if type_ == TransactionType.income:
-            income_sum = total
-        elif type_ == TransactionType.expense:
-            expense_sum = total
+    income_sum, expense_sum = (await session.execute(stmt)).one()
 
     logger.info("Income %d and Expense %d for %d-%02d retrieved", income_sum, expense_sum, year, month)
 
@@ -217,33 +346,42 @@ async def get_analitics_on_category(
     end_date: Optional[date],
     category_id: Optional[int],
 ):
-    query = (
-        select(
-            Transaction.type,
-            func.sum(Transaction.cash).label("total")
-        )
-        .where(Transaction.user_id == user.id)
-        .group_by(Transaction.type)
-    )
-
-    if start_date is not None:
-        query = query.where(Transaction.created_at >= start_date)
-    if end_date is not None:
-        query = query.where(Transaction.created_at <= end_date)
+    start = day_start(start_date) if start_date is not None else None
+    end = day_start(end_date) if end_date is not None else None
+
+    live = [Transaction.user_id == user.id]
+    if start is not None:
+        live.append(Transaction.created_at >= start)
+    if end is not None:
+        live.append(Transaction.created_at <= end)
     if category_id is not None:
-        query = query.where(Transaction.category_id == category_id)
-
-    result = await session.execute(query)
-    rows = result.fetchall()
-
-    income_sum = 0
-    expense_sum = 0
+        live.append(Transaction.category_id == category_id)
+
+    window = closed_months_within(start, end)
+    if window is None:
+        query = select(*totals_columns()).where(*live)
+    else:
+        # Целые закрытые месяцы берутся из сводки, по транзакциям считаются
+        # только неполные месяцы на краях периода и текущий месяц
+        first, last = window
+        rolled = [MonthlyCategoryTotal.user_id == user.id, MonthlyCategoryTotal.month < last]
+        if first is not None:
+            rolled.append(MonthlyCategoryTotal.month >= first)
+        if category_id is not None:
+            rolled.append(MonthlyCategoryTotal.category_id == category_id)
+        live.append(or_(
+            Transaction.created_at < day_start(first) if first is not None else false(),
+            Transaction.created_at >= day_start(last),
+        ))
+
+        live_totals = select(*totals_columns()).where(*live).subquery()
+        rolled_totals = select(*rollup_totals_columns()).where(*rolled).subquery()
+        query = select(
+            (live_totals.c.income + rolled_totals.c.income).label("income"),
+            (live_totals.c.expense + rolled_totals.c.expense).label("expense"),
+        )
 
-    for type_, total in rows:
-        if type_ == TransactionType.income:
-            income_sum = total
-        elif type_ == TransactionType.expense:
-            expense_sum = total
+    income_sum, expense_sum = (await session.execute(query)).one()
 
     logger.info("Analytics by category_id=%s retrieved for user %d", category_id, user.id)
     return {
@@ -253,35 +391,66 @@ async def get_analitics_on_category(
     }
 
 
+@db_error_handler
+async def get_summary(
+    user: User,
+    session: AsyncSession,
+    current_date: Optional[date],
+    category_id: Optional[int],
+):
+    """Баланс на дату, доходы/расходы текущего месяца и итог по категории одним запросом."""
+    if current_date is None:
+        current_date = date.today()
+
+    month_start, _ = month_range(current_date.year, current_date.month)
+    columns = [
+        *totals_columns(),
+        *totals_columns(Transaction.created_at >= month_start, prefix="month_"),
+    ]
+    if category_id is not None:
+        columns.extend(totals_columns(Transaction.category_id == category_id, prefix="category_"))
+
+    # Все наборы ограничены датой отчета, поэтому общий WHERE сканирует историю один раз
+    row = (await session.execute(
+        select(*columns).where(Transaction.user_id == user.id, created_up_to(current_date))
+    )).one()
+
+    logger.info("Summary on %s retrieved for user %d", current_date, user.id)
+    return {
+        "date": current_date,
+        "balance": row.income - row.expense,
+        "month": f"{current_date.year}-{current_date.month:02d}",
+        "month_income": row.month_income,
+        "month_expense": row.month_expense,
+        "category_id": category_id,
+        "category_income": row.category_income if category_id is not None else None,
+        "category_expense": row.category_expense if category_id is not None else None,
+    }
+
+
 @db_error_handler
 async def export_transactions_csv(
     user: User = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
     result = await session.execute(
-        select(Transaction).where(Transaction.user_id == user.id)
+        select(*(getattr(Transaction, column) for column in EXPORT_CSV_COLUMNS))
+        .where(Transaction.user_id == user.id)
     )
-    transactions = result.scalars().all()
+    rows = result.all()
 
-    if not transactions:
+    if not rows:
         return StreamingResponse(
-            iter(["id,title,cash,type,category_id,created_at\n"]),
+            iter([",".join(EXPORT_CSV_COLUMNS) + "\n"]),
             media_type="text/csv",
             headers={"Content-Disposition": "attachment; filename=empty.csv"}
         )
 
-    data = [
-        {
-            "id": t.id,
-            "title": t.title,
-            "cash": t.cash,
-            "type": t.type,
-            "category_id": t.category_id,
-            "created_at": t.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-        }
-        for t in transactions
-    ]
-    df = pd.DataFrame(data)
+    import pandas as pd  # тяжелый импорт: только при первом экспорте, а не при старте API
+
+    df = pd.DataFrame(rows, columns=EXPORT_CSV_COLUMNS)
+    df["type"] = df["type"].map(lambda t: t.value)
+    df["created_at"] = df["created_at"].dt.strftime("%Y-%m-%d %H:%M:%S")
 
     buffer = StringIO()
     df.to_csv(buffer, index=False)
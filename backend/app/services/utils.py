@@ -1,7 +1,11 @@
 
 from functools import wraps
+from typing import Iterable, List, NoReturn, Optional, Sequence, Tuple
 from fastapi import HTTPException, status
+from sqlalchemy import BigInteger, any_, bindparam, select
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.exceptions import DatabaseException
 import logging
 
@@ -23,6 +27,64 @@ def check_owner(entity, user_id: int, entity_name: str = "Resource"):
         )
 
 
+def raise_for_owner(owner_id: Optional[int], entity_id: int, user_id: int, entity_name: str = "Resource") -> NoReturn:
+    """Поднимает 404, если объекта нет (owner_id is None), иначе 403."""
+    if owner_id is None:
+        logger.warning("%s with id %d not found", entity_name.capitalize(), entity_id)
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{entity_name.capitalize()} not found")
+
+    logger.warning("User %d not authorized to access %s %s", user_id, entity_name, entity_id)
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail=f"Not authorized to access this {entity_name}"
+    )
+
+
+async def get_owner_id(session: AsyncSession, model, entity_id: int) -> Optional[int]:
+    result = await session.execute(select(model.user_id).where(model.id == entity_id))
+    return result.scalar_one_or_none()
+
+
+async def raise_not_found_or_forbidden(
+    session: AsyncSession,
+    model,
+    entity_id: int,
+    user_id: int,
+    entity_name: str = "Resource",
+) -> NoReturn:
+    """
+    Вызывается на промахе UPDATE/DELETE с условием по владельцу: одним запросом
+    выясняет, существует ли объект, и поднимает 404 или 403.
+    """
+    raise_for_owner(await get_owner_id(session, model, entity_id), entity_id, user_id, entity_name)
+
+
+def any_id(column, ids: Sequence[int], name: str = "ids"):
+    """Условие `column = ANY(:ids)` с одним параметром-массивом вместо раскрытого IN (...)."""
+    return column == any_(bindparam(name, list(ids), type_=ARRAY(BigInteger)))
+
+
+async def split_missing_ids(
+    session: AsyncSession,
+    model,
+    ids: Sequence[int],
+    found_ids: Iterable[int],
+) -> Tuple[List[int], List[int]]:
+    """
+    Делит id, не затронутые запросом с фильтром по владельцу, на несуществующие и чужие.
+    Дополнительный запрос выполняется только если такие id есть.
+    :return: (not_found, forbidden)
+    """
+    found = set(found_ids)
+    missing = [i for i in ids if i not in found]
+    if not missing:
+        return [], []
+
+    result = await session.execute(select(model.id).where(any_id(model.id, missing)))
+    existing = set(result.scalars().all())
+    return [i for i in missing if i not in existing], [i for i in missing if i in existing]
+
+
 def db_error_handler(func):
     """
     Декоратор для обработки SQLAlchemyError: откатит транзакцию и
@@ -0,0 +1,142 @@
+import logging
+from datetime import date, datetime, timedelta
+from typing import Iterator, List, Optional, Tuple
+
+import pandas as pd
+from celery import group
+from sqlalchemy import Date, cast, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.config import settings, celery_app
+from app.db.database import SyncSessionLocal
+from app.models.analytics import Anomaly
+from app.models.transactions import Transaction
+from app.schemas.transaction_schema import TransactionType
+from app.services.aggregation import created_between, day_start
+
+logger = logging.getLogger(__name__)
+
+# Модуль загружает только воркер, поэтому pandas здесь не влияет на старт API
+SPEND_COLUMNS = ["user_id", "category_id", "day", "amount"]
+ANOMALY_KEYS = [Anomaly.user_id, Anomaly.day, Anomaly.category_id]
+
+
+def _user_ranges(session, parts: int) -> List[Tuple[int, int]]:
+    """Делит [min(id), max(id)] пользователей на parts полуинтервалов [lo, hi) одинаковой длины."""
+    low, high = session.execute(select(func.min(Transaction.user_id), func.max(Transaction.user_id))).one()
+    if low is None:
+        return []
+    step = max((high - low + 1 + parts - 1) // parts, 1)
+    return [(lo, min(lo + step, high + 1)) for lo in range(low, high + 1, step)]
+
+
+def _daily_spend_stmt(lo: int, hi: int, start: date, end: date):
+    """Расходы по (пользователь, категория, день) - строка на день, а не на транзакцию."""
+    day = cast(func.date_trunc("day", Transaction.created_at), Date).label("day")
+    return (
+        select(Transaction.user_id, Transaction.category_id, day, func.sum(Transaction.cash).label("amount"))
+        .where(
+            Transaction.user_id >= lo,
+            Transaction.user_id < hi,
+            Transaction.type == TransactionType.expense,
+            *created_between(day_start(start), day_start(end + timedelta(days=1))),
+        )
+        .group_by(Transaction.user_id, Transaction.category_id, day)
+        .order_by(Transaction.user_id, Transaction.category_id, day)
+        .execution_options(yield_per=settings.ANOMALY_CHUNK_ROWS)
+    )
+
+
+def stream_daily_spend(session, stmt) -> Iterator[pd.DataFrame]:
+    """
+    Читает агрегаты пачками серверного курсора. Строки последнего пользователя пачки
+    переносятся в следующую: ряды категорий пользователя не разрываются между пачками.
+    """
+    pending = None
+    for partition in session.execute(stmt).partitions():
+        chunk = pd.DataFrame(partition, columns=SPEND_COLUMNS)
+        if pending is not None:
+            chunk = pd.concat([pending, chunk], ignore_index=True)
+        tail = chunk["user_id"].to_numpy() == chunk["user_id"].iat[-1]
+        pending = chunk[tail]
+        if not tail.all():
+            yield chunk[~tail]
+    if pending is not None:
+        yield pending
+
+
+def find_anomalies(spend: pd.DataFrame, since: date) -> pd.DataFrame:
+    """
+    Медиана предыдущих ANOMALY_WINDOW дней с расходами по каждой паре (пользователь, категория)
+    считается одним groupby().rolling() по всей пачке, без цикла по пользователям.
+    Возвращает дни начиная с since, где расход не меньше ANOMALY_FACTOR медиан.
+    """
+    spend = spend.sort_values(["user_id", "category_id", "day"], ignore_index=True)
+    keys = [spend["user_id"], spend["category_id"]]
+    # Сдвиг: текущий день не входит в собственную медиану
+    previous = spend.groupby(keys, sort=False)["amount"].shift()
+    median = (
+        previous.groupby(keys, sort=False)
+        .rolling(settings.ANOMALY_WINDOW, min_periods=settings.ANOMALY_MIN_HISTORY)
+        .median()
+        .droplevel([0, 1])
+    )
+    spend = spend.assign(median=median)
+
+    flagged = spend[
+        (pd.to_datetime(spend["day"]) >= pd.Timestamp(since))
+        & (spend["median"] > 0)
+        & (spend["amount"] >= settings.ANOMALY_FACTOR * spend["median"])
+    ]
+    return flagged.assign(ratio=flagged["amount"] / flagged["median"])
+
+
+def detect_range(lo: int, hi: int, day: date) -> int:
+    """Пересчитывает аномалии пользователей [lo, hi) за последние ANOMALY_DETECT_DAYS дней до day."""
+    since = day - timedelta(days=settings.ANOMALY_DETECT_DAYS - 1)
+    start = since - timedelta(days=settings.ANOMALY_HISTORY_DAYS)
+    stmt = insert(Anomaly)
+    upsert = stmt.on_conflict_do_update(
+        index_elements=ANOMALY_KEYS,
+        set_={"amount": stmt.excluded.amount, "median": stmt.excluded.median,
+              "ratio": stmt.excluded.ratio, "detected_at": stmt.excluded.detected_at},
+    )
+    detected_at = datetime.utcnow()
+    found = 0
+
+    with SyncSessionLocal() as reader, SyncSessionLocal() as writer:
+        # Окно пересчитывается целиком: аномалии, исчезнувшие после правок, удаляются
+        writer.execute(delete(Anomaly).where(
+            Anomaly.user_id >= lo, Anomaly.user_id < hi, Anomaly.day >= since, Anomaly.day <= day,
+        ))
+        for spend in stream_daily_spend(reader, _daily_spend_stmt(lo, hi, start, day)):
+            flagged = find_anomalies(spend, since)
+            if flagged.empty:
+                continue
+            records = flagged[["user_id", "category_id", "day", "amount", "median", "ratio"]].to_dict("records")
+            for record in records:
+                record["detected_at"] = detected_at
+            writer.execute(upsert, records)
+            found += len(records)
+        writer.commit()
+
+    return found
+
+
+@celery_app.task
+def detect_anomalies_range(lo: int, hi: int, day: str) -> int:
+    found = detect_range(lo, hi, date.fromisoformat(day))
+    logger.info("Anomalies for users [%d, %d) on %s: %d found", lo, hi, day, found)
+    return found
+
+
+@celery_app.task
+def detect_anomalies(day: Optional[str] = None) -> int:
+    """Ночной запуск: делит пользователей на диапазоны id и обрабатывает их параллельными задачами."""
+    run_day = date.fromisoformat(day) if day else datetime.utcnow().date() - timedelta(days=1)
+    with SyncSessionLocal() as session:
+        ranges = _user_ranges(session, settings.ANOMALY_USER_RANGES)
+
+    group(detect_anomalies_range.s(lo, hi, run_day.isoformat()) for lo, hi in ranges).apply_async()
+    logger.info("Anomaly detection for %s started in %d ranges", run_day, len(ranges))
+    return len(ranges)
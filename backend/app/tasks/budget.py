@@ -0,0 +1,51 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.db.config import celery_app
+from app.db.database import SyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Пересчитывает счетчики category_spend из transactions и исправляет только расходящиеся строки.
+# Счетчики без расходов удаляются. Запрос видит снимок на момент старта: запись, закоммиченная
+# во время пересчета, может быть перезаписана - такое расхождение исправит следующий запуск.
+RECONCILE_SPEND_SQL = text("""
+WITH actual AS (
+    SELECT user_id, category_id, date_trunc('month', created_at)::date AS month, SUM(cash) AS spent
+    FROM transactions
+    WHERE type = 'expense' AND (CAST(:user_id AS bigint) IS NULL OR user_id = :user_id)
+    GROUP BY 1, 2, 3
+),
+fixed AS (
+    INSERT INTO category_spend AS s (user_id, category_id, month, spent)
+    SELECT user_id, category_id, month, spent FROM actual
+    ON CONFLICT (user_id, category_id, month) DO UPDATE SET spent = EXCLUDED.spent
+    WHERE abs(s.spent - EXCLUDED.spent) > 1e-6
+    RETURNING 1
+),
+stale AS (
+    DELETE FROM category_spend s
+    WHERE (CAST(:user_id AS bigint) IS NULL OR s.user_id = :user_id)
+      AND NOT EXISTS (
+          SELECT 1 FROM actual a
+          WHERE a.user_id = s.user_id AND a.category_id = s.category_id AND a.month = s.month
+      )
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM fixed) AS fixed, (SELECT count(*) FROM stale) AS removed
+""")
+
+
+@celery_app.task
+def reconcile_category_spend(user_id: Optional[int] = None) -> dict:
+    with SyncSessionLocal() as session:
+        row = session.execute(RECONCILE_SPEND_SQL, {"user_id": user_id}).one()
+        session.commit()
+
+    if row.fixed or row.removed:
+        logger.warning("Category spend drift repaired: %d rows fixed, %d removed", row.fixed, row.removed)
+    else:
+        logger.info("Category spend counters are consistent")
+    return {"fixed": row.fixed, "removed": row.removed}
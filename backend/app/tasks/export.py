@@ -1,63 +1,509 @@
+import asyncio
+import logging
+import math
+import os
+import shutil
+import uuid
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
 import pandas as pd
-from app.models.transactions import Transaction
+from celery import chord, group
+from openpyxl import Workbook
+from sqlalchemy import BigInteger, func, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import insert
+
+from app.models.export import ExportJob, ExportWatermark
+from app.models.outbox import Outbox
+from app.models.transactions import Transaction, Category
 from app.db.config import settings, celery_app
-import uuid
-import os
-from fastapi_mail import FastMail, MessageSchema, ConnectionConfig
 from app.models.auth import User
 from app.db.database import SyncSessionLocal
+from app.services.aggregation import totals_columns
 
-EXPORT_FOLDER = "app/static/exports"
-os.makedirs(EXPORT_FOLDER, exist_ok=True)
+logger = logging.getLogger(__name__)
 
-MAIL_CONFIG = ConnectionConfig(
-    MAIL_USERNAME = settings.MAIL_USERNAME,
-    MAIL_PASSWORD = settings.MAIL_PASSWORD, # type: ignore
-    MAIL_FROM = settings.MAIL_FROM,
-    MAIL_SERVER = settings.MAIL_SERVER,
-    MAIL_PORT = settings.MAIL_PORT,
-    MAIL_STARTTLS = True,
-    MAIL_SSL_TLS = False,
-    USE_CREDENTIALS = True,
-    VALIDATE_CERTS = True,
-)
+# Модуль задач загружается только воркером и при первом inline-экспорте,
+# поэтому pandas и openpyxl здесь не влияют на старт API
+EXPORT_FOLDER = settings.EXPORT_DIR
+EXPORT_PARTS_FOLDER = os.path.join(EXPORT_FOLDER, "parts")
 
+EXPORT_COLUMNS = ["id", "cash", "type", "created_at", "category_id"]
+# Строки дельты: upsert - новая или измененная транзакция, delete - удаленная (заполнен только id)
+DELTA_COLUMNS = ["op"] + EXPORT_COLUMNS
+EXPORT_CHUNK_ROWS = 10000
 
-@celery_app.task
-def export_transactions_to_csv(user_id: int) -> str:
+XLSX_TRANSACTION_COLUMNS = ["id", "title", "cash", "type", "category", "created_at"]
+XLSX_MONTHLY_COLUMNS = ["month", "income", "expense", "transactions"]
+XLSX_CATEGORY_COLUMNS = ["category_id", "category", "income", "expense", "transactions"]
+
+
+@lru_cache(maxsize=None)
+def _mail_config():
+    from fastapi_mail import ConnectionConfig
+
+    return ConnectionConfig(
+        MAIL_USERNAME = settings.MAIL_USERNAME,
+        MAIL_PASSWORD = settings.MAIL_PASSWORD, # type: ignore
+        MAIL_FROM = settings.MAIL_FROM,
+        MAIL_SERVER = settings.MAIL_SERVER,
+        MAIL_PORT = settings.MAIL_PORT,
+        MAIL_STARTTLS = True,
+        MAIL_SSL_TLS = False,
+        USE_CREDENTIALS = True,
+        VALIDATE_CERTS = True,
+    )
+
+
+def _open_export_file(filepath: str):
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    return open(filepath, "w", newline="")
+
+
+# Состояние задачи в export_jobs пишется отдельными короткими транзакциями, чтобы /status
+# видел прогресс сразу, а долгий курсор выгрузки не держал блокировку строки задачи.
+# Для id без строки в export_jobs (прямой вызов задачи) UPDATE просто ничего не меняет
+def _update_job(export_id: str, **values) -> None:
+    with SyncSessionLocal() as session:
+        session.execute(update(ExportJob).where(ExportJob.id == export_id).values(**values))
+        session.commit()
+
+
+def _start_job(export_id: str, user_id: int, format: str, delta: bool,
+               total_rows: Optional[int] = None) -> None:
+    # Задача Celery может стартовать раньше, чем API запишет строку после send_task.
+    # При acks_late задача может прийти повторно: прогресс и итог прошлой попытки сбрасываются
+    stmt = insert(ExportJob).values(
+        id=export_id, user_id=user_id, format=format, delta=delta,
+        total_rows=total_rows, started_at=datetime.utcnow(),
+    )
     with SyncSessionLocal() as session:
-        # Получение транзакций
-        transactions = session.query(Transaction).filter(Transaction.user_id == user_id).all()
-
-        # Формирование CSV
-        data = [{
-            "id": t.id,
-            "cash": t.cash,
-            "type": t.type.value,
-            "created_at": t.created_at.strftime('%Y-%m-%d'),
-            "category_id": t.category_id,
-        } for t in transactions]
-
-        df = pd.DataFrame(data)
-        filename = f"{user_id}_{uuid.uuid4().hex}.csv"
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=[ExportJob.id],
+            set_={
+                "total_rows": stmt.excluded.total_rows,
+                "started_at": stmt.excluded.started_at,
+                "rows_written": 0,
+                "shard_rows": {},
+                "status": "pending",
+                "error": None,
+                "byte_size": None,
+                "file_path": None,
+                "finished_at": None,
+            },
+        ))
+        session.commit()
+
+
+def _shard_written(shard: int):
+    return func.coalesce(ExportJob.shard_rows[str(shard)].astext.cast(BigInteger), 0)
+
+
+def _set_shard_written(shard: int, rows):
+    return ExportJob.shard_rows.op("||", return_type=JSONB)(func.jsonb_build_object(str(shard), rows))
+
+
+def _add_progress(export_id: Optional[str], rows: int, shard: Optional[int] = None) -> None:
+    if export_id is None or not rows:
+        return
+    values = {"rows_written": ExportJob.rows_written + rows}
+    if shard is not None:
+        values["shard_rows"] = _set_shard_written(shard, _shard_written(shard) + rows)
+    _update_job(export_id, **values)
+
+
+def _reset_shard(export_id: str, shard: int) -> None:
+    """Начало шарда: вклад прошлой попытки (acks_late) вычитается из rows_written."""
+    _update_job(
+        export_id,
+        rows_written=ExportJob.rows_written - _shard_written(shard),
+        shard_rows=_set_shard_written(shard, 0),
+    )
+
+
+def _finish_job(export_id: str, filepath: str) -> None:
+    _update_job(
+        export_id,
+        status="completed",
+        file_path=filepath,
+        byte_size=os.path.getsize(filepath),
+        finished_at=datetime.utcnow(),
+    )
+
+
+def _fail_job(export_id: str, error: str) -> None:
+    _update_job(export_id, status="failed", error=error[:1000], finished_at=datetime.utcnow())
+
+
+def _count_rows(session, user_id: int) -> int:
+    return session.execute(
+        select(func.count()).select_from(Transaction).where(Transaction.user_id == user_id)
+    ).scalar_one()
+
+
+def _shard_ranges(session, user_id: int,
+                  total: Optional[int] = None) -> List[Tuple[Optional[datetime], Optional[datetime]]]:
+    """
+    Делит историю пользователя на диапазоны [start, end) по created_at.
+    Границы берутся из ntile(), поэтому шарды примерно равны по числу строк.
+    Для небольших историй возвращает один неограниченный диапазон.
+    """
+    if total is None:
+        total = _count_rows(session, user_id)
+
+    shards = min(settings.EXPORT_MAX_SHARDS, math.ceil(total / settings.EXPORT_SHARD_ROWS))
+    if shards <= 1:
+        return [(None, None)]
+
+    buckets = (
+        select(
+            Transaction.created_at,
+            func.ntile(shards).over(order_by=(Transaction.created_at, Transaction.id)).label("bucket"),
+        )
+        .where(Transaction.user_id == user_id)
+        .subquery()
+    )
+    starts = session.execute(
+        select(func.min(buckets.c.created_at)).group_by(buckets.c.bucket).order_by(buckets.c.bucket)
+    ).scalars().all()
+
+    # Одинаковые created_at всегда попадают в один шард, поэтому границы могут совпадать
+    bounds = sorted(set(starts))[1:]
+    starts = [None] + bounds
+    ends = bounds + [None]
+    return list(zip(starts, ends))
+
+
+def _export_stmt(user_id: int):
+    return (
+        select(
+            Transaction.id,
+            Transaction.cash,
+            Transaction.type,
+            Transaction.created_at,
+            Transaction.category_id,
+        )
+        .where(Transaction.user_id == user_id)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+
+
+def _frames(session, stmt):
+    for partition in session.execute(stmt).partitions():
+        df = pd.DataFrame(partition, columns=EXPORT_COLUMNS)
+        df["type"] = df["type"].map(lambda t: t.value)
+        df["created_at"] = df["created_at"].dt.strftime('%Y-%m-%d')
+        yield df
+
+
+def _write_rows(session, user_id: int, filepath: str, start: Optional[datetime],
+                end: Optional[datetime], header: bool, export_id: Optional[str] = None,
+                shard: Optional[int] = None) -> int:
+    """Потоково пишет транзакции из диапазона [start, end) в CSV, не держа всю выборку в памяти."""
+    stmt = _export_stmt(user_id).order_by(Transaction.created_at, Transaction.id)
+    if start is not None:
+        stmt = stmt.where(Transaction.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Transaction.created_at < end)
+
+    written = 0
+    with _open_export_file(filepath) as f:
+        if header:
+            f.write(",".join(EXPORT_COLUMNS) + "\n")
+        for df in _frames(session, stmt):
+            df.to_csv(f, header=False, index=False)
+            written += len(df)
+            _add_progress(export_id, len(df), shard)
+    return written
+
+
+def _write_delta(session, user_id: int, filepath: str, since: datetime,
+                 export_id: Optional[str] = None) -> int:
+    """
+    Пишет транзакции, созданные или измененные начиная с since (индекс user_id, updated_at),
+    и удаления из outbox за тот же период. Объем работы пропорционален числу изменений.
+    """
+    stmt = (
+        _export_stmt(user_id)
+        .where(Transaction.updated_at >= since)
+        .order_by(Transaction.updated_at, Transaction.id)
+    )
+    deleted = (
+        select(Outbox.entity_id)
+        .where(
+            Outbox.entity == "transaction",
+            Outbox.operation == "delete",
+            Outbox.user_id == user_id,
+            Outbox.created_at >= since,
+        )
+        .order_by(Outbox.seq)
+    )
+
+    written = 0
+    with _open_export_file(filepath) as f:
+        f.write(",".join(DELTA_COLUMNS) + "\n")
+        for df in _frames(session, stmt):
+            df.insert(0, "op", "upsert")
+            df.to_csv(f, header=False, index=False)
+            written += len(df)
+            _add_progress(export_id, len(df))
+        deletes = 0
+        for entity_id in session.execute(deleted).scalars():
+            f.write(f"delete,{entity_id},,,,\n")
+            deletes += 1
+        _add_progress(export_id, deletes)
+    return written + deletes
+
+
+def _export_bounds(session, user_id: int, delta: bool) -> Tuple[datetime, Optional[datetime]]:
+    """
+    Снимок времени БД (в том же виде, что updated_at) и нижняя граница дельты.
+    Граница None - нужен полный экспорт: дельта не запрошена, отметки еще нет
+    или удаления за этот период уже вычищены из outbox.
+    """
+    snapshot = session.execute(select(func.localtimestamp())).scalar_one()
+    if not delta:
+        return snapshot, None
+
+    exported_at = session.execute(
+        select(ExportWatermark.exported_at).where(ExportWatermark.user_id == user_id)
+    ).scalar_one_or_none()
+    if exported_at is None:
+        return snapshot, None
+
+    since = exported_at - timedelta(seconds=settings.EXPORT_DELTA_OVERLAP_SECONDS)
+    if since < snapshot - timedelta(days=settings.OUTBOX_RETENTION_DAYS):
+        return snapshot, None
+    return snapshot, since
+
+
+def _save_watermark(session, user_id: int, export_id: str, exported_at: datetime) -> None:
+    stmt = insert(ExportWatermark).values(user_id=user_id, exported_at=exported_at, export_id=export_id)
+    session.execute(stmt.on_conflict_do_update(
+        index_elements=[ExportWatermark.user_id],
+        set_={"exported_at": stmt.excluded.exported_at, "export_id": stmt.excluded.export_id},
+        # Экспорт, завершившийся позже более нового, не откатывает отметку назад
+        where=ExportWatermark.exported_at < stmt.excluded.exported_at,
+    ))
+    session.commit()
+
+
+def _notify_user(session, user_id: int, filename: str) -> None:
+    user = session.get(User, user_id)
+    if user and user.email:
+        from fastapi_mail import FastMail, MessageSchema
+
+        message = MessageSchema(
+            subject="Ваш экспорт готов",
+            recipients=[user.email],
+            body=f"Ваш файл экспорта доступен по ссылке: https://yourdomain.com/static/exports/{filename}",
+            subtype="plain",
+        )
+        fm = FastMail(_mail_config())
+        # Отправка письма синхронно
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.run_until_complete(fm.send_message(message))
+        loop.close()
+
+
+def _parse_bound(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value is not None else None
+
+
+def _export_serial(session, user_id: int, export_id: str, snapshot: datetime,
+                   since: Optional[datetime] = None) -> str:
+    if since is None:
+        filename = f"{user_id}_{export_id}.csv"
+        filepath = os.path.join(EXPORT_FOLDER, filename)
+        _write_rows(session, user_id, filepath, None, None, header=True, export_id=export_id)
+    else:
+        filename = f"{user_id}_{export_id}_delta.csv"
         filepath = os.path.join(EXPORT_FOLDER, filename)
-        df.to_csv(filepath, index=False)
-
-        # Получение email пользователя
-        user = session.get(User, user_id)
-        if user and user.email:
-            message = MessageSchema(
-                subject="Ваш экспорт готов",
-                recipients=[user.email],
-                body=f"Ваш файл экспорта доступен по ссылке: https://yourdomain.com/static/exports/{filename}",
-                subtype="plain",
-            )
-            fm = FastMail(MAIL_CONFIG)
-            # Отправка письма синхронно
-            import asyncio
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop.run_until_complete(fm.send_message(message))
-            loop.close()
-
-        return f"/static/exports/{filename}"
\ No newline at end of file
+        _write_delta(session, user_id, filepath, since, export_id=export_id)
+    _save_watermark(session, user_id, export_id, snapshot)
+    _finish_job(export_id, filepath)
+    _notify_user(session, user_id, filename)
+    return f"/static/exports/{filename}"
+
+
+def export_csv_inline(user_id: int, export_id: str, delta: bool = False) -> str:
+    """Однопроходный экспорт без Celery - для небольших историй, см. app/services/export.py."""
+    try:
+        with SyncSessionLocal() as session:
+            snapshot, since = _export_bounds(session, user_id, delta)
+            # Для дельты общее число строк заранее неизвестно - прогресс не считается
+            total = _count_rows(session, user_id) if since is None else None
+            _start_job(export_id, user_id, "csv", delta, total)
+            return _export_serial(session, user_id, export_id, snapshot, since)
+    except Exception as e:
+        _fail_job(export_id, str(e))
+        raise
+
+
+@celery_app.task(bind=True, acks_late=True)
+def export_transactions_to_csv(self, user_id: int, delta: bool = False) -> str:
+    # id задачи Celery - он же id строки export_jobs, которую создает API
+    export_id = self.request.id or uuid.uuid4().hex
+
+    try:
+        with SyncSessionLocal() as session:
+            snapshot, since = _export_bounds(session, user_id, delta)
+            # Дельта пропорциональна изменениям за период и выгружается одним проходом
+            if since is not None:
+                _start_job(export_id, user_id, "csv", delta)
+                return _export_serial(session, user_id, export_id, snapshot, since)
+
+            total = _count_rows(session, user_id)
+            _start_job(export_id, user_id, "csv", delta, total)
+            ranges = _shard_ranges(session, user_id, total)
+            if len(ranges) == 1:
+                return _export_serial(session, user_id, export_id, snapshot)
+    except Exception as e:
+        _fail_job(export_id, str(e))
+        raise
+
+    # Большие истории режем по created_at и выгружаем параллельно: каждый шард сам
+    # ведет свой вклад в прогресс, ошибка любого из них помечает задачу failed
+    shards = group(
+        export_shard.s(
+            user_id,
+            export_id,
+            index,
+            start.isoformat() if start else None,
+            end.isoformat() if end else None,
+        )
+        for index, (start, end) in enumerate(ranges)
+    )
+    merge = merge_export_shards.s(user_id, export_id, snapshot.isoformat())
+    return self.replace(chord(shards, merge.on_error(mark_export_failed.s(export_id=export_id))))
+
+
+@celery_app.task(acks_late=True)
+def export_shard(user_id: int, export_id: str, index: int,
+                 start: Optional[str], end: Optional[str]) -> str:
+    filepath = os.path.join(EXPORT_PARTS_FOLDER, f"{export_id}_{index:04d}.csv")
+    _reset_shard(export_id, index)
+    with SyncSessionLocal() as session:
+        _write_rows(session, user_id, filepath, _parse_bound(start), _parse_bound(end),
+                    header=False, export_id=export_id, shard=index)
+    return filepath
+
+
+@celery_app.task(acks_late=True)
+def merge_export_shards(part_paths: List[str], user_id: int, export_id: str,
+                        exported_at: Optional[str] = None) -> str:
+    # chord передает результаты в порядке шардов, а шарды упорядочены по created_at
+    filename = f"{user_id}_{export_id}.csv"
+    filepath = os.path.join(EXPORT_FOLDER, filename)
+    with _open_export_file(filepath) as out:
+        out.write(",".join(EXPORT_COLUMNS) + "\n")
+        for path in part_paths:
+            with open(path, newline="") as part:
+                shutil.copyfileobj(part, out)
+            os.remove(path)
+
+    with SyncSessionLocal() as session:
+        if exported_at is not None:
+            _save_watermark(session, user_id, export_id, datetime.fromisoformat(exported_at))
+        _finish_job(export_id, filepath)
+        _notify_user(session, user_id, filename)
+
+    return f"/static/exports/{filename}"
+
+
+@celery_app.task
+def mark_export_failed(*args, export_id: str) -> None:
+    """errback chord'а: Celery передает (request, exc, traceback) упавшей задачи."""
+    error = str(args[1]) if len(args) > 1 else "Export shard failed"
+    logger.warning("Sharded export %s failed: %s", export_id, error)
+    _fail_job(export_id, error)
+
+
+def _xlsx_report_rows(session, user_id: int):
+    """Готовит три выборки отчета: две агрегатные сводки, посчитанные в SQL, и поток транзакций."""
+    month = func.date_trunc("month", Transaction.created_at).label("month")
+    monthly = session.execute(
+        select(month, *totals_columns(), func.count().label("transactions"))
+        .where(Transaction.user_id == user_id)
+        .group_by(month)
+        .order_by(month)
+    ).all()
+
+    by_category = session.execute(
+        select(Category.id, Category.title, *totals_columns(), func.count().label("transactions"))
+        .join(Transaction, Transaction.category_id == Category.id)
+        .where(Transaction.user_id == user_id)
+        .group_by(Category.id, Category.title)
+        .order_by(Category.title)
+    ).all()
+
+    # yield_per включает серверный курсор: строки читаются пачками по мере записи в лист
+    transactions = session.execute(
+        select(
+            Transaction.id,
+            Transaction.title,
+            Transaction.cash,
+            Transaction.type,
+            Category.title,
+            Transaction.created_at,
+        )
+        .join(Category, Category.id == Transaction.category_id)
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.created_at, Transaction.id)
+        .execution_options(yield_per=EXPORT_CHUNK_ROWS)
+    )
+
+    return transactions, monthly, by_category
+
+
+def _write_xlsx_report(filepath: str, transactions, monthly, by_category,
+                       export_id: Optional[str] = None) -> int:
+    """
+    Собирает книгу в write-only режиме openpyxl: строки сразу сбрасываются
+    во временный файл, поэтому память не растет с числом транзакций.
+    """
+    wb = Workbook(write_only=True)
+
+    ws = wb.create_sheet("Transactions")
+    ws.append(XLSX_TRANSACTION_COLUMNS)
+    written = 0
+    for id_, title, cash, type_, category, created_at in transactions:
+        ws.append([id_, title, cash, type_.value, category, created_at])
+        written += 1
+        if written % EXPORT_CHUNK_ROWS == 0:
+            _add_progress(export_id, EXPORT_CHUNK_ROWS)
+    _add_progress(export_id, written % EXPORT_CHUNK_ROWS)
+
+    ws = wb.create_sheet("Monthly")
+    ws.append(XLSX_MONTHLY_COLUMNS)
+    for month, income, expense, count in monthly:
+        ws.append([month.strftime("%Y-%m"), income, expense, count])
+
+    ws = wb.create_sheet("Categories")
+    ws.append(XLSX_CATEGORY_COLUMNS)
+    for row in by_category:
+        ws.append(list(row))
+
+    os.makedirs(os.path.dirname(filepath), exist_ok=True)
+    wb.save(filepath)
+    return written
+
+
+@celery_app.task(bind=True, acks_late=True)
+def export_transactions_to_xlsx(self, user_id: int) -> str:
+    export_id = self.request.id or uuid.uuid4().hex
+    filename = f"{user_id}_{export_id}.xlsx"
+    filepath = os.path.join(EXPORT_FOLDER, filename)
+    try:
+        with SyncSessionLocal() as session:
+            _start_job(export_id, user_id, "xlsx", False, _count_rows(session, user_id))
+            _write_xlsx_report(filepath, *_xlsx_report_rows(session, user_id), export_id=export_id)
+            _finish_job(export_id, filepath)
+            _notify_user(session, user_id, filename)
+    except Exception as e:
+        _fail_job(export_id, str(e))
+        raise
+    return f"/static/exports/{filename}"
@@ -0,0 +1,51 @@
+import logging
+import time
+
+from app.db.config import settings, celery_app
+from app.db.database import SyncSessionLocal
+from app.services.outbox import claim_batch, dispatch, purge_processed
+
+logger = logging.getLogger(__name__)
+
+# Следующий запуск по расписанию продолжит с того же места
+RUN_BUDGET_SECONDS = 8
+
+
+def drain_batch(session) -> int:
+    """Разбирает одну пачку в одной транзакции: ошибка подписчика возвращает пачку в очередь."""
+    events = claim_batch(session, settings.OUTBOX_BATCH_SIZE)
+    if events:
+        dispatch(session, events)
+    session.commit()
+    return len(events)
+
+
+@celery_app.task
+def drain_outbox() -> int:
+    started = time.monotonic()
+    drained = 0
+
+    while time.monotonic() - started < RUN_BUDGET_SECONDS:
+        with SyncSessionLocal() as session:
+            try:
+                count = drain_batch(session)
+            except Exception:
+                session.rollback()
+                logger.exception("Outbox batch failed, it will be redelivered")
+                raise
+        drained += count
+        if count < settings.OUTBOX_BATCH_SIZE:
+            break
+
+    if drained:
+        logger.info("Outbox drained: %d events", drained)
+    return drained
+
+
+@celery_app.task
+def purge_outbox() -> int:
+    with SyncSessionLocal() as session:
+        purged = purge_processed(session, settings.OUTBOX_RETENTION_DAYS)
+        session.commit()
+    logger.info("Outbox purged: %d processed events", purged)
+    return purged
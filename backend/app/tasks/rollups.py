@@ -0,0 +1,220 @@
+import logging
+import time
+from datetime import date, timedelta
+from typing import List
+
+from sqlalchemy import Integer, case, cast, delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert
+
+from app.db.config import settings, celery_app
+from app.db.database import SyncSessionLocal
+from app.models.analytics import MonthlyTotalsDirty
+from app.models.platform import PlatformAmountBucket, PlatformDailyTotals, PlatformDirtyDay, PlatformUserDay
+from app.models.transactions import Transaction
+from app.services.aggregation import created_between, day_start, totals_columns
+from app.services.cache import bump_data_versions_sync
+from app.services.outbox import subscribe
+
+logger = logging.getLogger(__name__)
+
+RUN_BUDGET_SECONDS = 50
+
+# Десятичный порядок суммы: 0 - меньше 1, k - [10^(k-1), 10^k)
+AMOUNT_BUCKET = case(
+    (Transaction.cash < 1, 0),
+    else_=cast(func.floor(func.log(Transaction.cash)), Integer) + 1,
+).label("bucket")
+
+
+# Пересчет пачки месяцев пользователей одним запросом, как в reconcile_category_spend:
+#  claimed  - забирает до :batch_size устаревших (user_id, month), SKIP LOCKED;
+#  actual   - суммы по транзакциям этих месяцев (индекс user_id, created_at);
+#  upserted - записывает изменившиеся строки;
+#  stale    - удаляет строки категорий и типов, которых в месяце больше нет.
+# Запись, закоммиченная после снимка, снова пометит месяц через outbox.
+REFRESH_MONTHLY_TOTALS_SQL = text("""
+WITH claimed AS (
+    DELETE FROM monthly_totals_dirty d
+    WHERE (d.user_id, d.month) IN (
+        SELECT user_id, month FROM monthly_totals_dirty
+        ORDER BY user_id, month
+        LIMIT :batch_size
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING d.user_id, d.month
+),
+actual AS (
+    SELECT c.user_id, c.month, t.category_id, t.type, SUM(t.cash) AS total, count(*) AS transactions
+    FROM claimed c
+    JOIN transactions t
+      ON t.user_id = c.user_id AND t.created_at >= c.month AND t.created_at < c.month + interval '1 month'
+    GROUP BY 1, 2, 3, 4
+),
+upserted AS (
+    INSERT INTO monthly_category_totals AS m (user_id, month, category_id, type, total, transactions)
+    SELECT user_id, month, category_id, type, total, transactions FROM actual
+    ON CONFLICT (user_id, month, category_id, type) DO UPDATE
+    SET total = EXCLUDED.total, transactions = EXCLUDED.transactions
+    WHERE m.total <> EXCLUDED.total OR m.transactions <> EXCLUDED.transactions
+    RETURNING 1
+),
+stale AS (
+    DELETE FROM monthly_category_totals m
+    USING claimed c
+    WHERE m.user_id = c.user_id AND m.month = c.month
+      AND NOT EXISTS (
+          SELECT 1 FROM actual a
+          WHERE a.user_id = m.user_id AND a.month = m.month
+            AND a.category_id = m.category_id AND a.type = m.type
+      )
+    RETURNING 1
+)
+SELECT (SELECT count(*) FROM claimed) AS months, (SELECT array_agg(DISTINCT user_id) FROM claimed) AS user_ids
+""")
+
+
+def _created_on(event) -> date:
+    return date.fromisoformat(event.payload["created_at"][:10])
+
+
+@subscribe("transaction")
+def mark_months_dirty(session, events) -> None:
+    """Помечает месяцы измененных транзакций к пересчету monthly_category_totals."""
+    months = sorted({
+        (event.user_id, _created_on(event).replace(day=1))
+        for event in events
+        if event.payload.get("created_at")
+    })
+    if months:
+        session.execute(
+            insert(MonthlyTotalsDirty)
+            .values([{"user_id": user_id, "month": month} for user_id, month in months])
+            .on_conflict_do_nothing()
+        )
+
+
+@subscribe("transaction")
+def mark_days_dirty(session, events) -> None:
+    """Помечает дни измененных транзакций к пересчету в той же транзакции, что и разбор outbox."""
+    days = sorted({
+        _created_on(event)
+        for event in events
+        if event.payload.get("created_at")
+    })
+    if days:
+        # Сортировка задает общий порядок блокировок для параллельных воркеров
+        session.execute(insert(PlatformDirtyDay).values([{"day": day} for day in days]).on_conflict_do_nothing())
+
+
+def claim_dirty_days(session, limit: int) -> List[date]:
+    pending = (
+        select(PlatformDirtyDay.day)
+        .order_by(PlatformDirtyDay.day)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    result = session.execute(
+        delete(PlatformDirtyDay).where(PlatformDirtyDay.day.in_(pending)).returning(PlatformDirtyDay.day)
+    )
+    return sorted(result.scalars().all())
+
+
+def refresh_days(session, days: List[date]) -> None:
+    """
+    Пересчитывает сводки за дни целиком. Агрегаты читаются отдельными SELECT - только такие
+    запросы Postgres выполняет параллельно; запись делается уже по готовым строкам.
+    """
+    session.execute(
+        select(func.set_config("max_parallel_workers_per_gather", str(settings.ROLLUP_PARALLEL_WORKERS), True))
+    )
+
+    day = func.date(Transaction.created_at).label("day")
+    scope = (
+        *created_between(day_start(days[0]), day_start(days[-1] + timedelta(days=1))),
+        day.in_(days),
+    )
+    user_days = session.execute(
+        select(day, Transaction.user_id, func.count().label("transactions"), *totals_columns())
+        .where(*scope)
+        .group_by(day, Transaction.user_id)
+    ).mappings().all()
+    buckets = session.execute(
+        select(day, Transaction.type, AMOUNT_BUCKET, func.count().label("transactions"),
+               func.sum(Transaction.cash).label("total"))
+        .where(*scope)
+        .group_by(day, Transaction.type, AMOUNT_BUCKET)
+    ).all()
+
+    for model in (PlatformUserDay, PlatformDailyTotals, PlatformAmountBucket):
+        session.execute(delete(model).where(model.day.in_(days)))
+
+    if user_days:
+        session.execute(insert(PlatformUserDay).values([dict(row) for row in user_days]))
+        session.execute(
+            insert(PlatformDailyTotals).from_select(
+                ["day", "active_users", "transactions", "income", "expense"],
+                select(
+                    PlatformUserDay.day,
+                    func.count(),
+                    func.sum(PlatformUserDay.transactions),
+                    func.sum(PlatformUserDay.income),
+                    func.sum(PlatformUserDay.expense),
+                )
+                .where(PlatformUserDay.day.in_(days))
+                .group_by(PlatformUserDay.day),
+            )
+        )
+    if buckets:
+        session.execute(insert(PlatformAmountBucket).values([
+            {"day": row.day, "type": row.type.value, "bucket": row.bucket,
+             "transactions": row.transactions, "total": row.total}
+            for row in buckets
+        ]))
+
+
+@celery_app.task
+def refresh_platform_rollups() -> int:
+    """Пересчитывает устаревшие дни пачками по ROLLUP_DAYS_PER_BATCH, каждая пачка - своя транзакция."""
+    started = time.monotonic()
+    refreshed = 0
+
+    while time.monotonic() - started < RUN_BUDGET_SECONDS:
+        with SyncSessionLocal() as session:
+            days = claim_dirty_days(session, settings.ROLLUP_DAYS_PER_BATCH)
+            if not days:
+                break
+            refresh_days(session, days)
+            session.commit()
+        refreshed += len(days)
+
+    if refreshed:
+        logger.info("Platform rollups refreshed for %d days", refreshed)
+    return refreshed
+
+
+def refresh_monthly_batch(session) -> tuple:
+    """Пересчитывает одну пачку месяцев; возвращает (месяцев, id пользователей)."""
+    row = session.execute(REFRESH_MONTHLY_TOTALS_SQL, {"batch_size": settings.MONTHLY_TOTALS_BATCH_SIZE}).one()
+    return row.months, row.user_ids or []
+
+
+@celery_app.task
+def refresh_monthly_totals() -> int:
+    started = time.monotonic()
+    refreshed = 0
+
+    while time.monotonic() - started < RUN_BUDGET_SECONDS:
+        with SyncSessionLocal() as session:
+            months, user_ids = refresh_monthly_batch(session)
+            session.commit()
+        # ETag аналитики зависит от версии данных: без сдвига клиент оставил бы ответ,
+        # посчитанный до пересчета
+        bump_data_versions_sync(user_ids)
+        refreshed += months
+        if months == 0:
+            break
+
+    if refreshed:
+        logger.info("Monthly category totals refreshed for %d user months", refreshed)
+    return refreshed
@@ -0,0 +1,31 @@
+import uuid
+from typing import List
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from tests.conftest import TEST_SYNC_DATABASE_URL, delete_seeded_users, seed_users
+
+
+@pytest.fixture(scope="module")
+def seed_transactions():
+    """
+    Фабрика сида для модуля бенчмарков: seed(users, rows) создает пользователей с категорией
+    и rows транзакций, поровну разложенных по ним, и возвращает id пользователей.
+    После модуля все созданное удаляется, поэтому модули можно запускать подряд.
+    """
+    prefix = f"bench_{uuid.uuid4().hex[:8]}"
+    engine = create_engine(TEST_SYNC_DATABASE_URL)
+
+    def seed(users: int, rows: int) -> List[int]:
+        with engine.begin() as conn:
+            user_ids = seed_users(conn, prefix, users, max(rows // users, 1))
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE transactions"))
+        return user_ids
+
+    yield seed
+
+    with engine.begin() as conn:
+        delete_seeded_users(conn, prefix)
+    engine.dispose()
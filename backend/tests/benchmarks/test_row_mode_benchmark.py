@@ -0,0 +1,42 @@
+import os
+import time
+import tracemalloc
+
+import pytest
+from sqlalchemy import select
+
+from app.models.transactions import Transaction
+from app.services.transactions import TRANSACTION_COLUMNS
+from tests.conftest import AsyncTestingSession
+
+pytestmark = pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS is not set")
+
+ROWS = int(os.getenv("BENCHMARK_ROW_MODE_ROWS", 100_000))
+
+
+@pytest.fixture(scope="module")
+def seeded_user(seed_transactions):
+    return seed_transactions(1, ROWS)[0]
+
+
+async def _measure(stmt):
+    async with AsyncTestingSession() as session:
+        tracemalloc.start()
+        started = time.perf_counter()
+        rows = (await session.execute(stmt)).all()
+        elapsed = time.perf_counter() - started
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    assert len(rows) == ROWS
+    return elapsed / ROWS * 1e6, peak
+
+
+@pytest.mark.asyncio
+async def test_row_mode_cheaper_than_orm(seeded_user):
+    orm_us, orm_peak = await _measure(select(Transaction).where(Transaction.user_id == seeded_user))
+    row_us, row_peak = await _measure(select(*TRANSACTION_COLUMNS).where(Transaction.user_id == seeded_user))
+
+    print(f"{ROWS} rows: ORM {orm_us:.2f}us/row peak {orm_peak / 2**20:.1f}MiB, "
+          f"Row {row_us:.2f}us/row peak {row_peak / 2**20:.1f}MiB")
+    assert row_us < orm_us
+    assert row_peak < orm_peak
@@ -0,0 +1,37 @@
+import os
+import statistics
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.transactions import get_transactions
+from tests.conftest import AsyncTestingSession
+
+# Тяжелый сид (10M строк), поэтому запускается только явно: RUN_BENCHMARKS=1 pytest tests/benchmarks
+pytestmark = pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS is not set")
+
+ROWS = int(os.getenv("BENCHMARK_ROWS", 10_000_000))
+USERS = int(os.getenv("BENCHMARK_USERS", 1_000))
+
+
+@pytest.fixture(scope="module")
+def seeded_users(seed_transactions):
+    user_ids = seed_transactions(USERS, ROWS)
+    return user_ids[::max(USERS // 20, 1)]
+
+
+@pytest.mark.asyncio
+async def test_title_search_under_50ms(seeded_users):
+    timings = []
+    async with AsyncTestingSession() as session:
+        for user_id in seeded_users:
+            user = SimpleNamespace(id=user_id)
+            for q in ("coff", "groceries", "a1"):
+                started = time.perf_counter()
+                await get_transactions(user, session, None, None, None, None, 20, 0, "created_at", "desc", q)
+                timings.append((time.perf_counter() - started) * 1000)
+
+    p95 = statistics.quantiles(timings, n=20)[-1]
+    print(f"title search over {ROWS} rows: median={statistics.median(timings):.1f}ms p95={p95:.1f}ms")
+    assert p95 < 50
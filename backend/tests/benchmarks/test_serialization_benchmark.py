@@ -0,0 +1,32 @@
+import os
+import time
+
+import pytest
+
+from tests.test_serialization import PAGE_SIZE, default_path, fast_path, page, response_field
+
+# Сравнение по времени нестабильно на загруженном раннере, поэтому запускается только явно:
+# RUN_BENCHMARKS=1 pytest tests/benchmarks. Совпадение ответов проверяет tests/test_serialization.py
+pytestmark = pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS is not set")
+
+ROUNDS = 200
+
+
+@pytest.mark.asyncio
+async def test_fast_json_path_beats_default():
+    field = response_field()
+    transactions = page()
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        await default_path(field, transactions)
+    default_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for _ in range(ROUNDS):
+        fast_path(transactions)
+    fast_time = time.perf_counter() - started
+
+    print(f"{PAGE_SIZE}-row page: default {default_time / ROUNDS * 1e6:.0f}us, "
+          f"orjson {fast_time / ROUNDS * 1e6:.0f}us ({default_time / fast_time:.1f}x)")
+    assert fast_time * 2 < default_time
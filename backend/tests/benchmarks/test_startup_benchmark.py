@@ -0,0 +1,18 @@
+import os
+import statistics
+
+import pytest
+
+from tests.test_startup import measure_cold_import
+
+pytestmark = pytest.mark.skipif(not os.getenv("RUN_BENCHMARKS"), reason="RUN_BENCHMARKS is not set")
+
+RUNS = int(os.getenv("BENCHMARK_STARTUP_RUNS", 10))
+
+
+def test_cold_start_profile():
+    results = [measure_cold_import() for _ in range(RUNS)]
+    seconds = [r["seconds"] for r in results]
+    rss = [r["rss_mb"] for r in results]
+    print(f"import app.main over {RUNS} runs: median={statistics.median(seconds):.2f}s "
+          f"max={max(seconds):.2f}s, RSS median={statistics.median(rss):.0f}MiB")
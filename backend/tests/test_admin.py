@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import distinct, func, select, update
+
+from app.models.auth import User
+from app.models.platform import PlatformDirtyDay
+from app.models.transactions import Transaction
+from app.services.aggregation import created_between, day_start, totals_columns
+from app.tasks.outbox import drain_batch
+from app.tasks.rollups import claim_dirty_days, refresh_days
+
+
+async def _make_superuser(client, sync_session) -> None:
+    user_id = (await client.get("/auth/me")).json()["id"]
+    sync_session.execute(update(User).where(User.id == user_id).values(is_superuser=True))
+    sync_session.commit()
+
+
+def _refresh_rollups(sync_session) -> None:
+    while days := claim_dirty_days(sync_session, 31):
+        refresh_days(sync_session, days)
+        sync_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_admin_stats_require_superuser(authorized_client):
+    response = await authorized_client.get("/admin/stats/summary")
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_rollups_match_transactions(authorized_client, category_id, sync_session):
+    for cash, type_ in ((5, "income"), (50, "expense"), (500, "expense")):
+        await authorized_client.post("/transactions/", json={
+            "title": "Platform", "cash": cash, "type": type_, "category_id": category_id
+        })
+    # created_at пишется в UTC
+    today = datetime.utcnow().date()
+
+    while drain_batch(sync_session):
+        pass
+    assert today in sync_session.execute(select(PlatformDirtyDay.day)).scalars().all()
+    _refresh_rollups(sync_session)
+
+    expected = sync_session.execute(
+        select(func.count(distinct(Transaction.user_id)), func.count(), *totals_columns())
+        .where(*created_between(day_start(today), day_start(today + timedelta(days=1))))
+    ).one()
+
+    await _make_superuser(authorized_client, sync_session)
+    params = {"date_from": today.isoformat(), "date_to": today.isoformat()}
+    summary = (await authorized_client.get("/admin/stats/summary", params=params)).json()
+    assert (summary["active_users"], summary["transactions"]) == (expected[0], expected[1])
+    assert summary["income"] == pytest.approx(expected.income)
+    assert summary["expense"] == pytest.approx(expected.expense)
+    assert summary["pending_days"] == 0
+
+    daily = (await authorized_client.get("/admin/stats/daily", params=params)).json()
+    assert [day["transactions"] for day in daily] == [expected[1]]
+
+    distribution = (await authorized_client.get("/admin/stats/distribution", params=params)).json()
+    assert sum(b["transactions"] for b in distribution["buckets"]) == expected[1]
+    expense_500 = [b for b in distribution["buckets"] if b["type"] == "expense" and b["min_amount"] == 100]
+    assert expense_500 and expense_500[0]["max_amount"] == 1000
@@ -0,0 +1,88 @@
+import uuid
+from datetime import date, datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import delete, select
+
+from app.models.analytics import Anomaly
+from app.models.auth import User
+from app.models.transactions import Category, Transaction
+from app.schemas.transaction_schema import TransactionType
+from app.tasks.anomalies import detect_range, find_anomalies, stream_daily_spend
+
+
+def _spend(rows):
+    return pd.DataFrame(rows, columns=["user_id", "category_id", "day", "amount"])
+
+
+def test_find_anomalies_flags_spend_over_rolling_median():
+    start = date(2026, 9, 1)
+    rows = []
+    for i in range(40):
+        day = start + timedelta(days=i)
+        rows.append((1, 10, day, 400.0 if i == 39 else 100.0))
+        rows.append((1, 11, day, 140.0 if i == 39 else 50.0))
+    # Мало истории - медиана не считается
+    rows += [(2, 20, start + timedelta(days=i), 10.0) for i in range(3)] + [(2, 20, start + timedelta(days=39), 90.0)]
+    # Всплеск до начала окна пересчета не возвращается
+    rows[20] = (1, 10, start + timedelta(days=10), 900.0)
+
+    flagged = find_anomalies(_spend(rows).sample(frac=1, random_state=1), start + timedelta(days=37))
+
+    assert flagged[["user_id", "category_id", "day"]].values.tolist() == [[1, 10, start + timedelta(days=39)]]
+    assert flagged["median"].iat[0] == 100.0
+    assert flagged["ratio"].iat[0] == 4.0
+
+
+def test_stream_keeps_user_rows_in_one_chunk():
+    rows = [(user_id, 1, date(2026, 1, day), 1.0) for user_id in (1, 2, 3) for day in range(1, 6)]
+
+    class Result:
+        def partitions(self):
+            for i in range(0, len(rows), 4):
+                yield rows[i:i + 4]
+
+    session = type("Session", (), {"execute": lambda self, stmt: Result()})()
+    chunks = list(stream_daily_spend(session, None))
+
+    assert [chunk["user_id"].unique().tolist() for chunk in chunks] == [[1], [2], [3]]
+    assert sum(len(chunk) for chunk in chunks) == len(rows)
+
+
+def test_detect_range_writes_and_recomputes_window(sync_session, monkeypatch):
+    from app.db.config import settings
+
+    user = User(name="anomaly_user", email=f"anomaly_{uuid.uuid4().hex}@example.com", hashed_password="x")
+    sync_session.add(user)
+    sync_session.flush()
+    category = Category(title=f"Anomaly_{uuid.uuid4().hex[:6]}", user_id=user.id)
+    sync_session.add(category)
+    sync_session.flush()
+
+    run_day = date(2026, 6, 30)
+    for offset in range(1, 21):
+        sync_session.add(Transaction(
+            title="Lunch", cash=20, type=TransactionType.expense, category_id=category.id, user_id=user.id,
+            created_at=datetime.combine(run_day - timedelta(days=offset), datetime.min.time()),
+        ))
+    spike = Transaction(
+        title="Phone", cash=90, type=TransactionType.expense, category_id=category.id, user_id=user.id,
+        created_at=datetime.combine(run_day, datetime.min.time()) + timedelta(hours=12),
+    )
+    sync_session.add(spike)
+    sync_session.flush()
+    user_id, category_id, spike_id = user.id, category.id, spike.id
+    sync_session.commit()
+
+    # Маленькие пачки: ряд пользователя приходит из курсора по частям
+    monkeypatch.setattr(settings, "ANOMALY_CHUNK_ROWS", 3)
+    assert detect_range(user_id, user_id + 1, run_day) == 1
+    anomaly = sync_session.execute(select(Anomaly).where(Anomaly.user_id == user_id)).scalar_one()
+    assert (anomaly.category_id, anomaly.day, anomaly.amount, anomaly.median) == (category_id, run_day, 90, 20)
+
+    # Повторный запуск после удаления всплеска убирает аномалию
+    sync_session.execute(delete(Transaction).where(Transaction.id == spike_id))
+    sync_session.commit()
+    assert detect_range(user_id, user_id + 1, run_day) == 0
+    sync_session.expire_all()
+    assert sync_session.execute(select(Anomaly).where(Anomaly.user_id == user_id)).first() is None
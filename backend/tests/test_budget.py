@@ -0,0 +1,91 @@
+from datetime import datetime
+
+import pytest
+from fastapi import status
+from sqlalchemy import update
+
+from app.models.budget import CategorySpend
+from app.tasks.budget import reconcile_category_spend
+
+
+async def _status(client, category_id: int) -> dict:
+    # created_at транзакций пишется в UTC, месяц берем так же
+    response = await client.get(f"/budgets/{category_id}", params={"month": datetime.utcnow().date().isoformat()})
+    assert response.status_code == 200
+    return response.json()
+
+
+async def _create(client, category_id: int, cash: float, type_: str = "expense") -> int:
+    response = await client.post("/transactions/", json={
+        "title": "Budgeted", "cash": cash, "type": type_, "category_id": category_id
+    })
+    return response.json()["id"]
+
+
+@pytest.mark.asyncio
+async def test_spend_counter_follows_transaction_writes(authorized_client):
+    first = (await authorized_client.post("/categories/", json={"title": "BudgetA"})).json()["id"]
+    second = (await authorized_client.post("/categories/", json={"title": "BudgetB"})).json()["id"]
+    for category_id in (first, second):
+        response = await authorized_client.put(f"/budgets/{category_id}", json={"amount": 100})
+        assert response.status_code == 200
+
+    tx1 = await _create(authorized_client, first, 50)
+    tx2 = await _create(authorized_client, first, 40)
+    await _create(authorized_client, first, 1000, "income")
+    budget = await _status(authorized_client, first)
+    assert (budget["spent"], budget["state"]) == (90, "warning")
+
+    await authorized_client.patch(f"/transactions/{tx2}", json={"cash": 60})
+    budget = await _status(authorized_client, first)
+    assert (budget["spent"], budget["remaining"], budget["state"]) == (110, -10, "exceeded")
+
+    await authorized_client.patch(f"/transactions/{tx2}", json={"type": "income"})
+    assert (await _status(authorized_client, first))["spent"] == 50
+
+    await authorized_client.patch(f"/transactions/{tx1}", json={"category_id": second})
+    assert (await _status(authorized_client, first))["spent"] == 0
+    assert (await _status(authorized_client, second))["spent"] == 50
+
+    await authorized_client.post("/transactions/batch/delete", json={"ids": [tx1]})
+    assert (await _status(authorized_client, second))["spent"] == 0
+
+
+@pytest.mark.asyncio
+async def test_budget_status_is_single_lookup(authorized_client, category_id, query_counter):
+    await authorized_client.put(f"/budgets/{category_id}", json={"amount": 10, "warn_ratio": 0.5})
+    await _create(authorized_client, category_id, 6)
+
+    query_counter.clear()
+    budget = await _status(authorized_client, category_id)
+    assert budget["state"] == "warning"
+    assert len(query_counter) == 1
+    assert "FROM transactions" not in query_counter[0]
+
+
+@pytest.mark.asyncio
+async def test_reconcile_repairs_drift(authorized_client, category_id, sync_session):
+    await authorized_client.put(f"/budgets/{category_id}", json={"amount": 100})
+    await _create(authorized_client, category_id, 30)
+    user_id = (await authorized_client.get("/auth/me")).json()["id"]
+
+    sync_session.execute(
+        update(CategorySpend).where(CategorySpend.category_id == category_id).values(spent=999)
+    )
+    sync_session.commit()
+    assert (await _status(authorized_client, category_id))["spent"] == 999
+
+    assert reconcile_category_spend(user_id)["fixed"] == 1
+    assert (await _status(authorized_client, category_id))["spent"] == 30
+
+
+@pytest.mark.asyncio
+async def test_budget_removed_with_category(authorized_client, category_id):
+    await authorized_client.put(f"/budgets/{category_id}", json={"amount": 100})
+    await _create(authorized_client, category_id, 30)
+
+    assert (await authorized_client.delete(f"/categories/{category_id}")).status_code == 200
+    response = await authorized_client.get(f"/budgets/{category_id}")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    response = await authorized_client.put(f"/budgets/{category_id}", json={"amount": 100})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
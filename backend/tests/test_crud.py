@@ -1,3 +1,5 @@
+import uuid
+from datetime import date, timedelta
 import pytest
 from httpx import AsyncClient
 from app.main import app
@@ -218,6 +220,29 @@ async def test_get_all_transactions_route_with_filters(authorized_client):
     for tx in data:
         assert tx["type"] == "income"
 
+@pytest.mark.asyncio
+async def test_search_transactions_by_title(authorized_client):
+    category_resp = await authorized_client.post("/categories/", json={"title": "SearchCat"})
+    category_id = category_resp.json()["id"]
+
+    for title in ("Morning coffee", "Coffee beans", "Rent", "100%_match"):
+        await authorized_client.post("/transactions/", json={
+            "title": title,
+            "cash": 10,
+            "type": "expense",
+            "category_id": category_id
+        })
+
+    response = await authorized_client.get("/transactions/", params={"q": "coffee"})
+    assert response.status_code == 200
+    titles = [tx["title"] for tx in response.json()]
+    assert sorted(titles) == ["Coffee beans", "Morning coffee"]
+
+    # Спецсимволы LIKE ищутся буквально
+    response = await authorized_client.get("/transactions/", params={"q": "%_"})
+    assert [tx["title"] for tx in response.json()] == ["100%_match"]
+
+
 @pytest.mark.asyncio
 async def test_export_transactions_csv_route(authorized_client):
     response = await authorized_client.get("/transactions/export")
@@ -232,6 +257,202 @@ async def test_export_transactions_csv_route(authorized_client):
     assert b"id,title,cash,type,category_id,created_at" in content
 
 
+@pytest.mark.asyncio
+async def test_transactions_list_conditional_get(authorized_client):
+    first = await authorized_client.get("/transactions/", params={"limit": 10})
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+
+    cached = await authorized_client.get("/transactions/", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+    assert cached.content == b""
+
+    # Другие параметры запроса - другой ETag
+    other_page = await authorized_client.get("/transactions/", params={"limit": 5}, headers={"If-None-Match": etag})
+    assert other_page.status_code == 200
+
+    category_resp = await authorized_client.post("/categories/", json={"title": "EtagCat"})
+    await authorized_client.post("/transactions/", json={
+        "title": "Fresh",
+        "cash": 10,
+        "type": "income",
+        "category_id": category_resp.json()["id"]
+    })
+
+    changed = await authorized_client.get("/transactions/", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()[0]["title"] == "Fresh"
+
+
+@pytest.mark.asyncio
+async def test_transactions_batch_get_update_delete(authorized_client, db_session):
+    from app.models.auth import User
+    from app.models.transactions import Category, Transaction
+
+    other = User(name="batch_other", hashed_password="x")
+    db_session.add(other)
+    await db_session.flush()
+    other_category = Category(title=f"BatchOther_{other.id}", user_id=other.id)
+    db_session.add(other_category)
+    await db_session.flush()
+    foreign = Transaction(title="Foreign", cash=1, type=TransactionType.income,
+                          category_id=other_category.id, user_id=other.id)
+    db_session.add(foreign)
+    await db_session.commit()
+
+    category_resp = await authorized_client.post("/categories/", json={"title": "BatchCat"})
+    category_id = category_resp.json()["id"]
+    own_ids = []
+    for title in ("Batch 1", "Batch 2"):
+        resp = await authorized_client.post("/transactions/", json={
+            "title": title, "cash": 10, "type": "expense", "category_id": category_id
+        })
+        own_ids.append(resp.json()["id"])
+    missing_id = foreign.id + 100000
+    ids = own_ids + [foreign.id, missing_id]
+
+    got = await authorized_client.post("/transactions/batch/get", json={"ids": ids})
+    assert got.status_code == 200
+    data = got.json()
+    assert [tx["id"] for tx in data["items"]] == own_ids
+    assert data["forbidden"] == [foreign.id]
+    assert data["not_found"] == [missing_id]
+
+    updated = await authorized_client.patch("/transactions/batch", json={"ids": ids, "changes": {"title": "Renamed"}})
+    assert updated.status_code == 200
+    data = updated.json()
+    assert [tx["title"] for tx in data["items"]] == ["Renamed", "Renamed"]
+    assert data["forbidden"] == [foreign.id]
+    assert data["not_found"] == [missing_id]
+
+    deleted = await authorized_client.post("/transactions/batch/delete", json={"ids": ids})
+    assert deleted.status_code == 200
+    data = deleted.json()
+    assert data["deleted"] == own_ids
+    assert data["forbidden"] == [foreign.id]
+    assert data["not_found"] == [missing_id]
+
+    await db_session.refresh(foreign)
+    assert foreign.title == "Foreign"
+
+
+@pytest.mark.asyncio
+async def test_write_endpoints_run_single_statement(authorized_client, query_counter):
+    category_id = (await authorized_client.post("/categories/", json={"title": "CountCat"})).json()["id"]
+    tx_id = (await authorized_client.post("/transactions/", json={
+        "title": "Count", "cash": 5, "type": "expense", "category_id": category_id
+    })).json()["id"]
+
+    query_counter.clear()
+    resp = await authorized_client.patch(f"/transactions/{tx_id}", json={"title": "Counted", "cash": 6})
+    assert resp.status_code == 200
+    assert resp.json()["title"] == "Counted"
+    assert len(query_counter) == 1
+
+    query_counter.clear()
+    resp = await authorized_client.delete(f"/transactions/{tx_id}")
+    assert resp.status_code == 200
+    assert len(query_counter) == 1
+
+    query_counter.clear()
+    resp = await authorized_client.patch(f"/categories/{category_id}", json={"title": "CountCatRenamed"})
+    assert resp.status_code == 200
+    assert len(query_counter) == 1
+
+    await authorized_client.post("/transactions/", json={
+        "title": "Cascade", "cash": 5, "type": "expense", "category_id": category_id
+    })
+    query_counter.clear()
+    resp = await authorized_client.delete(f"/categories/{category_id}")
+    assert resp.status_code == 200
+    assert len(query_counter) == 1
+
+    # Промах: второй запрос отличает 404 от 403
+    query_counter.clear()
+    resp = await authorized_client.delete(f"/transactions/{tx_id}")
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+    assert len(query_counter) == 2
+
+
+@pytest.mark.asyncio
+async def test_transaction_requires_own_category(authorized_client, db_session, query_counter):
+    from app.models.auth import User
+    from app.models.transactions import Category
+
+    other = User(name="category_owner", hashed_password="x")
+    db_session.add(other)
+    await db_session.flush()
+    foreign_category = Category(title=f"Foreign_{other.id}", user_id=other.id)
+    db_session.add(foreign_category)
+    await db_session.commit()
+
+    payload = {"title": "Sneaky", "cash": 1, "type": "expense", "category_id": foreign_category.id}
+    resp = await authorized_client.post("/transactions/", json=payload)
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+    own_category_id = (await authorized_client.post("/categories/", json={"title": "OwnCat"})).json()["id"]
+    tx_id = (await authorized_client.post("/transactions/", json={**payload, "category_id": own_category_id})).json()["id"]
+    resp = await authorized_client.patch(f"/transactions/{tx_id}", json={"category_id": foreign_category.id})
+    assert resp.status_code == status.HTTP_404_NOT_FOUND
+
+    # Список категорий прогревает кэш - дальше проверка категории не идет в БД отдельно
+    await authorized_client.get("/categories/")
+    query_counter.clear()
+    resp = await authorized_client.post("/transactions/", json={**payload, "category_id": own_category_id})
+    assert resp.status_code == 201
+    assert len(query_counter) == 1
+    assert "FROM category" not in query_counter[0]
+
+    # Запись сменила версию данных: список перечитывается один раз, дальше снова из кэша
+    query_counter.clear()
+    resp = await authorized_client.get("/categories/")
+    assert [c["id"] for c in resp.json()] == [own_category_id]
+    assert len(query_counter) == 1
+    query_counter.clear()
+    await authorized_client.get("/categories/")
+    assert query_counter == []
+
+
+@pytest.mark.asyncio
+async def test_category_list_cache_follows_data_version(authorized_client, db_session):
+    from app.models.transactions import Category
+    from app.services.cache import bump_data_version
+
+    first = await authorized_client.get("/categories/")
+    etag = first.headers["etag"]
+    user_id = (await authorized_client.get("/auth/me")).json()["id"]
+
+    # Запись через другой инстанс: локальный кэш не сброшен, сменилась только версия в Redis
+    db_session.add(Category(title=f"OtherInstance_{user_id}", user_id=user_id))
+    await db_session.commit()
+    await bump_data_version(user_id)
+
+    resp = await authorized_client.get("/categories/", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    assert [c["title"] for c in resp.json()] == [f"OtherInstance_{user_id}"]
+
+
+@pytest.mark.asyncio
+async def test_miss_on_own_row_still_raises(db_session):
+    from fastapi import HTTPException
+    from app.models.auth import User
+    from app.models.transactions import Category
+    from app.services.utils import raise_not_found_or_forbidden
+
+    owner = User(name=f"miss_{uuid.uuid4().hex[:6]}", hashed_password="x")
+    db_session.add(owner)
+    await db_session.flush()
+    category = Category(title=f"Miss_{owner.id}", user_id=owner.id)
+    db_session.add(category)
+    await db_session.commit()
+
+    # Промах UPDATE/DELETE по своей строке (гонка с удалением) не должен пройти дальше к commit
+    with pytest.raises(HTTPException):
+        await raise_not_found_or_forbidden(db_session, Category, category.id, owner.id, "category")
+
+
 #NEGATIVE TESTS
 
 @pytest.mark.asyncio
@@ -273,3 +494,72 @@ async def test_transaction_forbidden_and_not_found(authorized_client):
     assert r.status_code == status.HTTP_401_UNAUTHORIZED
 
 
+
+
+@pytest.mark.asyncio
+async def test_summary_matches_separate_endpoints(authorized_client, query_counter):
+    category_id = (await authorized_client.post("/categories/", json={"title": "SummaryCat"})).json()["id"]
+    for cash, type_ in ((100, "income"), (30, "expense")):
+        await authorized_client.post("/transactions/", json={
+            "title": "Summary", "cash": cash, "type": type_, "category_id": category_id
+        })
+
+    query_counter.clear()
+    resp = await authorized_client.get("/transactions/summary", params={"category_id": category_id})
+    assert resp.status_code == 200
+    assert len(query_counter) == 1
+    summary = resp.json()
+
+    today = date.today()
+    balance = (await authorized_client.get("/transactions/balance")).json()
+    month = (await authorized_client.get(
+        "/transactions/analytics", params={"year": today.year, "month": today.month}
+    )).json()
+
+    assert summary["balance"] == balance
+    assert summary["month"] == month["month"]
+    assert summary["month_income"] == month["income"]
+    assert summary["month_expense"] == month["expense"]
+    assert summary["category_income"] == 100
+    assert summary["category_expense"] == 30
+
+
+@pytest.mark.asyncio
+async def test_month_analytics_rejects_invalid_month(authorized_client):
+    for params in ({"year": 2024, "month": 13}, {"year": 2024, "month": 0}, {"year": 9999, "month": 12}):
+        resp = await authorized_client.get("/transactions/analytics", params=params)
+        assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_summary_etag_changes_with_date(authorized_client, monkeypatch):
+    first = await authorized_client.get("/transactions/summary")
+    etag = first.headers["etag"]
+    cached = await authorized_client.get("/transactions/summary", headers={"If-None-Match": etag})
+    assert cached.status_code == status.HTTP_304_NOT_MODIFIED
+
+    # Наступил следующий день: записей не было, но сводка считается на новую дату
+    tomorrow = date.fromisoformat(first.json()["date"]) + timedelta(days=1)
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return tomorrow
+
+    monkeypatch.setattr("app.routes.transactions.date", Tomorrow)
+    moved = await authorized_client.get("/transactions/summary", headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    assert moved.headers["etag"] != etag
+    assert moved.json()["date"] == tomorrow.isoformat()
+
+
+@pytest.mark.asyncio
+async def test_update_transaction_rejects_null_fields(authorized_client, category_id):
+    tx_id = (await authorized_client.post("/transactions/", json={
+        "title": "Nullable", "cash": 1, "type": "expense", "category_id": category_id
+    })).json()["id"]
+
+    for body in ({"title": None}, {"type": None}, {"category_id": None}, {"cash": None}):
+        resp = await authorized_client.patch(f"/transactions/{tx_id}", json=body)
+        assert resp.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert (await authorized_client.get(f"/transactions/{tx_id}")).json()["title"] == "Nullable"
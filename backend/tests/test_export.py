@@ -55,4 +55,273 @@ async def test_export_flow(authorized_client):
             assert status.json().get("file_url")
             break
     else:
-        pytest.fail("Export task did not complete")
\ No newline at end of file
+        pytest.fail("Export task did not complete")
+
+def test_sharded_export_matches_serial(sync_session, monkeypatch, tmp_path):
+    from datetime import datetime, timedelta
+    import uuid
+    from app.db.config import settings
+    from app.models.transactions import Category
+    from app.tasks import export as export_tasks
+
+    user = User(name="shard_user", email=f"shard_{uuid.uuid4().hex}@example.com", hashed_password="x")
+    sync_session.add(user)
+    sync_session.flush()
+    category = Category(title=f"Shard_{uuid.uuid4().hex[:6]}", user_id=user.id)
+    sync_session.add(category)
+    sync_session.flush()
+    start = datetime(2024, 1, 1)
+    for i in range(10):
+        sync_session.add(Transaction(
+            title=f"T{i}", cash=i, type=TransactionType.income,
+            category_id=category.id, user_id=user.id,
+            created_at=start + timedelta(days=i),
+        ))
+    sync_session.commit()
+
+    monkeypatch.setattr(settings, "EXPORT_SHARD_ROWS", 3)
+    ranges = export_tasks._shard_ranges(sync_session, user.id)
+    assert len(ranges) == 4
+    assert ranges[0][0] is None and ranges[-1][1] is None
+
+    monkeypatch.setattr(export_tasks, "EXPORT_FOLDER", str(tmp_path))
+    monkeypatch.setattr(export_tasks, "EXPORT_PARTS_FOLDER", str(tmp_path))
+    with patch.object(export_tasks, "_notify_user"):
+        parts = [
+            export_tasks.export_shard(user.id, "sharded", i,
+                                      s.isoformat() if s else None, e.isoformat() if e else None)
+            for i, (s, e) in enumerate(ranges)
+        ]
+        merged_url = export_tasks.merge_export_shards(parts, user.id, "sharded")
+
+    serial_path = tmp_path / "serial.csv"
+    export_tasks._write_rows(sync_session, user.id, str(serial_path), None, None, header=True)
+    merged_path = tmp_path / merged_url.rsplit("/", 1)[-1]
+    assert merged_path.read_text() == serial_path.read_text()
+    assert len(merged_path.read_text().splitlines()) == 11
+
+
+def test_xlsx_report_memory_does_not_grow_with_rows(tmp_path):
+    import tracemalloc
+    from datetime import datetime
+    from app.tasks.export import _write_xlsx_report
+
+    def build(rows_count: int) -> int:
+        rows = (
+            (i, f"T{i}", float(i), TransactionType.expense, "Food", datetime(2024, 1, 1))
+            for i in range(rows_count)
+        )
+        tracemalloc.start()
+        _write_xlsx_report(
+            str(tmp_path / f"report_{rows_count}.xlsx"),
+            rows,
+            [(datetime(2024, 1, 1), 0.0, float(rows_count), rows_count)],
+            [(1, "Food", 0.0, float(rows_count), rows_count)],
+        )
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        return peak
+
+    small, large = build(1_000), build(10_000)
+    # write-only режим: пиковая память фиксирована и не зависит от числа строк
+    assert large < small * 1.5
+    assert large < 4 * 1024 * 1024
+
+
+@pytest.mark.asyncio
+async def test_small_export_runs_inline(authorized_client, monkeypatch):
+    from app.services import export as export_service
+
+    def celery_not_expected(*args, **kwargs):
+        raise AssertionError("small export must not go through Celery")
+
+    monkeypatch.setattr(export_service.celery_app, "send_task", celery_not_expected)
+    monkeypatch.setattr("app.tasks.export._notify_user", lambda *args: None)
+
+    task_id = (await authorized_client.post("/api/export/")).json()["task_id"]
+    for _ in range(20):
+        status_data = (await authorized_client.get(f"/api/export/status/{task_id}")).json()
+        if status_data["status"] != "pending":
+            break
+        await asyncio.sleep(0.1)
+
+    assert status_data["status"] == "completed"
+    assert status_data["file_url"].endswith(f"_{task_id}.csv")
+
+
+@pytest.mark.asyncio
+async def test_large_export_goes_to_celery(authorized_client, category_id, monkeypatch):
+    from types import SimpleNamespace
+    from app.db.config import settings
+    from app.services import export as export_service
+
+    await authorized_client.post("/transactions/", json={
+        "title": "Large", "cash": 1, "type": "expense", "category_id": category_id
+    })
+    calls = []
+    monkeypatch.setattr(settings, "EXPORT_INLINE_MAX_ROWS", 0)
+    monkeypatch.setattr(
+        export_service.celery_app, "send_task",
+        lambda name, args: calls.append(name) or SimpleNamespace(id="celery-task"),
+    )
+
+    response = await authorized_client.post("/api/export/")
+    assert response.json()["task_id"] == "celery-task"
+    assert calls == [export_service.CSV_EXPORT_TASK]
+
+
+def test_delta_export_emits_changes_and_tombstones(sync_session, monkeypatch, tmp_path):
+    import uuid
+    from sqlalchemy import delete, update
+    from app.db.config import settings
+    from app.models.transactions import Category
+    from app.tasks import export as export_tasks
+
+    user = User(name="delta_user", email=f"delta_{uuid.uuid4().hex}@example.com", hashed_password="x")
+    sync_session.add(user)
+    sync_session.flush()
+    category = Category(title=f"Delta_{uuid.uuid4().hex[:6]}", user_id=user.id)
+    sync_session.add(category)
+    sync_session.flush()
+    kept, changed, removed = (
+        Transaction(title=f"D{i}", cash=i, type=TransactionType.expense,
+                    category_id=category.id, user_id=user.id)
+        for i in range(3)
+    )
+    sync_session.add_all([kept, changed, removed])
+    sync_session.flush()
+    # id берем до commit: обращение к истекшим атрибутам открыло бы транзакцию раньше снимка
+    # экспорта, и now() последующих изменений оказался бы до отметки
+    user_id, category_id, changed_id, removed_id = user.id, category.id, changed.id, removed.id
+    sync_session.commit()
+
+    monkeypatch.setattr(settings, "EXPORT_DELTA_OVERLAP_SECONDS", 0)
+    monkeypatch.setattr(export_tasks, "EXPORT_FOLDER", str(tmp_path))
+    monkeypatch.setattr(export_tasks, "_notify_user", lambda *args: None)
+
+    # Без отметки дельта превращается в полный экспорт и ставит отметку
+    full_url = export_tasks.export_csv_inline(user_id, "first", delta=True)
+    assert full_url.endswith(f"{user_id}_first.csv")
+    assert len((tmp_path / f"{user_id}_first.csv").read_text().splitlines()) == 4
+
+    sync_session.execute(update(Transaction).where(Transaction.id == changed_id).values(cash=100))
+    sync_session.execute(delete(Transaction).where(Transaction.id == removed_id))
+    added = Transaction(title="D3", cash=3, type=TransactionType.income, category_id=category_id, user_id=user_id)
+    sync_session.add(added)
+    sync_session.flush()
+    added_id = added.id
+    sync_session.commit()
+
+    delta_url = export_tasks.export_csv_inline(user_id, "second", delta=True)
+    lines = (tmp_path / delta_url.rsplit("/", 1)[-1]).read_text().splitlines()
+    assert lines[0] == ",".join(export_tasks.DELTA_COLUMNS)
+    rows = {(line.split(",")[0], int(line.split(",")[1])) for line in lines[1:]}
+    assert rows == {("upsert", changed_id), ("upsert", added_id), ("delete", removed_id)}
+
+    # Следующая дельта без изменений пуста
+    empty_url = export_tasks.export_csv_inline(user_id, "third", delta=True)
+    assert len((tmp_path / empty_url.rsplit("/", 1)[-1]).read_text().splitlines()) == 1
+
+
+@pytest.mark.asyncio
+async def test_delta_export_is_csv_only(authorized_client):
+    response = await authorized_client.post("/api/export/", params={"format": "xlsx", "delta": True})
+    assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_export_status_is_owner_only(authorized_client, db_session):
+    import uuid
+    from app.models.export import ExportJob
+
+    other = User(name="export_other", email=f"export_other_{uuid.uuid4().hex}@example.com", hashed_password="x")
+    db_session.add(other)
+    await db_session.flush()
+    foreign_id = uuid.uuid4().hex
+    db_session.add(ExportJob(id=foreign_id, user_id=other.id, format="csv", delta=False))
+    await db_session.commit()
+
+    assert (await authorized_client.get(f"/api/export/status/{foreign_id}")).status_code == 403
+    assert (await authorized_client.get(f"/api/export/status/{uuid.uuid4().hex}")).status_code == 404
+    listed = (await authorized_client.get("/api/export/jobs")).json()
+    assert foreign_id not in {job["task_id"] for job in listed}
+
+
+@pytest.mark.asyncio
+async def test_my_exports_report_progress(authorized_client, category_id, monkeypatch):
+    monkeypatch.setattr("app.tasks.export._notify_user", lambda *args: None)
+    for i in range(3):
+        await authorized_client.post("/transactions/", json={
+            "title": f"Job{i}", "cash": i + 1, "type": "expense", "category_id": category_id
+        })
+
+    task_ids = [(await authorized_client.post("/api/export/")).json()["task_id"] for _ in range(2)]
+    for _ in range(20):
+        jobs = (await authorized_client.get("/api/export/jobs")).json()
+        if all(job["status"] != "pending" for job in jobs):
+            break
+        await asyncio.sleep(0.1)
+
+    # Новые экспорты первыми
+    assert [job["task_id"] for job in jobs] == task_ids[::-1]
+    for job in jobs:
+        assert job["status"] == "completed"
+        assert job["format"] == "csv"
+        assert job["total_rows"] == job["rows_written"] == 3
+        assert job["progress"] == 1.0
+        assert job["byte_size"] > 0
+        assert job["file_url"].endswith(f"_{job['task_id']}.csv")
+        assert job["started_at"] is not None and job["finished_at"] is not None
+
+    page = (await authorized_client.get("/api/export/jobs", params={"limit": 1, "offset": 1})).json()
+    assert [job["task_id"] for job in page] == [task_ids[0]]
+
+
+def test_redelivered_export_resets_job(sync_session):
+    import uuid
+    from datetime import datetime
+    from app.models.export import ExportJob
+    from app.tasks.export import _add_progress, _start_job
+
+    user = User(name="export_retry", email=f"export_retry_{uuid.uuid4().hex}@example.com", hashed_password="x")
+    sync_session.add(user)
+    sync_session.flush()
+    export_id = uuid.uuid4().hex
+    sync_session.add(ExportJob(
+        id=export_id, user_id=user.id, format="csv", delta=False, status="failed",
+        total_rows=3, rows_written=2, error="worker lost", finished_at=datetime.utcnow(),
+    ))
+    sync_session.commit()
+
+    # Повторная доставка задачи (acks_late) начинает экспорт заново
+    _start_job(export_id, user.id, "csv", False, 3)
+    _add_progress(export_id, 3)
+    sync_session.expire_all()
+    job = sync_session.get(ExportJob, export_id)
+    assert (job.status, job.rows_written, job.total_rows) == ("pending", 3, 3)
+    assert job.error is None and job.finished_at is None
+
+
+def test_redelivered_shard_replaces_its_progress(sync_session):
+    import uuid
+    from app.models.export import ExportJob
+    from app.tasks.export import _add_progress, _reset_shard, _start_job
+
+    user = User(name="export_shard", email=f"export_shard_{uuid.uuid4().hex}@example.com", hashed_password="x")
+    sync_session.add(user)
+    sync_session.commit()
+    export_id = uuid.uuid4().hex
+    _start_job(export_id, user.id, "csv", False, 5)
+
+    _reset_shard(export_id, 0)
+    _add_progress(export_id, 2, shard=0)
+    _reset_shard(export_id, 1)
+    _add_progress(export_id, 1, shard=1)
+    # Шард 0 доставлен повторно и пишет свои строки заново
+    _reset_shard(export_id, 0)
+    _add_progress(export_id, 3, shard=0)
+    _add_progress(export_id, 1, shard=1)
+
+    job = sync_session.get(ExportJob, export_id)
+    assert job.rows_written == job.total_rows == 5
+    assert job.shard_rows == {"0": 3, "1": 2}
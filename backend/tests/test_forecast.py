@@ -0,0 +1,113 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.services.forecast import project_balance
+
+
+def _history(today: date, days: int):
+    """Год истории: зарплата 5-го, аренда 1-го, траты по субботам и мелкие расходы каждый день."""
+    rows = []
+    for offset in range(days - 1, -1, -1):
+        day = today - timedelta(days=offset)
+        net = -10.0
+        if day.day == 5:
+            net += 3000
+        if day.day == 1:
+            net -= 1000
+        if day.weekday() == 5:
+            net -= 50
+        rows.append((datetime.combine(day, datetime.min.time()), net))
+    return rows
+
+
+def test_projection_follows_monthly_and_weekly_pattern():
+    today = date(2026, 10, 19)
+    forecast = project_balance(_history(today, 365), [], 1000.0, today, 60)
+    points = {point["date"]: point["net"] for point in forecast["points"]}
+
+    assert forecast["history_days"] == 365
+    assert len(forecast["points"]) == 60
+    assert points[date(2026, 11, 5)] > 2500
+    assert points[date(2026, 12, 1)] < -900
+    # Обычная суббота дороже обычного будня
+    assert points[date(2026, 10, 24)] < points[date(2026, 10, 22)] - 30
+    last = forecast["points"][-1]
+    # net в ответе округлен, поэтому сумма совпадает с балансом с точностью до копеек за день
+    assert last["balance"] == pytest.approx(1000.0 + sum(points.values()), abs=0.01 * len(points))
+
+
+def test_projection_adds_known_future_flows():
+    today = date(2026, 10, 19)
+    flows = [(datetime(2026, 10, 18), -4.0), (datetime(2026, 10, 21), -1.0)]
+    forecast = project_balance(flows, [(date(2026, 10, 20), 2.0)], 5.0, today, 3)
+
+    # Средний день истории -2, к нему добавлены правило повторения и внесенная будущая транзакция
+    assert [point["net"] for point in forecast["points"]] == [0.0, -3.0, -2.0]
+    assert [point["balance"] for point in forecast["points"]] == [5.0, 2.0, 0.0]
+    assert forecast["history_days"] == 2
+
+
+def test_projection_without_history_keeps_balance():
+    forecast = project_balance([], [], 5.0, date(2026, 10, 19), 3)
+    assert [point["balance"] for point in forecast["points"]] == [5.0, 5.0, 5.0]
+    assert forecast["history_days"] == 0
+
+
+@pytest.mark.asyncio
+async def test_forecast_endpoint_refreshes_after_write(authorized_client, category_id):
+    await authorized_client.post("/transactions/", json={
+        "title": "Salary", "cash": 1000, "type": "income", "category_id": category_id
+    })
+    first = await authorized_client.get("/transactions/forecast", params={"days": 30})
+    assert first.status_code == 200
+    data = first.json()
+    assert data["balance"] == 1000
+    assert data["days"] == 30 and len(data["points"]) == 30
+    assert data["points"][0]["date"] == (date.fromisoformat(data["as_of"]) + timedelta(days=1)).isoformat()
+
+    # Повтор отдается из кэша, запись сбрасывает его вместе с версией данных
+    assert (await authorized_client.get("/transactions/forecast", params={"days": 30})).json() == data
+    await authorized_client.post("/transactions/", json={
+        "title": "Rent", "cash": 300, "type": "expense", "category_id": category_id
+    })
+    assert (await authorized_client.get("/transactions/forecast", params={"days": 30})).json()["balance"] == 700
+
+
+@pytest.mark.asyncio
+async def test_forecast_includes_recurring_rules(authorized_client, category_id):
+    start = datetime.utcnow().date() + timedelta(days=2)
+    response = await authorized_client.post("/recurring/", json={
+        "title": "Rent", "cash": 100, "type": "expense", "category_id": category_id,
+        "period": "week", "start_date": start.isoformat(),
+    })
+    assert response.status_code == 201
+
+    points = (await authorized_client.get("/transactions/forecast", params={"days": 14})).json()["points"]
+    nets = {point["date"]: point["net"] for point in points}
+    assert nets[start.isoformat()] == -100
+    assert nets[(start + timedelta(days=7)).isoformat()] == -100
+    assert points[-1]["balance"] == -200
+
+
+@pytest.mark.asyncio
+async def test_forecast_horizon_is_limited(authorized_client):
+    response = await authorized_client.get("/transactions/forecast", params={"days": 91})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_forecast_etag_changes_with_date(authorized_client, monkeypatch):
+    first = await authorized_client.get("/transactions/forecast", params={"days": 7})
+    etag = first.headers["etag"]
+    cached = await authorized_client.get("/transactions/forecast", params={"days": 7}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+    # Наступил следующий день: записей не было, но прогноз должен сдвинуться
+    tomorrow = date.fromisoformat(first.json()["as_of"]) + timedelta(days=1)
+    monkeypatch.setattr("app.services.forecast.forecast_today", lambda: tomorrow)
+    monkeypatch.setattr("app.routes.transactions.forecast_today", lambda: tomorrow)
+    moved = await authorized_client.get("/transactions/forecast", params={"days": 7}, headers={"If-None-Match": etag})
+    assert moved.status_code == 200
+    assert moved.headers["etag"] != etag
+    assert moved.json()["as_of"] == tomorrow.isoformat()
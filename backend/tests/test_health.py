@@ -0,0 +1,42 @@
+import pytest
+from fastapi import status
+
+from app.services import health
+
+
+@pytest.fixture(autouse=True)
+def reset_health_cache(monkeypatch):
+    monkeypatch.setattr(health, "_cache", None)
+
+
+@pytest.mark.asyncio
+async def test_health_is_static(async_client):
+    response = await async_client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok"}
+
+
+@pytest.mark.asyncio
+async def test_ready_reports_dependencies(authorized_client):
+    response = await authorized_client.get("/ready")
+    assert response.status_code == 200
+    checks = response.json()["checks"]
+    assert checks["database"]["ok"]
+    assert checks["redis"]["ok"]
+    assert set(checks["broker"]["queues"]) == set(health.CELERY_QUEUES)
+
+
+@pytest.mark.asyncio
+async def test_ready_is_cached(authorized_client, query_counter):
+    await authorized_client.get("/ready")
+    query_counter.clear()
+    await authorized_client.get("/ready")
+    assert query_counter == []
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_is_not_ready(authorized_client, monkeypatch):
+    monkeypatch.setattr(health, "pool_status", lambda session: {"ok": False, "utilization": 1.0})
+    response = await authorized_client.get("/ready")
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["status"] == "unavailable"
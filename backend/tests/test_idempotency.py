@@ -0,0 +1,77 @@
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models.transactions import Transaction
+
+
+def _payload(category_id: int, title: str, cash: float = 10) -> dict:
+    return {"title": title, "cash": cash, "type": "expense", "category_id": category_id}
+
+
+def _count(sync_session, title: str) -> int:
+    return sync_session.execute(
+        select(func.count()).select_from(Transaction).where(Transaction.title == title)
+    ).scalar_one()
+
+
+@pytest.mark.asyncio
+async def test_retry_with_same_key_replays_response(authorized_client, category_id, sync_session, query_counter):
+    title = f"Idem_{uuid.uuid4().hex[:8]}"
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+
+    first = await authorized_client.post("/transactions/", json=_payload(category_id, title), headers=headers)
+    assert first.status_code == 201
+
+    query_counter.clear()
+    retry = await authorized_client.post("/transactions/", json=_payload(category_id, title), headers=headers)
+    assert retry.status_code == 201
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert query_counter == []
+    assert _count(sync_session, title) == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_create_once(authorized_client, category_id, sync_session):
+    title = f"Idem_{uuid.uuid4().hex[:8]}"
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+
+    responses = await asyncio.gather(*(
+        authorized_client.post("/transactions/", json=_payload(category_id, title), headers=headers)
+        for _ in range(5)
+    ))
+    assert {r.status_code for r in responses} == {201}
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert _count(sync_session, title) == 1
+
+
+@pytest.mark.asyncio
+async def test_key_reuse_with_other_request_is_rejected(authorized_client, category_id):
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    created = await authorized_client.post("/transactions/", json=_payload(category_id, "Idem"), headers=headers)
+    assert created.status_code == 201
+
+    other = await authorized_client.post("/transactions/", json=_payload(category_id, "Idem", 99), headers=headers)
+    assert other.status_code == 422
+
+    # Ключ учитывает URL: тот же ключ на обновлении - другой запрос
+    tx_id = created.json()["id"]
+    updated = await authorized_client.patch(f"/transactions/{tx_id}", json={"cash": 20}, headers=headers)
+    assert updated.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_failed_request_is_not_stored(authorized_client, query_counter):
+    headers = {"Idempotency-Key": uuid.uuid4().hex}
+    missing = await authorized_client.patch("/transactions/999999999", json={"cash": 1}, headers=headers)
+    assert missing.status_code in (403, 404)
+
+    # Повтор с тем же ключом выполняется заново, а не отдается из сохраненного ответа
+    query_counter.clear()
+    retry = await authorized_client.patch("/transactions/999999999", json={"cash": 1}, headers=headers)
+    assert retry.status_code == missing.status_code
+    assert "Idempotent-Replayed" not in retry.headers
+    assert any("transactions" in statement for statement in query_counter)
@@ -0,0 +1,89 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import func, select, update
+
+from app.models.analytics import MonthlyCategoryTotal
+from app.models.transactions import Transaction
+from app.schemas.transaction_schema import TransactionType
+from app.tasks.outbox import drain_batch
+from app.tasks.rollups import refresh_monthly_batch
+
+
+def _refresh(sync_session) -> None:
+    while drain_batch(sync_session):
+        pass
+    while refresh_monthly_batch(sync_session)[0]:
+        sync_session.commit()
+    sync_session.commit()
+
+
+async def _seed(client, sync_session, category_id: int) -> int:
+    user_id = (await client.get("/auth/me")).json()["id"]
+    for created_at, cash, type_ in (
+        (datetime(2025, 3, 2), 100, TransactionType.expense),
+        (datetime(2025, 3, 20), 40, TransactionType.income),
+        (datetime(2025, 4, 5), 70, TransactionType.expense),
+    ):
+        sync_session.add(Transaction(title="Past", cash=cash, type=type_, created_at=created_at,
+                                     category_id=category_id, user_id=user_id))
+    sync_session.commit()
+    await client.post("/transactions/", json={
+        "title": "Now", "cash": 5, "type": "expense", "category_id": category_id
+    })
+    return user_id
+
+
+@pytest.mark.asyncio
+async def test_closed_months_served_from_rollup(authorized_client, category_id, sync_session):
+    user_id = await _seed(authorized_client, sync_session, category_id)
+    _refresh(sync_session)
+
+    rows = sync_session.execute(
+        select(MonthlyCategoryTotal.month, MonthlyCategoryTotal.type, MonthlyCategoryTotal.total)
+        .where(MonthlyCategoryTotal.user_id == user_id)
+    ).all()
+    assert len(rows) == 4
+
+    march = (await authorized_client.get("/transactions/analytics", params={"year": 2025, "month": 3})).json()
+    assert (march["income"], march["expense"]) == (40, 100)
+
+    # Март неполный и считается по транзакциям, апрель - из сводки, текущий месяц - по транзакциям
+    params = {"category_id": category_id, "start_date": "2025-03-10"}
+    by_category = (await authorized_client.get("/transactions/category_analytics", params=params)).json()
+    assert (by_category["income"], by_category["expense"]) == (40, 75)
+
+    # Закрытый месяц читается из сводки, а не из транзакций
+    sync_session.execute(
+        update(MonthlyCategoryTotal)
+        .where(MonthlyCategoryTotal.user_id == user_id, MonthlyCategoryTotal.type == TransactionType.expense,
+               MonthlyCategoryTotal.month == datetime(2025, 4, 1).date())
+        .values(total=999)
+    )
+    sync_session.commit()
+    by_category = (await authorized_client.get("/transactions/category_analytics", params=params)).json()
+    assert by_category["expense"] == 1004
+
+
+@pytest.mark.asyncio
+async def test_rollup_follows_changes_in_closed_months(authorized_client, category_id, sync_session):
+    user_id = await _seed(authorized_client, sync_session, category_id)
+    _refresh(sync_session)
+
+    march_expense = select(Transaction.id).where(
+        Transaction.user_id == user_id, Transaction.created_at == datetime(2025, 3, 2)
+    )
+    tx_id = sync_session.execute(march_expense).scalar_one()
+    await authorized_client.patch(f"/transactions/{tx_id}", json={"type": "income"})
+    _refresh(sync_session)
+
+    march = (await authorized_client.get("/transactions/analytics", params={"year": 2025, "month": 3})).json()
+    assert (march["income"], march["expense"]) == (140, 0)
+
+    live = sync_session.execute(
+        select(func.count()).select_from(MonthlyCategoryTotal).where(
+            MonthlyCategoryTotal.user_id == user_id, MonthlyCategoryTotal.type == TransactionType.expense,
+            MonthlyCategoryTotal.month == datetime(2025, 3, 1).date(),
+        )
+    ).scalar_one()
+    assert live == 0
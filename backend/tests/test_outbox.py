@@ -0,0 +1,76 @@
+import pytest
+from sqlalchemy import select
+
+from app.models.outbox import Outbox
+from app.services import outbox
+from app.tasks.outbox import drain_batch
+
+
+async def _create(client, category_id: int, cash: float = 10) -> int:
+    response = await client.post("/transactions/", json={
+        "title": "Outboxed", "cash": cash, "type": "expense", "category_id": category_id
+    })
+    return response.json()["id"]
+
+
+def _events(sync_session, entity_id: int, entity: str = "transaction"):
+    sync_session.expire_all()
+    return sync_session.execute(
+        select(Outbox).where(Outbox.entity == entity, Outbox.entity_id == entity_id).order_by(Outbox.seq)
+    ).scalars().all()
+
+
+def _drain_all(sync_session) -> None:
+    while drain_batch(sync_session):
+        pass
+
+
+@pytest.fixture
+def subscribers(monkeypatch):
+    monkeypatch.setattr(outbox, "_subscribers", outbox.defaultdict(list))
+    return outbox._subscribers
+
+
+@pytest.mark.asyncio
+async def test_mutations_write_ordered_events(authorized_client, category_id, sync_session):
+    tx_id = await _create(authorized_client, category_id)
+    await authorized_client.patch(f"/transactions/{tx_id}", json={"cash": 25})
+    await authorized_client.post("/transactions/batch/delete", json={"ids": [tx_id]})
+
+    events = _events(sync_session, tx_id)
+    assert [e.operation for e in events] == ["insert", "update", "delete"]
+    assert [e.payload["cash"] for e in events] == [10, 25, 25]
+    assert {e.user_id for e in events} == {events[0].payload["user_id"]}
+
+    category = (await authorized_client.post("/categories/", json={"title": "OutboxCategory"})).json()
+    assert [e.operation for e in _events(sync_session, category["id"], "category")] == ["insert"]
+
+
+@pytest.mark.asyncio
+async def test_drain_dispatches_and_marks_processed(authorized_client, category_id, sync_session, subscribers):
+    received = []
+
+    @outbox.subscribe("transaction")
+    def collect(session, events):
+        received.extend((e.entity_id, e.operation) for e in events)
+
+    tx_id = await _create(authorized_client, category_id)
+    await authorized_client.patch(f"/transactions/{tx_id}", json={"cash": 30})
+    _drain_all(sync_session)
+
+    assert [op for entity_id, op in received if entity_id == tx_id] == ["insert", "update"]
+    assert all(e.processed_at is not None for e in _events(sync_session, tx_id))
+
+
+@pytest.mark.asyncio
+async def test_failing_subscriber_leaves_batch_pending(authorized_client, category_id, sync_session, subscribers):
+    @outbox.subscribe()
+    def broken(session, events):
+        raise RuntimeError("subscriber failed")
+
+    tx_id = await _create(authorized_client, category_id)
+    with pytest.raises(RuntimeError):
+        drain_batch(sync_session)
+    sync_session.rollback()
+
+    assert all(e.processed_at is None for e in _events(sync_session, tx_id))
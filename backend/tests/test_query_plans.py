@@ -0,0 +1,271 @@
+import json
+import re
+import uuid
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from app.schemas.auth_schema import UserCreate
+from app.schemas.category_schema import CategoryBase
+from app.schemas.transaction_schema import (
+    TransactionBatchUpdate,
+    TransactionCreate,
+    TransactionType,
+    TransactionUpdate,
+)
+from app.services import auth as auth_service
+from app.services import category as category_service
+from app.services import transactions as transaction_service
+from app.services.cache import category_cache
+from tests.conftest import (
+    TEST_SYNC_DATABASE_URL,
+    AsyncTestingSession,
+    delete_seeded_users,
+    engine_test,
+    seed_users,
+)
+
+# Планы горячих запросов сервисов transactions, category и auth. Сценарий выполняет вызов
+# сервиса, перехватывает его SQL с параметрами и получает EXPLAIN (FORMAT JSON) каждого
+# запроса с enable_seqscan = off: если индекс применим, планировщик его возьмет, а cast()
+# или extract() над индексированной колонкой оставит в плане Seq Scan и тест упадет
+
+USERS = 200
+LIGHT_ROWS = 50
+HEAVY_ROWS = 3000
+HISTORY_DAYS = 3 * 365
+CATEGORIES_PER_USER = 3
+
+PLAN_TABLES = {"transactions", "category", "users", "monthly_category_totals"}
+INDEX_SCANS = {"Index Scan", "Index Only Scan", "Bitmap Index Scan", "Bitmap Heap Scan"}
+# Выборка всей истории самого активного пользователя укладывается с запасом;
+# Seq Scan при enable_seqscan = off получает штрафную стоимость и этот порог превышает
+MAX_PLAN_COST = 5000
+HOT_STATEMENT = re.compile(r"^\s*(SELECT|INSERT|UPDATE|DELETE|WITH)\b", re.IGNORECASE)
+
+
+@pytest.fixture(scope="module")
+def plan_dataset():
+    """Один активный пользователь с историей за три года и много небольших - как в проде."""
+    prefix = f"plan_{uuid.uuid4().hex[:8]}"
+    engine = create_engine(TEST_SYNC_DATABASE_URL)
+    with engine.begin() as conn:
+        user_ids = seed_users(
+            conn, prefix, USERS, LIGHT_ROWS, heavy_rows=HEAVY_ROWS,
+            categories_per_user=CATEGORIES_PER_USER, days=HISTORY_DAYS,
+        )
+        # Сводка закрытых месяцев, как ее собирает refresh_monthly_totals
+        conn.execute(text(
+            "INSERT INTO monthly_category_totals (user_id, month, category_id, type, total, transactions) "
+            "SELECT user_id, date_trunc('month', created_at)::date, category_id, type, sum(cash), count(*) "
+            "FROM transactions "
+            "WHERE user_id = ANY(:user_ids) AND created_at < date_trunc('month', localtimestamp) "
+            "GROUP BY 1, 2, 3, 4 "
+            "ON CONFLICT DO NOTHING"
+        ), {"user_ids": user_ids})
+
+        heavy, light = user_ids[0], user_ids[1]
+        categories = conn.execute(
+            text("SELECT user_id, id FROM category WHERE user_id IN (:heavy, :light) ORDER BY id"),
+            {"heavy": heavy, "light": light},
+        ).all()
+        transaction_ids = conn.execute(
+            text("SELECT id FROM transactions WHERE user_id = :heavy ORDER BY id LIMIT 10"),
+            {"heavy": heavy},
+        ).scalars().all()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for table in sorted(PLAN_TABLES):
+            conn.execute(text(f"ANALYZE {table}"))
+
+    yield SimpleNamespace(
+        prefix=prefix,
+        user=SimpleNamespace(id=heavy),
+        light_user=SimpleNamespace(id=light),
+        category_ids=[id_ for user_id, id_ in categories if user_id == heavy],
+        light_category_id=next(id_ for user_id, id_ in categories if user_id == light),
+        transaction_ids=transaction_ids,
+    )
+
+    # Вместе с сидом удаляется и пользователь prefix_auth из сценария auth
+    with engine.begin() as conn:
+        delete_seeded_users(conn, prefix)
+    engine.dispose()
+
+
+@pytest.fixture
+def captured_statements():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine_test.sync_engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine_test.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _months_ago(months: int) -> date:
+    day = date.today().replace(day=1)
+    for _ in range(months):
+        day = (day - timedelta(days=1)).replace(day=1)
+    return day
+
+
+async def _list_recent(session, data):
+    await transaction_service.get_transactions(
+        data.user, session, None, None, None, None, 20, 0, "created_at", "desc")
+
+
+async def _list_filtered(session, data):
+    await transaction_service.get_transactions(
+        data.user, session, TransactionType.expense, date.today() - timedelta(days=90), date.today(),
+        data.category_ids[0], 20, 0, "cash", "desc")
+
+
+async def _list_search(session, data):
+    await transaction_service.get_transactions(
+        data.user, session, None, None, None, None, 20, 0, "created_at", "desc", "coff")
+
+
+async def _get_one(session, data):
+    await transaction_service.get_one_transaction(data.user, session, data.transaction_ids[0])
+
+
+async def _balance(session, data):
+    await transaction_service.get_balance(data.user, session, date.today())
+
+
+async def _month_open(session, data):
+    today = date.today()
+    await transaction_service.get_analitics_on_month(data.user, session, today.year, today.month)
+
+
+async def _month_closed(session, data):
+    month = _months_ago(6)
+    await transaction_service.get_analitics_on_month(data.user, session, month.year, month.month)
+
+
+async def _category_analytics(session, data):
+    await transaction_service.get_analitics_on_category(
+        data.user, session, _months_ago(14) + timedelta(days=10), date.today(), data.category_ids[0])
+
+
+async def _summary(session, data):
+    await transaction_service.get_summary(data.user, session, date.today(), data.category_ids[1])
+
+
+async def _export_csv(session, data):
+    await transaction_service.export_transactions_csv(user=data.user, session=session)
+
+
+async def _create(session, data):
+    # Промах кэша категорий - INSERT ... SELECT с проверкой владельца
+    category_cache.invalidate(data.user.id)
+    await transaction_service.create_transactions(
+        TransactionCreate(title="plan", cash=1, type=TransactionType.expense, category_id=data.category_ids[0]),
+        data.user, session)
+
+
+async def _update(session, data):
+    category_cache.invalidate(data.user.id)
+    await transaction_service.update_transaction(
+        TransactionUpdate(cash=2, category_id=data.category_ids[1]), data.user, session, data.transaction_ids[1])
+
+
+async def _delete(session, data):
+    await transaction_service.delete_transaction(data.user, session, data.transaction_ids[2])
+
+
+async def _batch(session, data):
+    ids = data.transaction_ids[3:6]
+    await transaction_service.get_transactions_batch(data.user, session, ids + [0])
+    await transaction_service.update_transactions_batch(
+        TransactionBatchUpdate(ids=ids, changes=TransactionUpdate(cash=3)), data.user, session)
+    await transaction_service.delete_transactions_batch(data.user, session, ids)
+
+
+async def _categories(session, data):
+    category_cache.invalidate(data.user.id)
+    await category_service.get_all_category(data.user, session)
+    await category_service.get_one_category(data.user, session, data.category_ids[0])
+    await category_service.update_category(
+        CategoryBase(title=f"{data.prefix}_renamed"), data.user, session, data.category_ids[2])
+
+
+async def _delete_category(session, data):
+    await category_service.delete_category(data.light_user, session, data.light_category_id)
+
+
+async def _auth(session, data):
+    credentials = UserCreate(name=f"{data.prefix}_auth", password="plan-password")
+    user = await auth_service.register_user(credentials, session)
+    await auth_service.login_user(credentials, session)
+    await auth_service.get_user(user.id, session)
+    await auth_service.get_current_user(
+        token=auth_service.create_access_token({"sub": str(user.id)}), session=session)
+
+
+SCENARIOS = {
+    "transactions_list": _list_recent,
+    "transactions_list_filtered": _list_filtered,
+    "transactions_search": _list_search,
+    "transaction_get": _get_one,
+    "balance": _balance,
+    "analytics_open_month": _month_open,
+    "analytics_closed_month": _month_closed,
+    "analytics_category": _category_analytics,
+    "summary": _summary,
+    "export_csv": _export_csv,
+    "transaction_create": _create,
+    "transaction_update": _update,
+    "transaction_delete": _delete,
+    "transactions_batch": _batch,
+    "categories": _categories,
+    "category_delete": _delete_category,
+    "auth": _auth,
+}
+
+
+def _nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", ()):
+        yield from _nodes(child)
+
+
+async def _explain(statement: str, parameters) -> dict:
+    async with engine_test.connect() as conn:
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        result = await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar_one()
+        await conn.rollback()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("scenario", list(SCENARIOS))
+async def test_hot_query_plans(scenario, plan_dataset, captured_statements):
+    async with AsyncTestingSession() as session:
+        await SCENARIOS[scenario](session, plan_dataset)
+
+    hot = [
+        (statement, parameters) for statement, parameters in captured_statements
+        if HOT_STATEMENT.match(statement) and any(re.search(rf"\b{table}\b", statement) for table in PLAN_TABLES)
+    ]
+    assert hot, f"{scenario}: no queries captured"
+
+    for statement, parameters in hot:
+        plan = await _explain(statement, parameters)
+        scans = [
+            (node["Node Type"], node["Relation Name"]) for node in _nodes(plan)
+            if node.get("Relation Name") in PLAN_TABLES and node["Node Type"] != "ModifyTable"
+        ]
+        not_indexed = [scan for scan in scans if scan[0] not in INDEX_SCANS]
+        assert not not_indexed, f"{scenario}: {not_indexed} in plan of\n{statement}"
+        assert plan["Total Cost"] < MAX_PLAN_COST, (
+            f"{scenario}: estimated cost {plan['Total Cost']} of\n{statement}"
+        )
@@ -0,0 +1,39 @@
+import pytest
+from fastapi import status
+
+from app.services import rate_limit
+
+
+@pytest.mark.asyncio
+async def test_analytics_bucket_returns_429_with_retry_after(authorized_client, monkeypatch):
+    monkeypatch.setitem(rate_limit.RATE_LIMITS, "analytics", (2, 0.01))
+
+    for _ in range(2):
+        response = await authorized_client.get("/transactions/balance")
+        assert response.status_code == 200
+
+    response = await authorized_client.get("/transactions/balance")
+    assert response.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert int(response.headers["Retry-After"]) >= 1
+
+    # Дешевые роуты считаются в отдельном бакете
+    response = await authorized_client.get("/transactions/")
+    assert response.status_code == 200
+
+
+def test_local_buckets_refill_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limit.time, "monotonic", lambda: now[0])
+    buckets = rate_limit.LocalTokenBuckets(max_keys=10)
+
+    assert buckets.take("user:1", capacity=1, rate=0.5) == (True, 0.0)
+    allowed, retry_after = buckets.take("user:1", capacity=1, rate=0.5)
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+
+    now[0] += 2
+    assert buckets.take("user:1", capacity=1, rate=0.5)[0]
+
+
+def test_parse_limit():
+    assert rate_limit.parse_limit("30/60") == (30, 0.5)
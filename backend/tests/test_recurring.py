@@ -0,0 +1,109 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import select
+
+from app.models.auth import User
+from app.models.transactions import Category, RecurringTransaction, Transaction
+from app.schemas.recurring_schema import RecurrencePeriod
+from app.schemas.transaction_schema import TransactionType
+from app.tasks.recurring import generate_due_batch
+
+
+def _create_rule(sync_session, name: str, **fields) -> RecurringTransaction:
+    user = User(name=name, hashed_password="x")
+    sync_session.add(user)
+    sync_session.flush()
+    category = Category(title=f"{name}_category", user_id=user.id)
+    sync_session.add(category)
+    sync_session.flush()
+    rule = RecurringTransaction(
+        title="Rent", cash=500, type=TransactionType.expense, every=1,
+        category_id=category.id, user_id=user.id, next_index=0,
+        next_run_on=fields["start_date"], is_active=True, **fields,
+    )
+    sync_session.add(rule)
+    sync_session.commit()
+    return rule
+
+
+def _generate_until_idle(sync_session, today: date) -> int:
+    inserted_total = 0
+    while True:
+        rules, inserted, _ = generate_due_batch(sync_session, today)
+        sync_session.commit()
+        inserted_total += inserted
+        if rules == 0:
+            return inserted_total
+
+
+def _occurrences(sync_session, rule_id: int):
+    return sync_session.execute(
+        select(Transaction.occurrence_date)
+        .where(Transaction.recurring_id == rule_id)
+        .order_by(Transaction.occurrence_date)
+    ).scalars().all()
+
+
+def test_monthly_rule_keeps_day_of_month_and_is_idempotent(sync_session):
+    rule = _create_rule(sync_session, "recurring_monthly", period=RecurrencePeriod.month,
+                        start_date=date(2025, 1, 31))
+
+    _generate_until_idle(sync_session, date(2025, 4, 30))
+    assert _occurrences(sync_session, rule.id) == [
+        date(2025, 1, 31), date(2025, 2, 28), date(2025, 3, 31), date(2025, 4, 30),
+    ]
+    sync_session.refresh(rule)
+    assert rule.next_run_on == date(2025, 5, 31)
+
+    # Повторный запуск и сброс курсора правила не создают дублей
+    assert _generate_until_idle(sync_session, date(2025, 4, 30)) == 0
+    rule.next_index, rule.next_run_on = 0, rule.start_date
+    sync_session.commit()
+    _generate_until_idle(sync_session, date(2025, 4, 30))
+    assert len(_occurrences(sync_session, rule.id)) == 4
+
+
+def test_rule_deactivates_after_end_date(sync_session):
+    rule = _create_rule(sync_session, "recurring_weekly", period=RecurrencePeriod.week,
+                        start_date=date(2025, 1, 1), end_date=date(2025, 1, 20))
+
+    _generate_until_idle(sync_session, date(2025, 3, 1))
+    assert _occurrences(sync_session, rule.id) == [date(2025, 1, 1), date(2025, 1, 8), date(2025, 1, 15)]
+    sync_session.refresh(rule)
+    assert not rule.is_active
+
+
+def test_long_catch_up_spans_several_batches(sync_session, monkeypatch):
+    from app.db.config import settings
+
+    monkeypatch.setattr(settings, "RECURRING_MAX_CATCHUP", 7)
+    rule = _create_rule(sync_session, "recurring_daily", period=RecurrencePeriod.day,
+                        start_date=date(2025, 1, 1))
+
+    _generate_until_idle(sync_session, date(2025, 1, 31))
+    assert len(_occurrences(sync_session, rule.id)) == 31
+
+
+@pytest.mark.asyncio
+async def test_recurring_routes(authorized_client, category_id):
+    response = await authorized_client.post("/recurring/", json={
+        "title": "Salary", "cash": 1000, "type": "income", "category_id": category_id,
+        "period": "month", "start_date": "2025-01-10",
+    })
+    assert response.status_code == 201
+    rule = response.json()
+    assert rule["next_run_on"] == "2025-01-10"
+    assert rule["is_active"]
+
+    rules = (await authorized_client.get("/recurring/")).json()
+    assert [r["id"] for r in rules] == [rule["id"]]
+
+    response = await authorized_client.post("/recurring/", json={
+        "title": "Bad", "cash": 1, "type": "income", "category_id": category_id,
+        "period": "day", "start_date": "2025-02-01", "end_date": "2025-01-01",
+    })
+    assert response.status_code == 422
+
+    assert (await authorized_client.delete(f"/recurring/{rule['id']}")).status_code == 200
+    assert (await authorized_client.delete(f"/recurring/{rule['id']}")).status_code == 404
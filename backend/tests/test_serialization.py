@@ -0,0 +1,51 @@
+import json
+from datetime import datetime, timedelta
+from typing import List
+
+import pytest
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.models.transactions import Transaction
+from app.schemas.transaction_schema import TransactionOut, TransactionType
+from app.services.serialization import TRANSACTION_FIELDS, fast_json_response
+
+PAGE_SIZE = 100
+
+
+def page() -> List[Transaction]:
+    start = datetime(2024, 1, 1, 12, 30, 15, 123456)
+    return [
+        Transaction(
+            id=i,
+            title=f"Transaction {i}",
+            cash=i * 1.5,
+            type=TransactionType.income if i % 2 else TransactionType.expense,
+            category_id=i % 7,
+            user_id=1,
+            created_at=start + timedelta(minutes=i),
+        )
+        for i in range(1, PAGE_SIZE + 1)
+    ]
+
+
+def response_field():
+    return create_response_field(name="response", type_=List[TransactionOut], mode="serialization")
+
+
+async def default_path(field, transactions) -> bytes:
+    # То, что FastAPI делает для response_model=List[TransactionOut]: валидация, dump, json.dumps
+    content = await serialize_response(field=field, response_content=transactions, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+def fast_path(transactions) -> bytes:
+    return fast_json_response(transactions, Response(), TRANSACTION_FIELDS).body
+
+
+@pytest.mark.asyncio
+async def test_fast_json_path_matches_default():
+    transactions = page()
+    assert json.loads(fast_path(transactions)) == json.loads(await default_path(response_field(), transactions))
@@ -0,0 +1,43 @@
+import json
+import os
+import subprocess
+import sys
+
+# Бюджеты с запасом для CI; на рабочей машине импорт занимает около 0.9 с и 90 МБ
+IMPORT_TIME_BUDGET = float(os.getenv("IMPORT_TIME_BUDGET", 3.0))
+IMPORT_RSS_BUDGET_MB = float(os.getenv("IMPORT_RSS_BUDGET_MB", 150))
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "fastapi_mail", "app.tasks.export")
+
+MEASURE_IMPORT = """
+import json, resource, sys, time
+started = time.perf_counter()
+import app.main
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def measure_cold_import() -> dict:
+    """Импорт app.main в чистом интерпретаторе: в текущем процессе модули уже загружены."""
+    backend_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [backend_root, os.getenv("PYTHONPATH")]))}
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE_IMPORT], env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def test_app_import_skips_heavy_dependencies():
+    result = measure_cold_import()
+    loaded = [module for module in HEAVY_MODULES if module in result["modules"]]
+    assert loaded == []
+
+
+def test_app_import_within_budget():
+    result = measure_cold_import()
+    assert result["seconds"] < IMPORT_TIME_BUDGET
+    assert result["rss_mb"] < IMPORT_RSS_BUDGET_MB